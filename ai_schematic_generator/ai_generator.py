@@ -1,125 +1,597 @@
 import anthropic
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
-from .schematic_generator import SchematicGenerator, Component
+import asyncio
+import httpx
+import os
+import shutil
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from .schematic_generator import (
+    ELEMENT_FACTORIES, SchematicGenerator, Component, parse_schematic_json, netlist_hash, svg_filename
+)
+from .editor import SchematicEditor
+from .cache import ResponseCache, RenderCache, make_cache_key
+from .exporters import output_filename
+from .images import MAX_IMAGE_TOKENS, ImagePreprocessor, image_digest
+from .prompts import (
+    EDIT_TEMPLATE, MAX_CONTINUATIONS, MAX_OUTPUT_TOKENS, PLACED_TEMPLATE, TOPOLOGY_TEMPLATE,
+    PromptTemplate, estimate_max_tokens, estimate_tokens
+)
+from .render import RenderPool
+from .similarity import SimilarityIndex
+from .streaming import IncrementalSchematicParser
+from .retry import OUTPUT_ERRORS, RetryPolicy, repair_json, strip_code_fence
+from .metrics import METRICS
+from .validation import SchematicValidationError, correction_prompt, validate_component
 import logging
 
+if TYPE_CHECKING:
+    # batch imports this module for ANALYSIS_PROMPT.
+    from .batch import RateLimiter
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+MODEL = "claude-3-sonnet-20240229"
+# Output budget for schematic analyses; generation budgets come from prompts.py.
+MAX_TOKENS = 2000
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+ANALYSIS_PROMPT = "Analyze this electronic schematic and provide a detailed description."
+
+
+def normalize_description(description: str) -> str:
+    """Fold whitespace and case so equivalent descriptions compare equal."""
+    return " ".join(description.split()).casefold()
+
+
+async def _mark_request_start(request):
+    request.extensions['schematic_start'] = time.perf_counter()
+
+
+async def _observe_first_byte(response):
+    # httpx fires response hooks once the status line and headers have arrived.
+    start = response.request.extensions.get('schematic_start')
+    if start is not None:
+        METRICS.observe('api_ttfb', time.perf_counter() - start)
+
+
+def _record_usage(usage):
+    """Add the token counts of a Messages API ``usage`` object to the metrics."""
+    for field in ('input_tokens', 'output_tokens', 'cache_read_input_tokens', 'cache_creation_input_tokens'):
+        value = getattr(usage, field, None)
+        if isinstance(value, int):
+            METRICS.inc(field, value)
+
+
+def _prompt_text(template: PromptTemplate, messages: List[Dict]) -> str:
+    """The system prompt and message texts of a request, for token estimates."""
+    return template.system + ''.join(message['content'] for message in messages)
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _response_text(response) -> str:
+    """Extract the text payload from a Messages API response."""
+    content = response.content
+    if isinstance(content, str):
+        return content
+    return "".join(getattr(block, 'text', '') for block in content)
+
+
 class AISchematicGenerator:
-    def __init__(self, api_key: str):
-        """Initialize the AI Schematic Generator with Anthropic API key."""
-        self.client = anthropic.Anthropic(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[ResponseCache] = None,
+        render_cache: Optional[RenderCache] = None,
+        renderer: Optional[RenderPool] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        base_url: Optional[str] = None,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        layout: bool = False,
+        similarity: Optional[SimilarityIndex] = None,
+        rate_limiter: Optional['RateLimiter'] = None
+    ):
+        """Initialize the AI Schematic Generator with Anthropic API key.
+
+        If ``cache`` is given, LLM responses are looked up there before the API
+        is called and stored once they have produced a valid schematic. If
+        ``render_cache`` is given, SVGs for previously rendered netlists are
+        copied from it instead of being drawn again. If ``renderer`` is given,
+        drawing happens in its worker processes instead of on the event loop;
+        the pool is shared and is not shut down by ``aclose()``.
+        ``retry_policy`` controls backoff and which errors are retried; the
+        SDK's own retries are disabled so that it is the only retry layer.
+        ``base_url`` points the client at another Messages API endpoint, such
+        as the local stub used by the benchmarks. With ``layout`` set, the
+        model is asked for topology only and positions and wire routes are
+        computed locally by the layout engine. If ``similarity`` is given, a
+        description close enough to one answered before reuses that answer
+        instead of calling the API. If ``rate_limiter`` is given, it is
+        acquired before every API call.
+
+        All requests share one keep-alive connection pool of at most
+        ``max_connections`` connections; call ``aclose()`` (or use the
+        generator as an async context manager) to release it.
+        """
+        self.http_client = anthropic.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            event_hooks={'request': [_mark_request_start], 'response': [_observe_first_byte]}
+        )
+        self.client = anthropic.AsyncAnthropic(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=self.http_client,
+            # The SDK applies its timeout per request, overriding the pool's own.
+            timeout=anthropic.Timeout(timeout, connect=connect_timeout),
+            max_retries=0
+        )
         self.schematic_generator = SchematicGenerator()
+        self.cache = cache
+        self.render_cache = render_cache
+        self.renderer = renderer
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.layout = layout
+        self.similarity = similarity
+        self.rate_limiter = rate_limiter
+        self.template = TOPOLOGY_TEMPLATE if layout else PLACED_TEMPLATE
+        self.images = ImagePreprocessor()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
         logger.info("Initialized AI Schematic Generator")
     
+    async def aclose(self):
+        """Close the API client and its connection pool."""
+        await self.client.close()
+        if not self.http_client.is_closed:
+            await self.http_client.aclose()
+        logger.debug("Closed AI Schematic Generator")
+
+    def reset(self):
+        """Drop the drawing and images kept from earlier requests.
+
+        Called by :class:`~.pool.GeneratorPool` between uses; the API client,
+        its connections and the shared caches are kept.
+        """
+        self.schematic_generator = SchematicGenerator()
+        self.images = ImagePreprocessor()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+    
+    async def _throttle(self, prompt: str, max_tokens: int):
+        """Wait for the rate limiter, if any, before an API call."""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(estimate_tokens(prompt, max_tokens))
+
     def _generate_circuit_prompt(self, description: str) -> str:
         """Generate a structured prompt for the LLM."""
-        schema = '''{
-    "components": [
-        {
-            "type": "resistor|capacitor|inductor|diode|transistor",
-            "id": "unique_id",
-            "value": "component_value",
-            "position": [0, 0],
-            "rotation": 0
-        }
-    ],
-    "connections": [
-        {
-            "start": "component_id_1",
-            "end": "component_id_2"
-        }
-    ]
-}'''
-
-        prompt = f"""Based on the following circuit description, generate a JSON specification:
-Description: {description}
-
-Use this schema:
-{schema}
-
-Provide only the JSON output without any additional text or explanation."""
-        
-        logger.debug(f"Generated prompt for description: {description}")
-        return prompt
+        return self.template.render(description)
+
+    def _messages(
+        self, description: str, partial: str = '', feedback: Optional[SchematicValidationError] = None,
+        template: Optional[PromptTemplate] = None
+    ) -> List[Dict]:
+        """The per-request messages.
+
+        ``feedback`` quotes an invalid earlier reply back with its validation
+        issues so the model fixes those instead of starting over; ``partial``
+        prefills a continued response.
+        """
+        template = template or self.template
+        messages = [{"role": "user", "content": template.user_message(description)}]
+        if feedback is not None:
+            messages.append({"role": "assistant", "content": feedback.document.strip()})
+            messages.append({"role": "user", "content": correction_prompt(feedback.issues)})
+        if partial:
+            messages.append({"role": "assistant", "content": partial})
+        return messages
+
+    async def _complete(
+        self, description: str, feedback: Optional[SchematicValidationError] = None,
+        template: Optional[PromptTemplate] = None, max_tokens: Optional[int] = None
+    ) -> str:
+        """Request the schematic JSON, continuing a response cut off at its budget.
+
+        ``template`` defaults to the generation template and ``max_tokens``
+        to the budget estimated from ``description``.
+        """
+        template = template or self.template
+        max_tokens = max_tokens or estimate_max_tokens(description, template)
+        content = ''
+        for continuation in range(MAX_CONTINUATIONS + 1):
+            messages = self._messages(description, content, feedback, template)
+            await self._throttle(_prompt_text(template, messages), max_tokens)
+            with METRICS.timer('api_total'):
+                response = await self.client.messages.create(
+                    model=MODEL,
+                    max_tokens=max_tokens,
+                    temperature=0,
+                    system=template.system,
+                    messages=messages
+                )
+            _record_usage(getattr(response, 'usage', None))
+            content += _response_text(response)
+            if getattr(response, 'stop_reason', None) != 'max_tokens' or continuation == MAX_CONTINUATIONS:
+                break
+            logger.info(f"Response truncated at {max_tokens} tokens; continuing")
+            METRICS.inc('continuations')
+            # The API rejects an assistant prefill that ends in whitespace.
+            content = content.rstrip()
+            max_tokens = min(MAX_OUTPUT_TOKENS, max_tokens * 2)
+        return content
 
     async def generate_schematic_from_description(
         self, 
         description: str, 
         output_file: str,
-        max_retries: int = 3
+        max_retries: int = 3,
+        stream: bool = False,
+        output_format: str = 'svg',
+        similarity_scope: str = ''
     ) -> str:
-        """Generate a schematic from a natural language description."""
+        """Generate a schematic from a natural language description.
+
+        Concurrent calls with the same normalised description share a single
+        model call and render; every caller still gets its own output file.
+        With ``stream`` set, components are added to the drawing as they
+        arrive and a malformed response is abandoned (and retried) as soon as
+        it goes wrong. ``output_format`` is ``svg`` or one of the netlist
+        exports (``spice``, ``kicad``, ``json``), which skip drawing.
+        Answers are only reused between similar descriptions with the same
+        ``similarity_scope``, such as the tenant making the request.
+        """
+        await self.generate_schematic(description, output_file, max_retries, stream, output_format,
+                                      similarity_scope)
+        return f"Successfully generated schematic: {output_file}"
+
+    async def generate_schematic(
+        self,
+        description: str,
+        output_file: str,
+        max_retries: int = 3,
+        stream: bool = False,
+        output_format: str = 'svg',
+        similarity_scope: str = ''
+    ) -> Tuple[str, str]:
+        """Like :meth:`generate_schematic_from_description`, returning ``(filename, netlist_hash)``.
+
+        The hash identifies the generated netlist (and how it was laid out),
+        so equal schematics can be stored once.
+        """
+        output_filename(output_file, output_format)
+        key = (similarity_scope, output_format, normalize_description(description))
+        leader = self._inflight.get(key)
+        if leader is not None:
+            logger.info(f"Joining in-flight generation for description: {description}")
+            source, netlist_key = await asyncio.shield(leader)
+            filename = output_filename(output_file, output_format)
+            if os.path.abspath(source) != os.path.abspath(filename):
+                shutil.copyfile(source, filename)
+            logger.info(f"Successfully generated schematic: {output_file}")
+            return filename, netlist_key
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may join; retrieve the exception so it is not reported as unhandled.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            result = await self._generate(description, output_file, max_retries, stream, output_format,
+                                          similarity_scope)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._inflight[key]
+        return result
+
+    async def _generate(
+        self,
+        description: str,
+        output_file: str,
+        max_retries: int,
+        stream: bool = False,
+        output_format: str = 'svg',
+        similarity_scope: str = ''
+    ) -> Tuple[str, str]:
+        """Run the model call and render with retries, returning ``(filename, netlist_hash)``."""
         logger.info(f"Generating schematic for description: {description}")
+        METRICS.inc('generations')
+        with METRICS.timer('prompt_build'):
+            prompt = self._generate_circuit_prompt(description)
+        cache_key = make_cache_key(MODEL, prompt, MAX_OUTPUT_TOKENS)
+        # Answers are only interchangeable within a scope and with the same system prompt.
+        scope = make_cache_key(MODEL, f"{similarity_scope}\n{self.template.system}", MAX_OUTPUT_TOKENS)
+        feedback = None
         
         for attempt in range(max_retries):
+            cached = False
+            similar = None
             try:
-                prompt = self._generate_circuit_prompt(description)
-                logger.debug("Sending request to Anthropic API")
-                
-                response = await self.client.messages.create(
-                    model="claude-3-sonnet-20240229",
-                    max_tokens=2000,
-                    temperature=0,
-                    messages=[{
-                        "role": "user",
-                        "content": prompt
-                    }]
-                )
-                
-                logger.debug("Processing API response")
-                self.schematic_generator.from_json(response.content)
-                self.schematic_generator.save(output_file)
+                content = self.cache.get(cache_key) if self.cache is not None else None
+                cached = content is not None
+                if self.cache is not None:
+                    METRICS.inc('response_cache_hits' if cached else 'response_cache_misses')
+                if not cached and self.similarity is not None and attempt == 0:
+                    similar = self.similarity.lookup(description, scope)
+                if cached:
+                    logger.debug("Using cached API response")
+                    filename, netlist_key = await self._render(content, output_file, output_format)
+                elif similar is not None:
+                    logger.info(f"Reusing the schematic for similar description ({similar.score:.2f}): "
+                                f"{similar.description}")
+                    content = similar.content
+                    filename, netlist_key = await self._render(content, output_file, output_format)
+                elif stream:
+                    logger.debug("Streaming request to Anthropic API")
+                    content, filename, netlist_key = await self._generate_streaming(
+                        description, output_file, output_format, feedback
+                    )
+                else:
+                    logger.debug("Sending request to Anthropic API")
+                    content = await self._complete(description, feedback)
+                    logger.debug("Processing API response")
+                    content, filename, netlist_key = await self._render_with_repair(
+                        content, output_file, output_format
+                    )
+                if self.cache is not None and not cached:
+                    self.cache.set(cache_key, content)
+                if self.similarity is not None and not cached and similar is None:
+                    # Reused answers are not indexed again, so matches cannot drift.
+                    self.similarity.add(description, content, scope)
                 
                 logger.info(f"Successfully generated schematic: {output_file}")
-                return f"Successfully generated schematic: {output_file}"
+                return filename, netlist_key
                 
             except Exception as e:
-                logger.error(f"Attempt {attempt + 1}/{max_retries} failed: {str(e)}")
+                kind = self.retry_policy.classify(e)
+                logger.error(f"Attempt {attempt + 1}/{max_retries} failed ({kind}): {str(e)}")
+                if kind == 'fatal':
+                    msg = f"Failed to generate schematic: {str(e)}"
+                    logger.error(msg)
+                    METRICS.inc('failures')
+                    raise Exception(msg)
                 if attempt == max_retries - 1:
                     msg = f"Failed to generate schematic after {max_retries} attempts: {str(e)}"
                     logger.error(msg)
+                    METRICS.inc('failures')
                     raise Exception(msg)
-                continue
-        
-        return "Failed to generate schematic"
+                METRICS.inc('retries')
+                if cached:
+                    # A stored response that no longer renders would fail every attempt.
+                    logger.info("Dropping cached API response that failed to render")
+                    self.cache.delete(cache_key)
+                if isinstance(e, SchematicValidationError) and e.document and not cached and similar is None:
+                    # Ask for a fix of this reply rather than a fresh one.
+                    feedback = e
+                if kind == 'transient':
+                    delay = self.retry_policy.delay(attempt, e)
+                    logger.info(f"Retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+
+    async def _render_with_repair(
+        self, content: str, output_file: str, output_format: str = 'svg'
+    ) -> Tuple[str, str, str]:
+        """Render ``content``, falling back to a local repair pass if it is malformed.
+
+        Returns the content actually used, the filename and the netlist hash.
+        """
+        try:
+            return (content,) + await self._render(content, output_file, output_format)
+        except OUTPUT_ERRORS:
+            repaired = repair_json(content)
+            if repaired is None or repaired == content:
+                raise
+        logger.info("Repaired malformed model output locally")
+        return (repaired,) + await self._render(repaired, output_file, output_format)
+
+    async def _generate_streaming(
+        self,
+        description: str,
+        output_file: str,
+        output_format: str = 'svg',
+        feedback: Optional[SchematicValidationError] = None
+    ) -> Tuple[str, str, str]:
+        """Stream a response, adding components as they complete, then render it.
+
+        A response cut off at its token budget is continued in another
+        stream that feeds the same parser.
+        """
+        generator = SchematicGenerator()
+        parser = IncrementalSchematicParser()
+        build_time = 0.0
+        ids = set()
+        max_tokens = estimate_max_tokens(description, self.template)
+        with METRICS.timer('api_total'):
+            for continuation in range(MAX_CONTINUATIONS + 1):
+                stop_reason = None
+                messages = self._messages(description, parser.text.rstrip(), feedback)
+                await self._throttle(_prompt_text(self.template, messages), max_tokens)
+                async with self.client.messages.stream(
+                    model=MODEL,
+                    max_tokens=max_tokens,
+                    temperature=0,
+                    system=self.template.system,
+                    messages=messages
+                ) as response:
+                    async for text in response.text_stream:
+                        for comp in parser.feed(text):
+                            issues = validate_component(comp, len(ids), ELEMENT_FACTORIES, ids)
+                            if issues:
+                                raise SchematicValidationError(issues, parser.text)
+                            start = time.perf_counter()
+                            generator.add_component(Component.from_dict(comp))
+                            build_time += time.perf_counter() - start
+                    final = getattr(response, 'get_final_message', None)
+                    if final is not None:
+                        message = await final()
+                        _record_usage(getattr(message, 'usage', None))
+                        stop_reason = getattr(message, 'stop_reason', None)
+                if stop_reason != 'max_tokens' or continuation == MAX_CONTINUATIONS:
+                    break
+                logger.info(f"Streamed response truncated at {max_tokens} tokens; continuing")
+                METRICS.inc('continuations')
+                max_tokens = min(MAX_OUTPUT_TOKENS, max_tokens * 2)
+        content = parser.close()
+
+        components, connections = parse_schematic_json(content)
+        start = time.perf_counter()
+        for conn_start, conn_end in connections:
+            generator.add_connection(conn_start, conn_end)
+        METRICS.observe('netlist_build', build_time + time.perf_counter() - start)
+        return (content,) + await self._render(content, output_file, output_format, generator)
+
+    def _load(self, components, connections, schematic: Optional[SchematicGenerator] = None):
+        """Make ``schematic`` (or a new generator holding the netlist) the current drawing."""
+        if schematic is None:
+            schematic = SchematicGenerator()
+            schematic.load(components, connections)
+        self.schematic_generator = schematic
+
+    async def _render(
+        self,
+        content: str,
+        output_file: str,
+        output_format: str = 'svg',
+        schematic: Optional[SchematicGenerator] = None
+    ) -> Tuple[str, str]:
+        """Render a JSON description to ``output_file``, reusing cached SVGs.
+
+        Returns the filename written and the netlist hash. Netlist exports
+        are written in-process; they are cheaper than a cache lookup or a
+        hand-off to the render pool. ``schematic`` is the netlist already
+        built from ``content``, if any, so in-process renders skip rebuilding it.
+        """
+        components, connections = parse_schematic_json(content)
+        key = netlist_hash(components, connections, self.layout)
+        if output_format != 'svg':
+            self._load(components, connections, schematic)
+            if self.layout:
+                self.schematic_generator.auto_layout()
+            return self.schematic_generator.save(output_file, output_format), key
+
+        if self.render_cache is not None:
+            filename = svg_filename(output_file)
+            if self.render_cache.fetch(key, filename):
+                METRICS.inc('render_cache_hits')
+                logger.debug(f"Using cached render for netlist {key[:12]}")
+                return filename, key
+            METRICS.inc('render_cache_misses')
+
+        if self.renderer is not None:
+            # Stage timings inside the worker process are not visible here.
+            with METRICS.timer('render'):
+                filename = await self.renderer.render(content, output_file, self.layout)
+        else:
+            # Each render starts from a clean drawing so earlier requests do not leak in.
+            self._load(components, connections, schematic)
+            if self.layout:
+                self.schematic_generator.auto_layout()
+            filename = self.schematic_generator.save(output_file)
+        if self.render_cache is not None:
+            self.render_cache.store(key, filename)
+        return filename, key
+
+    async def edit_schematic(self, editor: SchematicEditor, instruction: str, max_retries: int = 3) -> List[Dict]:
+        """Apply a natural language change such as "change R2 to 4.7k" to ``editor``.
+
+        The model sees the current schematic as canonical JSON and replies
+        with a patch for :meth:`SchematicEditor.apply_patch`; an invalid patch
+        is sent back with its issues.  Nothing is redrawn here: the caller
+        flushes or renders the editor, which redraws only what changed.
+        Returns the applied operations.
+        """
+        logger.info(f"Editing schematic: {instruction}")
+        METRICS.inc('edits')
+        request = f"{editor.schematic.export('json')}\nChange: {instruction}"
+        max_tokens = estimate_max_tokens(instruction, EDIT_TEMPLATE)
+        feedback = None
+        for attempt in range(max_retries):
+            try:
+                content = await self._complete(request, feedback, EDIT_TEMPLATE, max_tokens)
+                return editor.apply_patch(strip_code_fence(content))
+            except Exception as e:
+                kind = self.retry_policy.classify(e)
+                logger.error(f"Edit attempt {attempt + 1}/{max_retries} failed ({kind}): {str(e)}")
+                if kind == 'fatal' or attempt == max_retries - 1:
+                    METRICS.inc('failures')
+                    raise Exception(f"Failed to edit schematic: {str(e)}")
+                METRICS.inc('retries')
+                if isinstance(e, SchematicValidationError) and e.document:
+                    feedback = e
+                if kind == 'transient':
+                    await asyncio.sleep(self.retry_policy.delay(attempt, e))
 
     async def analyze_existing_schematic(self, image_path: str) -> str:
         """Analyze an existing schematic image."""
         logger.info(f"Analyzing schematic: {image_path}")
-        
         try:
-            with open(image_path, 'rb') as img:
-                logger.debug("Sending request to Anthropic API for analysis")
+            data = await asyncio.to_thread(_read_bytes, image_path)
+        except OSError as e:
+            msg = f"Failed to analyze schematic: {str(e)}"
+            logger.error(msg)
+            raise Exception(msg)
+        return await self.analyze_image(data)
+
+    async def analyze_image(self, data: bytes, digest: Optional[str] = None) -> str:
+        """Analyze schematic image bytes whose SHA-256 is ``digest`` (computed if omitted).
+
+        The image is identified by content, rasterised or downscaled as
+        needed and encoded on a worker thread. With a response ``cache``,
+        the analysis of identical image content is reused without uploading.
+        """
+        try:
+            if digest is None:
+                digest = await asyncio.to_thread(image_digest, data)
+            cache_key = make_cache_key(MODEL, f"{ANALYSIS_PROMPT}\nimage:{digest}", MAX_TOKENS)
+            if self.cache is not None:
+                cached = self.cache.get(cache_key)
+                METRICS.inc('response_cache_hits' if cached is not None else 'response_cache_misses')
+                if cached is not None:
+                    logger.info("Using cached analysis")
+                    return cached
+
+            image = await self.images.prepare(data, digest)
+            await self._throttle(ANALYSIS_PROMPT, MAX_TOKENS + MAX_IMAGE_TOKENS)
+            logger.debug("Sending request to Anthropic API for analysis")
+            with METRICS.timer('api_total'):
                 response = await self.client.messages.create(
-                    model="claude-3-sonnet-20240229",
-                    max_tokens=2000,
+                    model=MODEL,
+                    max_tokens=MAX_TOKENS,
                     messages=[{
                         "role": "user",
                         "content": [
                             {
                                 "type": "text",
-                                "text": "Analyze this electronic schematic and provide a detailed description."
+                                "text": ANALYSIS_PROMPT
                             },
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "bytes",
-                                    "data": img.read(),
-                                    "media_type": "image/svg+xml"
-                                }
-                            }
+                            image.content_block()
                         ]
                     }]
                 )
+            _record_usage(getattr(response, 'usage', None))
+            result = _response_text(response)
+            if self.cache is not None:
+                self.cache.set(cache_key, result)
                 
             logger.info("Successfully analyzed schematic")
-            return response.content
+            return result
             
         except Exception as e:
             msg = f"Failed to analyze schematic: {str(e)}"
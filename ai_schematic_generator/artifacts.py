@@ -0,0 +1,257 @@
+"""Content-addressed storage for generated schematics.
+
+Artifacts are named ``<netlist hash><extension>``, so the same schematic is
+stored once however often it is requested, and a name always refers to the
+same bytes: clients and CDNs may cache them forever and revalidate with
+ETags.  Each artifact is stored with gzip (and, if the ``brotli`` package is
+installed, brotli) variants so downloads never compress on the fly.
+
+Storage goes through a small S3-style backend interface
+(``put_object``/``head_object``/``get_object``).  :class:`LocalBackend`
+keeps objects in a directory with atomic writes; :class:`S3Backend` adapts a
+boto3-compatible client.
+"""
+import gzip
+import logging
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+from .exporters import EXPORT_FORMATS, MIMETYPES
+from .metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Smaller artifacts are not worth a compressed variant.
+MIN_COMPRESS_BYTES = 256
+# Content-Encoding -> object name suffix, in order of preference.
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+_FORMATS_BY_EXTENSION = {extension: fmt for fmt, extension in EXPORT_FORMATS.items()}
+_NAME = re.compile(r"^([0-9a-f]{64})(\.[a-z]+)$")
+
+
+def _compress(data: bytes, encoding: str) -> Optional[bytes]:
+    """``data`` in ``encoding``, or None if that encoding is unavailable."""
+    if encoding == 'gzip':
+        # mtime=0 keeps the output, and so the stored object, deterministic.
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an ``Accept-Encoding`` header to its q-value."""
+    codings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """A stored schematic and the encodings it is available in."""
+    name: str
+    output_format: str
+    size: int
+    encodings: Tuple[str, ...] = ()
+
+    @property
+    def mimetype(self) -> str:
+        return MIMETYPES[self.output_format]
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        """Strong ETag of the representation sent with ``encoding``."""
+        return f'"{self.name}+{encoding}"' if encoding else f'"{self.name}"'
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        """The preferred stored encoding acceptable to ``accept_encoding``, or None for identity."""
+        accepted = parse_accept_encoding(accept_encoding or '')
+        for encoding in ENCODING_SUFFIXES:
+            if encoding in self.encodings and accepted.get(encoding, accepted.get('*', 0)) > 0:
+                return encoding
+        return None
+
+
+class LocalBackend:
+    """Objects as files in a directory, written atomically."""
+
+    def __init__(self, directory: str):
+        # Created by the first write.
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        # Two-level fan-out keeps directories small.
+        return os.path.join(self.directory, key[:2], key)
+
+    def put_object(self, key: str, data: bytes, content_type: Optional[str] = None,
+                   content_encoding: Optional[str] = None):
+        """Write ``data`` under ``key``; readers see the old object or the new one, never part."""
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def head_object(self, key: str) -> Optional[int]:
+        """Size of the object under ``key``, or None if there is none."""
+        try:
+            return os.stat(self._path(key)).st_size
+        except FileNotFoundError:
+            return None
+
+    def get_object(self, key: str) -> BinaryIO:
+        """Open the object under ``key`` for reading; raises KeyError if there is none."""
+        try:
+            return open(self._path(key), 'rb')
+        except FileNotFoundError:
+            raise KeyError(key)
+
+
+class S3Backend:
+    """Objects in an S3-compatible bucket through a boto3-style client."""
+
+    def __init__(self, client, bucket: str, prefix: str = ''):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    @staticmethod
+    def _missing(error: Exception) -> bool:
+        code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+        return code in ('404', 'NoSuchKey', 'NotFound')
+
+    def put_object(self, key: str, data: bytes, content_type: Optional[str] = None,
+                   content_encoding: Optional[str] = None):
+        extra = {}
+        if content_type:
+            extra['ContentType'] = content_type
+        if content_encoding:
+            extra['ContentEncoding'] = content_encoding
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data, **extra)
+
+    def head_object(self, key: str) -> Optional[int]:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except Exception as e:
+            if self._missing(e):
+                return None
+            raise
+        return response['ContentLength']
+
+    def get_object(self, key: str) -> BinaryIO:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body']
+        except Exception as e:
+            if self._missing(e):
+                raise KeyError(key)
+            raise
+
+
+class ArtifactStore:
+    """Store schematics once per netlist and serve them pre-compressed."""
+
+    def __init__(self, backend, encodings: Tuple[str, ...] = tuple(ENCODING_SUFFIXES)):
+        """Store artifacts in ``backend`` with compressed variants in ``encodings``."""
+        self.backend = backend
+        self.encodings = encodings
+
+    @staticmethod
+    def artifact_name(netlist_key: str, output_format: str) -> str:
+        return netlist_key + EXPORT_FORMATS[output_format]
+
+    def put(self, netlist_key: str, data: bytes, output_format: str = 'svg') -> Artifact:
+        """Store ``data`` as the ``output_format`` artifact of a netlist, unless it already is."""
+        name = self.artifact_name(netlist_key, output_format)
+        existing = self.get(name)
+        if existing is not None:
+            METRICS.inc('artifact_dedup_hits')
+            return existing
+        mimetype = MIMETYPES[output_format]
+        encodings = []
+        if len(data) >= MIN_COMPRESS_BYTES:
+            for encoding in self.encodings:
+                compressed = _compress(data, encoding)
+                if compressed is not None and len(compressed) < len(data):
+                    self.backend.put_object(name + ENCODING_SUFFIXES[encoding], compressed, mimetype, encoding)
+                    encodings.append(encoding)
+        # The plain object goes last: once it exists, the artifact is complete.
+        self.backend.put_object(name, data, mimetype)
+        METRICS.inc('artifacts_stored')
+        logger.debug(f"Stored artifact {name} ({len(data)} bytes, encodings: {encodings or 'none'})")
+        return Artifact(name, output_format, len(data), tuple(encodings))
+
+    def put_file(self, netlist_key: str, path: str, output_format: str = 'svg') -> Artifact:
+        """Store the file at ``path``; see :meth:`put`."""
+        with open(path, 'rb') as f:
+            return self.put(netlist_key, f.read(), output_format)
+
+    def get(self, name: str) -> Optional[Artifact]:
+        """The artifact called ``name``, or None if the name is invalid or unknown."""
+        match = _NAME.match(name)
+        if match is None or match.group(2) not in _FORMATS_BY_EXTENSION:
+            return None
+        size = self.backend.head_object(name)
+        if size is None:
+            return None
+        encodings = tuple(
+            encoding for encoding in ENCODING_SUFFIXES
+            if self.backend.head_object(name + ENCODING_SUFFIXES[encoding]) is not None
+        )
+        return Artifact(name, _FORMATS_BY_EXTENSION[match.group(2)], size, encodings)
+
+    def open(self, artifact: Artifact, encoding: Optional[str] = None) -> BinaryIO:
+        """Open the stored bytes of ``artifact`` in ``encoding`` (None for identity)."""
+        suffix = ENCODING_SUFFIXES[encoding] if encoding else ''
+        return self.backend.get_object(artifact.name + suffix)
+
+    def read(self, artifact: Artifact, encoding: Optional[str] = None) -> bytes:
+        """The whole stored body of ``artifact`` in ``encoding``."""
+        stream = self.open(artifact, encoding)
+        try:
+            return stream.read()
+        finally:
+            stream.close()
+
+    def size(self, artifact: Artifact, encoding: Optional[str] = None) -> Optional[int]:
+        """Stored size of ``artifact`` in ``encoding``."""
+        if not encoding:
+            return artifact.size
+        return self.backend.head_object(artifact.name + ENCODING_SUFFIXES[encoding])
+
+
+def iter_chunks(stream: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield ``stream`` in chunks and close it, for streaming responses."""
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        stream.close()
@@ -0,0 +1,313 @@
+import asyncio
+import csv
+import glob
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, TextIO
+from .images import image_digest
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchItem:
+    id: str
+    description: str
+    output: str
+
+
+def read_batch_items(stream: TextIO, fmt: str, output_dir: str) -> List[BatchItem]:
+    """Read batch descriptions from a JSONL or CSV stream.
+
+    JSONL lines may be plain JSON strings or objects with a ``description``
+    and optional ``id`` and ``output``; CSV files need a ``description``
+    column and may have ``id`` and ``output`` columns.
+    """
+    if fmt == 'csv':
+        rows = list(csv.DictReader(stream))
+    elif fmt == 'jsonl':
+        rows = []
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_no}: {e}")
+            rows.append({'description': row} if isinstance(row, str) else row)
+    else:
+        raise ValueError(f"Unknown batch format: {fmt}")
+
+    items = []
+    for index, row in enumerate(rows, 1):
+        description = (row.get('description') or '').strip()
+        if not description:
+            raise ValueError(f"Batch entry {index} has no description")
+        item_id = str(row.get('id') or index)
+        output = row.get('output') or os.path.join(output_dir, f"{item_id}.svg")
+        items.append(BatchItem(id=item_id, description=description, output=output))
+    return items
+
+
+class RateLimiter:
+    """Token-bucket limiter for requests and tokens per minute."""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(
+                self.requests_per_minute,
+                self._requests + elapsed * self.requests_per_minute / 60
+            )
+        if self.tokens_per_minute:
+            self._tokens = min(
+                self.tokens_per_minute,
+                self._tokens + elapsed * self.tokens_per_minute / 60
+            )
+
+    def _wait_time(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests_per_minute and self._requests < 1:
+            wait = max(wait, (1 - self._requests) * 60 / self.requests_per_minute)
+        if self.tokens_per_minute and self._tokens < tokens:
+            wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+        return wait
+
+    async def acquire(self, tokens: int = 0):
+        """Wait until one request and ``tokens`` tokens are available."""
+        if self.tokens_per_minute:
+            # A single request larger than the bucket would otherwise wait forever.
+            tokens = min(tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                self._refill()
+                wait = self._wait_time(tokens)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self.requests_per_minute:
+                self._requests -= 1
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+
+
+async def run_batch(
+    generator,
+    items: Iterable[BatchItem],
+    concurrency: int = 8,
+    rate_limiter: Optional[RateLimiter] = None
+) -> AsyncIterator[Dict]:
+    """Generate schematics for ``items`` concurrently, yielding results as they finish.
+
+    ``rate_limiter`` is handed to the generator, which acquires it for every
+    API call it makes, retries and continuations included; answers served
+    from a cache take nothing from it.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    if rate_limiter is not None:
+        generator.rate_limiter = rate_limiter
+
+    async def run(item: BatchItem) -> Dict:
+        async with semaphore:
+            start = time.monotonic()
+            result = {'id': item.id, 'description': item.description, 'output': item.output}
+            try:
+                directory = os.path.dirname(item.output)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                await generator.generate_schematic_from_description(item.description, item.output)
+                result['success'] = True
+            except Exception as e:
+                logger.error(f"Batch item {item.id} failed: {str(e)}")
+                result['success'] = False
+                result['error'] = str(e)
+            result['elapsed'] = round(time.monotonic() - start, 3)
+            return result
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def find_images(sources: Iterable[str], extensions: Iterable[str]) -> Iterator[str]:
+    """Yield image files under directories, glob patterns and plain paths, in order.
+
+    Directories are walked recursively and filtered by ``extensions``; glob
+    patterns support ``**``. Paths are produced lazily so huge archives do
+    not have to be listed up front.
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    for source in sources:
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(extensions):
+                        yield os.path.join(root, name)
+        elif glob.has_magic(source):
+            for path in sorted(glob.iglob(source, recursive=True)):
+                if os.path.isfile(path):
+                    yield path
+        else:
+            yield source
+
+
+class JsonlResultStore:
+    """Append-only JSONL file of analysis results."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[str] = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A run killed mid-write leaves a partial last line.
+                        continue
+                    if row.get('success') and row.get('digest'):
+                        self.done.add(row['digest'])
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def add(self, result: Dict):
+        self._file.write(json.dumps(result) + '\n')
+        self._file.flush()
+        if result.get('success'):
+            self.done.add(result['digest'])
+
+    def close(self):
+        self._file.close()
+
+
+class SqliteResultStore:
+    """SQLite table of analysis results keyed by image content hash."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            "digest TEXT PRIMARY KEY, path TEXT NOT NULL, success INTEGER NOT NULL, "
+            "analysis TEXT, error TEXT, elapsed REAL, created REAL NOT NULL)"
+        )
+        self._db.commit()
+        self.done: Set[str] = {
+            digest for (digest,) in self._db.execute("SELECT digest FROM analyses WHERE success = 1")
+        }
+
+    def add(self, result: Dict):
+        if not result.get('digest'):
+            # Unreadable files have no content hash; they are retried next run.
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (result['digest'], result['path'], int(result['success']), result.get('analysis'),
+             result.get('error'), result.get('elapsed'), time.time())
+        )
+        self._db.commit()
+        if result.get('success'):
+            self.done.add(result['digest'])
+
+    def close(self):
+        self._db.close()
+
+
+def open_result_store(path: str):
+    """Open a SQLite store for ``.sqlite``/``.sqlite3``/``.db`` paths, otherwise JSONL."""
+    if path.lower().endswith(('.sqlite', '.sqlite3', '.db')):
+        return SqliteResultStore(path)
+    return JsonlResultStore(path)
+
+
+def _read_and_hash(path: str):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return data, image_digest(data)
+
+
+async def run_analysis_batch(
+    generator,
+    paths: Iterable[str],
+    skip: Set[str],
+    concurrency: int = 8,
+    rate_limiter: Optional[RateLimiter] = None
+) -> AsyncIterator[Dict]:
+    """Analyze images concurrently, yielding results as they finish.
+
+    Images whose content hash is in ``skip`` (or already seen in this run)
+    are yielded with ``skipped`` set and never uploaded. ``paths`` is
+    consumed lazily by ``concurrency`` workers, so memory stays bounded
+    however many files there are.  ``rate_limiter`` is handed to the
+    generator as in :func:`run_batch`.
+    """
+    if rate_limiter is not None:
+        generator.rate_limiter = rate_limiter
+    paths = iter(paths)
+    seen = set(skip)
+    results: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    finished = object()
+
+    async def analyze(path: str) -> Dict:
+        start = time.monotonic()
+        result = {'path': path}
+        try:
+            data, digest = await asyncio.to_thread(_read_and_hash, path)
+            result['digest'] = digest
+            if digest in seen:
+                result['skipped'] = True
+                return result
+            seen.add(digest)
+            result['analysis'] = await generator.analyze_image(data, digest)
+            result['success'] = True
+        except Exception as e:
+            logger.error(f"Analysis of {path} failed: {str(e)}")
+            result['success'] = False
+            result['error'] = str(e)
+        result['elapsed'] = round(time.monotonic() - start, 3)
+        return result
+
+    async def worker():
+        for path in paths:
+            await results.put(await analyze(path))
+
+    async def run_workers():
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            await results.put(finished)
+
+    runner = asyncio.ensure_future(run_workers())
+    try:
+        while True:
+            result = await results.get()
+            if result is finished:
+                break
+            yield result
+        await runner
+    finally:
+        runner.cancel()
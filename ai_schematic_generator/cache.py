@@ -0,0 +1,258 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(model: str, prompt: str, max_tokens: int) -> str:
+    """Build a content-addressed key for an LLM request."""
+    payload = json.dumps(
+        {"model": model, "prompt": prompt, "max_tokens": max_tokens},
+        sort_keys=True,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    memory_hits: int = 0
+    disk_hits: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + SQLite) cache for LLM responses."""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024
+    ):
+        """Create a cache.
+
+        ``max_entries`` bounds the in-memory tier, ``path`` enables the on-disk
+        SQLite tier, ``ttl`` (seconds) expires entries in both tiers and
+        ``max_disk_bytes`` bounds the total size of the disk tier.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self.path = path
+        self.stats = CacheStats()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.commit()
+        logger.debug(f"Initialized response cache (path={path}, max_entries={max_entries})")
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for ``key`` or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self.stats.hits += 1
+                    self.stats.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created = row
+                    if not self._expired(created, now):
+                        self._db.execute(
+                            "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+                        )
+                        self._db.commit()
+                        self._remember(key, value, created)
+                        self.stats.hits += 1
+                        self.stats.disk_hits += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.stats.misses += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """Store ``value`` under ``key`` in every enabled tier."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value.encode('utf-8')), now, now)
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def _remember(self, key: str, value: str, created: float):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _evict_disk(self, now: float):
+        if self.ttl is not None:
+            cursor = self._db.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+            )
+            self.stats.evictions += max(cursor.rowcount, 0)
+
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        for key, size in self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed ASC"
+        ).fetchall():
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.stats.evictions += 1
+
+    def delete(self, key: str):
+        """Drop ``key`` from both tiers, if present."""
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self):
+        """Close the on-disk tier."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class RenderCache:
+    """Directory of rendered SVGs keyed by canonical netlist hash."""
+
+    def __init__(self, directory: str, max_bytes: int = 1024 * 1024 * 1024, link: bool = False):
+        """Create a render cache in ``directory``.
+
+        With ``link`` set, hits are hard-linked into place instead of copied;
+        callers must then treat the output file as read-only.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.link = link
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.svg")
+
+    def fetch(self, key: str, destination: str) -> bool:
+        """Place the cached SVG for ``key`` at ``destination`` if present."""
+        path = self._path(key)
+        try:
+            if not (os.path.exists(destination) and os.path.samefile(path, destination)):
+                if os.path.exists(destination):
+                    os.remove(destination)
+                directory = os.path.dirname(destination)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                if self.link:
+                    try:
+                        os.link(path, destination)
+                    except OSError:
+                        shutil.copyfile(path, destination)
+                else:
+                    shutil.copyfile(path, destination)
+            os.utime(path)
+        except FileNotFoundError:
+            # Missing, or evicted by another process while being placed.
+            with self._lock:
+                self.stats.misses += 1
+            return False
+        with self._lock:
+            self.stats.hits += 1
+            self.stats.disk_hits += 1
+        return True
+
+    def store(self, key: str, source: str):
+        """Copy a freshly rendered SVG into the cache."""
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(source, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.svg'):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.stats.evictions += 1
@@ -1,19 +1,29 @@
+"""Command line interface.
+
+``ai_schematics`` is often called in tight loops, so only click is imported
+at module load.  rich, the Anthropic SDK, schemdraw and NumPy are imported
+inside the commands that use them, which keeps ``--help`` and argument or
+API-key errors fast.
+"""
 import click
 import os
-import asyncio
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress
-from pathlib import Path
-from .ai_generator import AISchematicGenerator
+import sys
+import json
+from functools import lru_cache
+from .exporters import EXPORT_FORMATS
 
-console = Console()
+@lru_cache(maxsize=None)
+def get_console(stderr: bool = False):
+    """Return the shared rich console for stdout (or stderr)."""
+    from rich.console import Console
+    return Console(stderr=stderr)
 
 def check_api_key():
     """Check if the Anthropic API key is set."""
     api_key = os.getenv('ANTHROPIC_API_KEY')
     if not api_key:
-        console.print(Panel(
+        from rich.panel import Panel
+        get_console().print(Panel(
             "[red]ERROR: ANTHROPIC_API_KEY environment variable not set[/red]\n"
             "Please set your API key:\n"
             "export ANTHROPIC_API_KEY='your-api-key-here'",
@@ -22,6 +32,76 @@ def check_api_key():
         raise click.ClickException("API key not set")
     return api_key
 
+def run_async(coro):
+    """Run a coroutine to completion on the current (or a new) event loop."""
+    import asyncio
+    try:
+        loop = asyncio.get_event_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    return loop.run_until_complete(coro)
+
+def cache_options(cache_dir):
+    """Build generator cache keyword arguments for ``cache_dir``, if set.
+
+    Setting ``AI_SCHEMATICS_SIMILARITY_THRESHOLD`` also reuses answers to
+    similar descriptions, from an index kept in the same directory.
+    """
+    if not cache_dir:
+        return {}
+    from .cache import ResponseCache, RenderCache
+    options = {
+        'cache': ResponseCache(path=os.path.join(cache_dir, 'responses.sqlite3')),
+        'render_cache': RenderCache(os.path.join(cache_dir, 'renders')),
+    }
+    threshold = os.getenv('AI_SCHEMATICS_SIMILARITY_THRESHOLD')
+    if threshold:
+        from .similarity import SimilarityIndex
+        options['similarity'] = SimilarityIndex(float(threshold), os.path.join(cache_dir, 'similar.sqlite3'))
+    return options
+
+def print_profile(target=None):
+    """Print a per-stage timing breakdown of everything recorded so far."""
+    from rich.table import Table
+    from .metrics import METRICS, STAGES
+    snapshot = METRICS.snapshot()
+    table = Table(title="Pipeline Profile")
+    table.add_column("Stage")
+    table.add_column("Calls", justify="right")
+    table.add_column("Total (ms)", justify="right")
+    table.add_column("Mean (ms)", justify="right")
+    for stage in STAGES:
+        data = snapshot['stages'].get(stage)
+        if data:
+            table.add_row(stage, str(data['count']), f"{data['total'] * 1000:.1f}",
+                          f"{data['mean'] * 1000:.1f}")
+    for name, value in sorted(snapshot['counters'].items()):
+        table.add_row(name, f"{value:g}", "", "")
+    (target or get_console()).print(table)
+
+def delegate(socket_path, request, title, failure_title):
+    """Hand ``request`` to a running ``serve`` daemon and print its reply.
+
+    Returns False, having done nothing, when no daemon is listening.
+    """
+    from .daemon import DaemonUnavailable, default_socket_path, send_request
+    try:
+        reply = send_request(socket_path or default_socket_path(), request)
+    except DaemonUnavailable:
+        return False
+    from rich.panel import Panel
+    if not reply['success']:
+        get_console().print(Panel(f"[red]Error: {reply['error']}[/red]", title=failure_title))
+        raise click.ClickException(reply['error'])
+    get_console().print(Panel(reply['result'], title=title))
+    return True
+
+def socket_option(function):
+    """Add the ``--socket`` option shared by ``serve`` and its clients."""
+    return click.option('--socket', 'socket_path', envvar='AI_SCHEMATICS_SOCKET', default=None,
+                        help='Unix socket of the serve daemon (default: per-user runtime directory)')(function)
+
 @click.group()
 def cli():
     """AI-powered electronic schematic generator using Claude 3.5 Sonnet."""
@@ -30,60 +110,254 @@ def cli():
 @cli.command()
 @click.argument('description', type=str)
 @click.option('--output', '-o', default='schematic.svg', help='Output file path')
-def generate(description: str, output: str):
+@click.option('--format', 'output_format', type=click.Choice(list(EXPORT_FORMATS)), default='svg',
+              help='Draw an SVG or write a SPICE, KiCad or canonical JSON netlist')
+@click.option('--stream/--no-stream', default=False,
+              help='Stream the model response and build the schematic as it arrives')
+@click.option('--cache-dir', envvar='AI_SCHEMATICS_CACHE_DIR', default=None,
+              help='Directory for the on-disk response and render caches')
+@click.option('--auto-layout', is_flag=True,
+              help='Ask the model for topology only and compute placement and wiring locally')
+@click.option('--profile', is_flag=True, help='Print a timing breakdown by pipeline stage')
+@click.option('--no-daemon', is_flag=True, help='Always run in this process, even if a daemon is running')
+@socket_option
+def generate(description: str, output: str, output_format: str, stream: bool, cache_dir: str,
+             auto_layout: bool, profile: bool, no_daemon: bool, socket_path: str):
     """Generate a schematic from a natural language description."""
+    # Profiles are recorded where the work runs, so --profile stays in-process.
+    if not (no_daemon or profile) and delegate(socket_path, {
+        'command': 'generate',
+        'description': description,
+        'output': os.path.abspath(output),
+        'format': output_format,
+        'stream': stream,
+        'auto_layout': auto_layout,
+        'cache_dir': os.path.abspath(cache_dir) if cache_dir else None,
+    }, "Generation Complete", "Generation Failed"):
+        return
+    from rich.panel import Panel
     try:
         api_key = check_api_key()
-        generator = AISchematicGenerator(api_key)
+        from rich.progress import Progress
+        from .ai_generator import AISchematicGenerator
+        generator = AISchematicGenerator(api_key, layout=auto_layout, **cache_options(cache_dir))
         
         with Progress() as progress:
             task = progress.add_task("[cyan]Generating schematic...", total=100)
             progress.update(task, advance=50)
             
             async def generate_schematic():
-                return await generator.generate_schematic_from_description(
-                    description,
-                    output
-                )
+                async with generator:
+                    return await generator.generate_schematic_from_description(
+                        description,
+                        output,
+                        stream=stream,
+                        output_format=output_format
+                    )
             
             try:
-                loop = asyncio.get_event_loop()
-                result = loop.run_until_complete(generate_schematic())
+                result = run_async(generate_schematic())
                 progress.update(task, advance=50)
-                console.print(Panel(result, title="Generation Complete"))
+                get_console().print(Panel(result, title="Generation Complete"))
+                if profile:
+                    print_profile()
             except Exception as e:
                 raise click.ClickException(str(e))
                 
     except click.ClickException as e:
-        console.print(Panel(f"[red]Error: {str(e)}[/red]", title="Generation Failed"))
+        get_console().print(Panel(f"[red]Error: {str(e)}[/red]", title="Generation Failed"))
+        raise
+
+@cli.command('generate-batch')
+@click.argument('input_file', type=click.File('r'), default='-')
+@click.option('--format', 'input_format', type=click.Choice(['auto', 'jsonl', 'csv']),
+              default='auto', help='Input format (auto-detected from the file extension)')
+@click.option('--output-dir', '-d', default='schematics', help='Directory for generated schematics')
+@click.option('--results', '-r', type=click.File('w'), default='-',
+              help='Where to stream JSONL results (default: stdout)')
+@click.option('--concurrency', '-j', default=8, type=click.IntRange(min=1),
+              help='Maximum number of in-flight generations')
+@click.option('--rpm', type=click.IntRange(min=1), default=None, help='Requests per minute limit')
+@click.option('--tpm', type=click.IntRange(min=1), default=None, help='Tokens per minute limit')
+@click.option('--render-workers', type=click.IntRange(min=0), default=0,
+              help='Render in this many worker processes (0 renders in-process)')
+@click.option('--cache-dir', envvar='AI_SCHEMATICS_CACHE_DIR', default=None,
+              help='Directory for the on-disk response and render caches')
+@click.option('--auto-layout', is_flag=True,
+              help='Ask the model for topology only and compute placement and wiring locally')
+@click.option('--profile', is_flag=True, help='Print a timing breakdown by pipeline stage')
+def generate_batch(input_file, input_format: str, output_dir: str, results, concurrency: int,
+                   rpm: int, tpm: int, render_workers: int, cache_dir: str, auto_layout: bool,
+                   profile: bool):
+    """Generate schematics for every description in a JSONL/CSV file or stdin."""
+    from rich.panel import Panel
+    err_console = get_console(stderr=True)
+    try:
+        api_key = check_api_key()
+        from .ai_generator import AISchematicGenerator
+        from .batch import RateLimiter, read_batch_items, run_batch
+        from .render import RenderPool
+        if input_format == 'auto':
+            input_format = 'csv' if input_file.name.lower().endswith('.csv') else 'jsonl'
+        try:
+            items = read_batch_items(input_file, input_format, output_dir)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        renderer = RenderPool(render_workers) if render_workers else None
+        generator = AISchematicGenerator(api_key, renderer=renderer, layout=auto_layout,
+                                         **cache_options(cache_dir))
+        limiter = RateLimiter(rpm, tpm) if rpm or tpm else None
+
+        async def generate_all():
+            failed = 0
+            async with generator:
+                async for result in run_batch(generator, items, concurrency, limiter):
+                    failed += not result['success']
+                    results.write(json.dumps(result) + '\n')
+                    results.flush()
+            return failed
+
+        try:
+            failed = run_async(generate_all())
+        finally:
+            if renderer is not None:
+                renderer.shutdown()
+        err_console.print(f"Generated {len(items) - failed}/{len(items)} schematics")
+        if profile:
+            print_profile(err_console)
+        if failed:
+            sys.exit(1)
+
+    except click.ClickException as e:
+        err_console.print(Panel(f"[red]Error: {str(e)}[/red]", title="Batch Generation Failed"))
         raise
 
 @cli.command()
 @click.argument('image_path', type=click.Path(exists=True))
-def analyze(image_path: str):
-    """Analyze an existing schematic image."""
+@click.option('--cache-dir', envvar='AI_SCHEMATICS_CACHE_DIR', default=None,
+              help='Directory for the on-disk response cache (reused for identical images)')
+@click.option('--no-daemon', is_flag=True, help='Always run in this process, even if a daemon is running')
+@socket_option
+def analyze(image_path: str, cache_dir: str, no_daemon: bool, socket_path: str):
+    """Analyze an existing schematic image (PNG, JPEG, GIF, WebP or SVG)."""
+    if not no_daemon and delegate(socket_path, {
+        'command': 'analyze',
+        'image_path': os.path.abspath(image_path),
+        'cache_dir': os.path.abspath(cache_dir) if cache_dir else None,
+    }, "Schematic Analysis", "Analysis Failed"):
+        return
+    from rich.panel import Panel
     try:
         api_key = check_api_key()
-        generator = AISchematicGenerator(api_key)
+        from rich.progress import Progress
+        from .ai_generator import AISchematicGenerator
+        generator = AISchematicGenerator(api_key, **cache_options(cache_dir))
         
         with Progress() as progress:
             task = progress.add_task("[cyan]Analyzing schematic...", total=100)
             progress.update(task, advance=50)
             
             async def analyze_schematic():
-                return await generator.analyze_existing_schematic(image_path)
+                async with generator:
+                    return await generator.analyze_existing_schematic(image_path)
             
             try:
-                loop = asyncio.get_event_loop()
-                result = loop.run_until_complete(analyze_schematic())
+                result = run_async(analyze_schematic())
                 progress.update(task, advance=50)
-                console.print(Panel(result, title="Schematic Analysis"))
+                get_console().print(Panel(result, title="Schematic Analysis"))
             except Exception as e:
                 raise click.ClickException(str(e))
                 
     except click.ClickException as e:
-        console.print(Panel(f"[red]Error: {str(e)}[/red]", title="Analysis Failed"))
+        get_console().print(Panel(f"[red]Error: {str(e)}[/red]", title="Analysis Failed"))
         raise
 
+@cli.command('analyze-batch')
+@click.argument('sources', nargs=-1, required=True)
+@click.option('--results', '-r', required=True, type=click.Path(dir_okay=False),
+              help='JSONL file, or SQLite for .sqlite/.sqlite3/.db; images already analyzed there are skipped')
+@click.option('--concurrency', '-j', default=8, type=click.IntRange(min=1),
+              help='Maximum number of in-flight analyses')
+@click.option('--rpm', type=click.IntRange(min=1), default=None, help='Requests per minute limit')
+@click.option('--tpm', type=click.IntRange(min=1), default=None, help='Tokens per minute limit')
+@click.option('--cache-dir', envvar='AI_SCHEMATICS_CACHE_DIR', default=None,
+              help='Directory for the on-disk response cache')
+@click.option('--profile', is_flag=True, help='Print a timing breakdown by pipeline stage')
+def analyze_batch(sources, results: str, concurrency: int, rpm: int, tpm: int, cache_dir: str,
+                  profile: bool):
+    """Analyze every image in directories, glob patterns or files, resumably."""
+    from rich.panel import Panel
+    err_console = get_console(stderr=True)
+    try:
+        api_key = check_api_key()
+        from .ai_generator import AISchematicGenerator
+        from .batch import RateLimiter, find_images, open_result_store, run_analysis_batch
+        from .images import IMAGE_EXTENSIONS
+
+        store = open_result_store(results)
+        generator = AISchematicGenerator(api_key, **cache_options(cache_dir))
+        limiter = RateLimiter(rpm, tpm) if rpm or tpm else None
+        if store.done:
+            err_console.print(f"Resuming: {len(store.done)} images already analyzed")
+
+        async def analyze_all():
+            counts = {'analyzed': 0, 'skipped': 0, 'failed': 0}
+            async with generator:
+                async for result in run_analysis_batch(generator, find_images(sources, IMAGE_EXTENSIONS),
+                                                       store.done, concurrency, limiter):
+                    if result.get('skipped'):
+                        counts['skipped'] += 1
+                        continue
+                    counts['analyzed' if result['success'] else 'failed'] += 1
+                    store.add(result)
+            return counts
+
+        try:
+            counts = run_async(analyze_all())
+        finally:
+            store.close()
+        err_console.print(f"Analyzed {counts['analyzed']}, skipped {counts['skipped']}, "
+                          f"failed {counts['failed']}")
+        if profile:
+            print_profile(err_console)
+        if counts['failed']:
+            sys.exit(1)
+
+    except click.ClickException as e:
+        err_console.print(Panel(f"[red]Error: {str(e)}[/red]", title="Batch Analysis Failed"))
+        raise
+
+@cli.command()
+@socket_option
+@click.option('--cache-dir', envvar='AI_SCHEMATICS_CACHE_DIR', default=None,
+              help='Default directory for the on-disk response and render caches')
+@click.option('--render-workers', type=click.IntRange(min=0), default=0,
+              help='Render in this many worker processes (0 renders in-process)')
+def serve(socket_path: str, cache_dir: str, render_workers: int):
+    """Keep a warm process that generate and analyze hand their work to."""
+    err_console = get_console(stderr=True)
+    api_key = check_api_key()
+    from .ai_generator import AISchematicGenerator
+    from .daemon import SchematicDaemon, default_socket_path
+    from .render import RenderPool
+
+    socket_path = socket_path or default_socket_path()
+    renderer = RenderPool(render_workers) if render_workers else None
+
+    def factory(layout, request_cache_dir):
+        return AISchematicGenerator(api_key, renderer=renderer, layout=layout,
+                                    **cache_options(request_cache_dir or cache_dir))
+
+    daemon = SchematicDaemon(socket_path, factory)
+    err_console.print(f"Serving on {socket_path} (Ctrl+C to stop)")
+    try:
+        run_async(daemon.serve_forever())
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    finally:
+        if renderer is not None:
+            renderer.shutdown()
+
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,224 @@
+"""Warm background process for the CLI.
+
+``ai_schematics serve`` keeps the interpreter, the Anthropic SDK, schemdraw,
+the matplotlib font cache and the API connection pool alive between runs.
+``generate`` and ``analyze`` send their work to it over a Unix socket when it
+is listening and run in-process when it is not.  Each connection carries one
+request and one reply, both a single line of JSON.
+
+The client side only needs ``socket`` and ``json``; asyncio and the
+generator are imported by the server methods so delegating adds nothing to
+CLI startup.
+"""
+import json
+import logging
+import os
+import socket
+import stat
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Only for annotations: the client side must not import asyncio or the generator.
+    import asyncio
+
+    from .ai_generator import AISchematicGenerator
+
+logger = logging.getLogger(__name__)
+
+SOCKET_NAME = 'ai_schematics.sock'
+MAX_REQUEST_BYTES = 1 << 20
+
+
+class DaemonUnavailable(Exception):
+    """Raised when no daemon is listening on the socket."""
+
+
+def default_socket_path() -> str:
+    """Per-user socket path: ``$XDG_RUNTIME_DIR`` if set, else a private directory in the temp directory."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, SOCKET_NAME)
+    tmp = os.environ.get('TMPDIR') or '/tmp'
+    return os.path.join(tmp, f"ai_schematics-{os.getuid()}", SOCKET_NAME)
+
+
+def _owned_socket(path: str) -> bool:
+    """Whether ``path`` is a socket created by this user, not one planted by another."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def _prepare_directory(directory: str):
+    """Create ``directory`` (mode 0700) if needed; refuse one another user could swap the socket in."""
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.lstat(directory)
+    # Others may write to a shared directory only if it is sticky, as /tmp is.
+    shared = st.st_mode & (stat.S_IWGRP | stat.S_IWOTH) and not st.st_mode & stat.S_ISVTX
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid not in (0, os.getuid()) or shared:
+        raise RuntimeError(f"Refusing to listen in {directory}: it is not private to this user")
+
+
+def send_request(socket_path: str, request: Dict) -> Dict:
+    """Send ``request`` to the daemon at ``socket_path`` and return its reply.
+
+    Raises :class:`DaemonUnavailable` if nothing is listening, or if the
+    socket is not one this user created, so the caller can fall back to
+    running the work itself.  A daemon that dies after accepting the request
+    raises ``ConnectionError`` instead, since the work may already have been
+    done.
+    """
+    if not socket_path or not os.path.exists(socket_path):
+        raise DaemonUnavailable(socket_path)
+    if not _owned_socket(socket_path):
+        logger.warning(f"Ignoring {socket_path}: not a socket owned by this user")
+        raise DaemonUnavailable(socket_path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError as e:
+        sock.close()
+        raise DaemonUnavailable(socket_path) from e
+    with sock:
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    if not chunks:
+        raise ConnectionError(f"Daemon on {socket_path} closed the connection without replying")
+    return json.loads(b''.join(chunks))
+
+
+def daemon_listening(socket_path: str) -> bool:
+    """Return whether a daemon answers on ``socket_path``."""
+    try:
+        return send_request(socket_path, {'command': 'ping'}).get('success', False)
+    except (DaemonUnavailable, ConnectionError, ValueError):
+        return False
+
+
+class SchematicDaemon:
+    """Serve ``generate`` and ``analyze`` requests from one warm process."""
+
+    def __init__(self, socket_path: str, factory: Callable[[bool, Optional[str]], 'AISchematicGenerator']):
+        """Create a daemon listening on ``socket_path``.
+
+        ``factory(layout, cache_dir)`` builds an :class:`AISchematicGenerator`;
+        one is kept per combination a client asks for, so every request after
+        the first reuses its connection pool and caches.
+        """
+        self.socket_path = socket_path
+        self.factory = factory
+        self._generators: Dict[Tuple[bool, Optional[str]], 'AISchematicGenerator'] = {}
+        self._stopped: Optional['asyncio.Event'] = None
+
+    def _generator(self, layout: bool, cache_dir: Optional[str]):
+        key = (layout, cache_dir)
+        generator = self._generators.get(key)
+        if generator is None:
+            generator = self._generators[key] = self.factory(layout, cache_dir)
+        return generator
+
+    @staticmethod
+    def warm_up():
+        """Import the renderer and build the matplotlib font cache up front."""
+        from .schematic_generator import Component, SchematicGenerator
+        generator = SchematicGenerator()
+        generator.add_component(Component('resistor', 'R1', '1k'))
+        generator.drawing.get_imagedata('svg')
+
+    async def handle(self, request: Dict) -> Dict:
+        """Run one request and return the reply to send back."""
+        command = request.get('command')
+        try:
+            if command == 'ping':
+                result = 'pong'
+            elif command == 'generate':
+                generator = self._generator(bool(request.get('auto_layout')), request.get('cache_dir'))
+                result = await generator.generate_schematic_from_description(
+                    request['description'],
+                    request['output'],
+                    stream=bool(request.get('stream')),
+                    output_format=request.get('format', 'svg')
+                )
+            elif command == 'analyze':
+                generator = self._generator(False, request.get('cache_dir'))
+                result = await generator.analyze_existing_schematic(request['image_path'])
+            else:
+                raise ValueError(f"Unknown command: {command}")
+        except Exception as e:
+            logger.error(f"Daemon request {command} failed: {str(e)}")
+            return {'success': False, 'error': str(e)}
+        return {'success': True, 'result': result}
+
+    async def _handle_connection(self, reader: 'asyncio.StreamReader', writer: 'asyncio.StreamWriter'):
+        import asyncio
+        try:
+            line = await reader.readline()
+            try:
+                request = json.loads(line)
+            except ValueError:
+                reply = {'success': False, 'error': 'Malformed request'}
+            else:
+                reply = await self.handle(request)
+            writer.write(json.dumps(reply).encode('utf-8') + b'\n')
+            await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            logger.warning(f"Dropped daemon connection: {str(e)}")
+        finally:
+            writer.close()
+
+    def stop(self):
+        """Ask :meth:`serve_forever` to return; safe to call from a signal handler."""
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def serve_forever(self):
+        """Listen until :meth:`stop` is called or SIGINT/SIGTERM arrives."""
+        import asyncio
+        import signal
+        if daemon_listening(self.socket_path):
+            raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+        _prepare_directory(os.path.dirname(os.path.abspath(self.socket_path)))
+        if os.path.lexists(self.socket_path):
+            if os.lstat(self.socket_path).st_uid != os.getuid():
+                raise RuntimeError(f"{self.socket_path} belongs to another user")
+            # Left behind by a daemon that did not shut down cleanly.
+            os.unlink(self.socket_path)
+        self.warm_up()
+        self._stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        # Bind with the final permissions; a chmod afterwards would leave a window.
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(
+                self._handle_connection, path=self.socket_path, limit=MAX_REQUEST_BYTES
+            )
+        finally:
+            os.umask(umask)
+        signals = []
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+                signals.append(signum)
+            except (NotImplementedError, RuntimeError, ValueError):
+                # Not on the main thread (as in tests); stop() still works.
+                pass
+        logger.info(f"Daemon listening on {self.socket_path}")
+        try:
+            async with server:
+                await self._stopped.wait()
+        finally:
+            for signum in signals:
+                loop.remove_signal_handler(signum)
+            for generator in self._generators.values():
+                await generator.aclose()
+            self._generators.clear()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            logger.info("Daemon stopped")
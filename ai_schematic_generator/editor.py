@@ -0,0 +1,324 @@
+"""Incremental editing of a rendered schematic.
+
+:class:`SchematicEditor` keeps one :class:`SchematicGenerator` alive across
+edits and caches the SVG fragment of every component (its ``<use>`` and
+label) and every connection (its wire ``<path>``).  An edit only marks the
+elements it touches as dirty: changing a value redraws one label, moving a
+part also redraws the wires attached to it.  :meth:`SchematicEditor.flush`
+returns just the changed fragments, keyed by their SVG ``id``, for clients
+that patch a displayed document in place; :meth:`SchematicEditor.render`
+reassembles the full SVG from the cache.
+
+Output always uses the shared-symbol writer of :mod:`.svg_writer`, whatever
+the component count, since that is what can be updated piecewise.
+"""
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .exporters import output_filename
+from .metrics import METRICS
+from .schematic_generator import ELEMENT_FACTORIES, Component, SchematicGenerator, replace_file
+from .svg_writer import (
+    Box, label_element, part_extent, part_symbol, svg_document, symbol_def, use_element, view_box,
+    wire_path
+)
+from .validation import UPDATE_FIELDS, SchematicValidationError, validate_patch
+
+logger = logging.getLogger(__name__)
+
+WireKey = Tuple[str, str]
+
+
+def _encode_id(component_id: str) -> str:
+    # Element ids join component ids with "-", so it must not appear inside one.
+    return component_id.replace('%', '%25').replace('-', '%2D')
+
+
+def component_element_id(component_id: str) -> str:
+    """SVG ``id`` of a component's ``<use>``."""
+    return f"c-{_encode_id(component_id)}"
+
+
+def label_element_id(component_id: str) -> str:
+    """SVG ``id`` of a component's label ``<text>``."""
+    return f"{component_element_id(component_id)}-label"
+
+
+def wire_element_id(key: WireKey) -> str:
+    """SVG ``id`` of the wire ``<path>`` of a connection."""
+    return f"w-{_encode_id(key[0])}-{_encode_id(key[1])}"
+
+
+def _wire_key(start: str, end: str) -> WireKey:
+    # Wires are undirected; one key per pair regardless of direction.
+    return (start, end) if start <= end else (end, start)
+
+
+@dataclass
+class RenderDelta:
+    """SVG fragments changed since the previous flush.
+
+    ``updated`` maps element ids to their new markup (added or changed),
+    ``removed`` lists element ids to delete.  ``view_box`` is the new
+    ``viewBox`` attribute and ``defs`` the ``<symbol>`` markup of any
+    component type not drawn before.
+    """
+    updated: Dict[str, str] = field(default_factory=dict)
+    removed: List[str] = field(default_factory=list)
+    defs: List[str] = field(default_factory=list)
+    view_box: Optional[str] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.updated or self.removed or self.defs)
+
+
+class SchematicEditor:
+    """Apply small edits to a schematic and re-render only what they touch."""
+
+    def __init__(self, schematic: Optional[SchematicGenerator] = None):
+        """Edit ``schematic`` (a new empty one if omitted); it is modified in place."""
+        self.schematic = schematic or SchematicGenerator()
+        # Component id -> (<use>, <text>) markup, symbol name and extent with its label.
+        self._parts: Dict[str, Tuple[str, str, str, Box]] = {}
+        # Wire key -> (<path> markup, extent of its points).
+        self._wires: Dict[WireKey, Tuple[str, Box]] = {}
+        self._defs: Dict[str, str] = {}
+        self._dirty_parts: Set[str] = set(self.netlist.ids)
+        self._dirty_wires: Set[WireKey] = {_wire_key(*pair) for pair in self.schematic.connections}
+        self._removed: Set[str] = set()
+        self._bounds: Box = (0.0, 0.0, 0.0, 0.0)
+
+    @classmethod
+    def from_json(cls, json_str: str) -> 'SchematicEditor':
+        """Start editing the schematic described by ``json_str``."""
+        schematic = SchematicGenerator()
+        schematic.from_json(json_str)
+        return cls(schematic)
+
+    @property
+    def netlist(self):
+        return self.schematic.netlist
+
+    def _touch_wires(self, component_id: str):
+        """Mark the wires of ``component_id`` dirty and drop their stale routes."""
+        for other in self.netlist.neighbours(component_id):
+            key = _wire_key(component_id, other)
+            self._dirty_wires.add(key)
+            self.schematic.routes.pop(key, None)
+            self.schematic.routes.pop(key[::-1], None)
+
+    def add_component(self, component: Component):
+        """Add a component, or replace the one with the same id."""
+        if component.id in self.netlist.index:
+            self.update_component(component.id, type=component.type, value=component.value,
+                                  position=component.position, rotation=component.rotation)
+            return
+        self.schematic.add_component(component)
+        self._dirty_parts.add(component.id)
+        self._removed.discard(component.id)
+
+    def update_component(self, component_id: str, **changes: Any):
+        """Change some of ``type``, ``value``, ``position`` and ``rotation`` of a component."""
+        unknown = set(changes) - set(UPDATE_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot update {', '.join(sorted(unknown))} of a component")
+        current = self.schematic.components[component_id]
+        updated = Component(
+            type=changes.get('type', current.type),
+            id=component_id,
+            value=changes.get('value', current.value),
+            position=tuple(changes.get('position', current.position)),
+            rotation=changes.get('rotation', current.rotation)
+        )
+        if updated == current:
+            return
+        self.schematic.add_component(updated)
+        self._dirty_parts.add(component_id)
+        if updated.position != current.position or updated.rotation != current.rotation:
+            self._touch_wires(component_id)
+
+    def remove_component(self, component_id: str):
+        """Remove a component and every connection to it."""
+        neighbours = self.netlist.neighbours(component_id) if component_id in self.netlist.index else []
+        self.schematic.remove_component(component_id)
+        self._dirty_parts.discard(component_id)
+        self._removed.add(component_id)
+        for other in neighbours:
+            key = _wire_key(component_id, other)
+            self._dirty_wires.add(key)
+
+    def add_connection(self, start: str, end: str):
+        """Connect two components."""
+        self.schematic.add_connection(start, end)
+        self._dirty_wires.add(_wire_key(start, end))
+
+    def remove_connection(self, start: str, end: str) -> bool:
+        """Disconnect two components; return False if they were not connected."""
+        if not self.schematic.remove_connection(start, end):
+            return False
+        self._dirty_wires.add(_wire_key(start, end))
+        return True
+
+    def _component_dicts(self) -> Dict[str, Dict]:
+        return {
+            component_id: {
+                'type': component.type, 'id': component_id, 'value': component.value,
+                'position': list(component.position), 'rotation': component.rotation,
+            }
+            for component_id, component in self.schematic.components.items()
+        }
+
+    def apply_patch(self, ops: Any) -> List[Dict]:
+        """Apply a list of edit operations, all or nothing, and return them.
+
+        Each operation is an object with an ``op`` of ``add`` (with a
+        ``component`` object), ``update`` (``id`` plus the fields to change),
+        ``remove`` (``id``), ``connect`` or ``disconnect`` (``start`` and
+        ``end``).  ``ops`` may also be its JSON text.  The whole patch is
+        validated before anything changes; problems raise
+        :class:`SchematicValidationError`.
+        """
+        document = None
+        if isinstance(ops, str):
+            document = ops
+            ops = json.loads(ops)
+        issues = validate_patch(ops, self._component_dicts(), ELEMENT_FACTORIES)
+        if issues:
+            raise SchematicValidationError(issues, document)
+        for op in ops:
+            kind = op['op']
+            if kind == 'add':
+                self.add_component(Component.from_dict(op['component']))
+            elif kind == 'update':
+                self.update_component(op['id'], **{name: op[name] for name in UPDATE_FIELDS if name in op})
+            elif kind == 'remove':
+                self.remove_component(op['id'])
+            elif kind == 'connect':
+                self.add_connection(op['start'], op['end'])
+            else:
+                self.remove_connection(op['start'], op['end'])
+        logger.debug(f"Applied {len(ops)} edit operations")
+        return ops
+
+    def _wire_segments(self, key: WireKey) -> List[Tuple[Tuple[float, float], Tuple[float, float]]]:
+        routes = self.schematic.routes
+        route = routes.get(key) or routes.get(key[::-1])
+        if route:
+            return list(zip(route, route[1:]))
+        netlist = self.netlist
+        start, end = (tuple(netlist.positions[netlist.index[component_id]].tolist()) for component_id in key)
+        return [(start, end)]
+
+    def flush(self) -> RenderDelta:
+        """Redraw the dirty elements into the fragment cache and return what changed.
+
+        Only dirty parts and wires are measured.  The drawing bounds grow to
+        take in what was redrawn and are only recomputed from the cached
+        extents when an element that touched them moved or went away.
+        """
+        delta = RenderDelta()
+        netlist = self.netlist
+        bounds = self._bounds
+        # Extents of redrawn elements, and whether a stale extent touched the bounds.
+        grown: List[Box] = []
+        rescan = not (self._parts or self._wires)
+
+        def on_edge(box: Box) -> bool:
+            return box[0] <= bounds[0] or box[1] <= bounds[1] or box[2] >= bounds[2] or box[3] >= bounds[3]
+
+        with METRICS.timer('render'):
+            for component_id in self._removed:
+                previous = self._parts.pop(component_id, None)
+                if previous is not None:
+                    delta.removed.extend((component_element_id(component_id), label_element_id(component_id)))
+                    rescan = rescan or on_edge(previous[3])
+            self._removed.clear()
+
+            for component_id in self._dirty_parts:
+                i = netlist.index[component_id]
+                position = tuple(netlist.positions[i].tolist())
+                name, geometry = part_symbol(netlist.type_names[netlist.types[i]], float(netlist.rotations[i]),
+                                             ELEMENT_FACTORIES)
+                if name not in self._defs:
+                    self._defs[name] = symbol_def(name, geometry)
+                    delta.defs.append(self._defs[name])
+                anchor, extent = part_extent(geometry[2], position)
+                element_id = component_element_id(component_id)
+                use = use_element(name, position, element_id)
+                label = label_element(component_id, netlist.values[i], anchor, label_element_id(component_id))
+                previous = self._parts.get(component_id)
+                self._parts[component_id] = (use, label, name, extent)
+                if previous is None or use != previous[0]:
+                    delta.updated[element_id] = use
+                if previous is None or label != previous[1]:
+                    delta.updated[label_element_id(component_id)] = label
+                if previous is not None and previous[3] != extent:
+                    rescan = rescan or on_edge(previous[3])
+                grown.append(extent)
+            self._dirty_parts.clear()
+
+            for key in self._dirty_wires:
+                element_id = wire_element_id(key)
+                connected = (all(component_id in netlist.index for component_id in key)
+                             and key[1] in netlist.neighbours(key[0]))
+                stale = self._wires.get(key)
+                if stale is not None and not connected:
+                    del self._wires[key]
+                    delta.removed.append(element_id)
+                    rescan = rescan or on_edge(stale[1])
+                if not connected:
+                    continue
+                segments = self._wire_segments(key)
+                xs = [x for start, end in segments for x in (start[0], end[0])]
+                ys = [y for start, end in segments for y in (start[1], end[1])]
+                path = wire_path(segments, element_id)
+                extent = (min(xs), min(ys), max(xs), max(ys))
+                self._wires[key] = (path, extent)
+                if stale is None or stale[0] != path:
+                    delta.updated[element_id] = path
+                if stale is not None and stale[1] != extent:
+                    rescan = rescan or on_edge(stale[1])
+                grown.append(extent)
+            self._dirty_wires.clear()
+
+            if rescan:
+                self._bounds = self._full_bounds()
+            elif grown:
+                self._bounds = (min([bounds[0]] + [box[0] for box in grown]),
+                                min([bounds[1]] + [box[1] for box in grown]),
+                                max([bounds[2]] + [box[2] for box in grown]),
+                                max([bounds[3]] + [box[3] for box in grown]))
+            delta.view_box = view_box(self._bounds)
+        if delta:
+            METRICS.inc('incremental_updates', len(delta.updated) + len(delta.removed))
+        return delta
+
+    def _full_bounds(self) -> Box:
+        """Extent of every cached part and wire."""
+        boxes = [part[3] for part in self._parts.values()] + [box for _, box in self._wires.values()]
+        if not boxes:
+            return (0.0, 0.0, 0.0, 0.0)
+        return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+    def render(self) -> bytes:
+        """The full SVG, redrawing only the elements changed since the last render."""
+        self.flush()
+        used = {part[2] for part in self._parts.values()}
+        return svg_document(
+            self._bounds,
+            (self._defs[name] for name in sorted(used)),
+            (path for path, _ in self._wires.values()),
+            (self._parts[component_id][0] for component_id in self.netlist.ids),
+            (self._parts[component_id][1] for component_id in self.netlist.ids)
+        )
+
+    def save(self, filename: str) -> str:
+        """Write :meth:`render` to ``filename`` (as .svg) and return the path written."""
+        filename = output_filename(filename, 'svg')
+        data = self.render()
+        with METRICS.timer('file_write'):
+            replace_file(filename, data)
+        return filename
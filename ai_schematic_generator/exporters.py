@@ -0,0 +1,194 @@
+"""Connectivity exports that skip drawing entirely.
+
+The JSON schema connects components rather than pins, so nets are derived
+with a fixed convention: a connection leaves its ``start`` component from
+that part's output pin and enters its ``end`` component at its input pin.
+For two-terminal parts those are pins 2 and 1 (cathode and anode for
+diodes); for transistors they are the collector and the base, and the
+emitter is left on its own net.  Every pin that nothing connects to gets a
+net of its own so SPICE and KiCad see a complete netlist.
+"""
+import json
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Only for annotations: the CLI imports EXPORT_FORMATS without NumPy.
+    from .netlist import Netlist
+
+# Output format -> default file extension.
+EXPORT_FORMATS = {
+    'svg': '.svg',
+    'spice': '.cir',
+    'kicad': '.net',
+    'json': '.json',
+}
+
+MIMETYPES = {
+    'svg': 'image/svg+xml',
+    'spice': 'text/plain',
+    'kicad': 'text/plain',
+    'json': 'application/json',
+}
+
+
+@dataclass(frozen=True)
+class PartSpec:
+    prefix: str
+    kicad_part: str
+    # KiCad pin numbers in SPICE node order.
+    pins: Tuple[str, ...]
+    input_pin: int
+    output_pin: int
+    model: Optional[str] = None
+
+
+PART_SPECS: Dict[str, PartSpec] = {
+    'resistor': PartSpec('R', 'R', ('1', '2'), 0, 1),
+    'capacitor': PartSpec('C', 'C', ('1', '2'), 0, 1),
+    'inductor': PartSpec('L', 'L', ('1', '2'), 0, 1),
+    # SPICE order is anode, cathode; KiCad's Device:D has K on pin 1.
+    'diode': PartSpec('D', 'D', ('2', '1'), 0, 1, model='D'),
+    # SPICE order is collector, base, emitter; Q_NPN_BCE is B=1, C=2, E=3.
+    'transistor': PartSpec('Q', 'Q_NPN_BCE', ('2', '1', '3'), 1, 0, model='NPN'),
+}
+
+
+def output_filename(filename: str, output_format: str = 'svg') -> str:
+    """Return ``filename`` with its extension forced to that of ``output_format``."""
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {output_format}")
+    extension = EXPORT_FORMATS[output_format]
+    base, ext = os.path.splitext(filename)
+    if not ext or ext.lower() != extension:
+        filename = base + extension
+    return filename
+
+
+def build_nets(netlist: 'Netlist') -> Tuple[List[List[str]], List[List[Tuple[int, int]]]]:
+    """Derive nets from component-level connections.
+
+    Returns ``(pin_nets, nets)``: the net name of every pin of every
+    component (in SPICE node order) and the ``(component, pin)`` members of
+    every net, both ordered by first appearance.
+    """
+    specs = [PART_SPECS[netlist.type_names[code]] for code in netlist.types.tolist()]
+    offsets = [0]
+    for spec in specs:
+        offsets.append(offsets[-1] + len(spec.pins))
+    parent = list(range(offsets[-1]))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for a, b in netlist.edges.tolist():
+        x = find(offsets[a] + specs[a].output_pin)
+        y = find(offsets[b] + specs[b].input_pin)
+        if x != y:
+            parent[max(x, y)] = min(x, y)
+
+    names: Dict[int, int] = {}
+    nets: List[List[Tuple[int, int]]] = []
+    pin_nets: List[List[str]] = []
+    for i, spec in enumerate(specs):
+        row = []
+        for pin in range(len(spec.pins)):
+            root = find(offsets[i] + pin)
+            if root not in names:
+                names[root] = len(nets)
+                nets.append([])
+            nets[names[root]].append((i, pin))
+            row.append(f"N{names[root] + 1}")
+        pin_nets.append(row)
+    return pin_nets, nets
+
+
+def _spice_name(prefix: str, component_id: str) -> str:
+    return component_id if component_id[:1].upper() == prefix else prefix + component_id
+
+
+def to_spice(netlist: 'Netlist', title: str = 'ai-schematic-generator netlist') -> str:
+    """Return a SPICE netlist; parts without a value get 1 (or a default model)."""
+    pin_nets, _ = build_nets(netlist)
+    lines = [f"* {title}"]
+    models = set()
+    for i, component_id in enumerate(netlist.ids):
+        spec = PART_SPECS[netlist.type_names[netlist.types[i]]]
+        value = netlist.values[i]
+        if spec.model is not None and not value:
+            value = spec.model
+            models.add(spec.model)
+        lines.append(" ".join([_spice_name(spec.prefix, component_id)] + pin_nets[i] + [value or '1']))
+    for model in sorted(models):
+        lines.append(f".model {model} {model}")
+    lines.append(".end")
+    return "\n".join(lines) + "\n"
+
+
+def _quote(text: str) -> str:
+    return '"' + str(text).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def to_kicad(netlist: 'Netlist') -> str:
+    """Return a KiCad (version E) S-expression netlist."""
+    _, nets = build_nets(netlist)
+    specs = [PART_SPECS[netlist.type_names[code]] for code in netlist.types.tolist()]
+    lines = ['(export (version "E")', '  (design (tool "ai-schematic-generator"))', '  (components']
+    for i, component_id in enumerate(netlist.ids):
+        lines.append(
+            f'    (comp (ref {_quote(component_id)}) (value {_quote(netlist.values[i] or "~")})'
+            f' (libsource (lib "Device") (part {_quote(specs[i].kicad_part)})))'
+        )
+    lines.append('  )')
+    lines.append('  (nets')
+    for code, members in enumerate(nets, start=1):
+        nodes = " ".join(
+            f'(node (ref {_quote(netlist.ids[i])}) (pin {_quote(specs[i].pins[pin])}))'
+            for i, pin in members
+        )
+        lines.append(f'    (net (code "{code}") (name "N{code}") {nodes})')
+    lines.append('  )')
+    lines.append(')')
+    return "\n".join(lines) + "\n"
+
+
+def to_json(netlist: 'Netlist') -> str:
+    """Return the netlist as canonical JSON: sorted keys, components and connections."""
+    positions = netlist.positions.tolist()
+    rotations = netlist.rotations.tolist()
+    components = sorted(
+        (
+            {
+                'type': netlist.type_names[code],
+                'id': component_id,
+                'value': netlist.values[i],
+                'position': positions[i],
+                'rotation': rotations[i],
+            }
+            for i, (component_id, code) in enumerate(zip(netlist.ids, netlist.types.tolist()))
+        ),
+        key=lambda component: component['id']
+    )
+    connections = [{'start': start, 'end': end} for start, end in sorted(netlist.connection_pairs())]
+    return json.dumps({'components': components, 'connections': connections},
+                      sort_keys=True, separators=(',', ':'))
+
+
+EXPORTERS = {
+    'spice': to_spice,
+    'kicad': to_kicad,
+    'json': to_json,
+}
+
+
+def export_netlist(netlist: 'Netlist', output_format: str) -> str:
+    """Serialise ``netlist`` in one of the text formats of :data:`EXPORTERS`."""
+    try:
+        exporter = EXPORTERS[output_format]
+    except KeyError:
+        raise ValueError(f"Unknown export format: {output_format}")
+    return exporter(netlist)
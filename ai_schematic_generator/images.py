@@ -0,0 +1,170 @@
+"""Prepare schematic images for the Messages API.
+
+Inputs are identified by their content rather than their file extension.
+Raster images larger than the model can use are downscaled and recompressed
+with Pillow, SVGs are rasterised with cairosvg, and the result is
+base64-encoded with its real media type.  Both libraries are optional:
+without Pillow raster images are sent as they are (if the API accepts their
+size), and without cairosvg an SVG is sent as markup in a text block.
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from .metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Images are resized by the API beyond about 1.15 megapixels or 1568 px on
+# the long edge, so larger uploads only cost bandwidth and latency.
+MAX_EDGE = 1568
+MAX_PIXELS = 1_150_000
+# An image costs about width * height / 750 input tokens.
+MAX_IMAGE_TOKENS = MAX_PIXELS // 750
+# Hard limit for one base64 image in a Messages API request.
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+JPEG_QUALITY = 85
+SVG_SNIFF_BYTES = 4096
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg')
+
+
+def detect_media_type(data: bytes) -> Optional[str]:
+    """Return the media type of ``data`` from its magic bytes, or None."""
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    head = data[:SVG_SNIFF_BYTES].lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if head.startswith(b'<') and b'<svg' in head:
+        return 'image/svg+xml'
+    return None
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    """An image ready to send; ``data`` is base64 unless ``media_type`` is SVG."""
+    media_type: str
+    data: str
+    digest: str
+    original_bytes: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+    def content_block(self) -> Dict:
+        """The Messages API content block for this image."""
+        if self.media_type == 'image/svg+xml':
+            return {"type": "text", "text": f"Schematic SVG source:\n{self.data}"}
+        return {
+            "type": "image",
+            "source": {"type": "base64", "media_type": self.media_type, "data": self.data},
+        }
+
+
+def _target_size(width: int, height: int):
+    scale = min(1.0, MAX_EDGE / max(width, height), math.sqrt(MAX_PIXELS / (width * height)))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _shrink(data: bytes, media_type: str):
+    """Downscale and recompress ``data``; returns ``(data, media_type, width, height)``."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise ValueError(
+                f"Image is {len(data)} bytes, over the {MAX_UPLOAD_BYTES} byte API limit; "
+                "install Pillow to downscale it"
+            )
+        return data, media_type, None, None
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        width, height = image.size
+        size = _target_size(width, height)
+        if size == (width, height) and len(data) <= MAX_UPLOAD_BYTES:
+            return data, media_type, width, height
+        if size != (width, height):
+            image = image.resize(size, Image.LANCZOS)
+        out = io.BytesIO()
+        if media_type == 'image/jpeg':
+            image.convert('RGB').save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+        else:
+            # Line art compresses better as PNG than as lossy JPEG.
+            if image.mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA'):
+                image = image.convert('RGBA')
+            image.save(out, 'PNG', optimize=True)
+            media_type = 'image/png'
+        return out.getvalue(), media_type, size[0], size[1]
+
+
+def _rasterize_svg(data: bytes) -> Optional[bytes]:
+    try:
+        import cairosvg
+    except ImportError:
+        return None
+    return cairosvg.svg2png(bytestring=data, background_color='white')
+
+
+def image_digest(data: bytes) -> str:
+    """Content hash used to cache prepared images and analyses."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def prepare_image(data: bytes, digest: Optional[str] = None) -> PreparedImage:
+    """Detect, rasterise, downscale and encode one image.
+
+    CPU-bound; :class:`ImagePreprocessor` runs it off the event loop.
+    Raises ValueError for formats the API cannot take.
+    """
+    digest = digest or image_digest(data)
+    original_bytes = len(data)
+    media_type = detect_media_type(data)
+    if media_type is None:
+        raise ValueError("Unsupported image format: expected PNG, JPEG, GIF, WebP or SVG")
+    with METRICS.timer('image_prepare'):
+        if media_type == 'image/svg+xml':
+            png = _rasterize_svg(data)
+            if png is None:
+                logger.info("cairosvg is not installed; sending SVG markup as text")
+                return PreparedImage(media_type, data.decode('utf-8', errors='replace'), digest, original_bytes)
+            data, media_type = png, 'image/png'
+        encoded, media_type, width, height = _shrink(data, media_type)
+    logger.debug(f"Prepared {media_type} image: {original_bytes} -> {len(encoded)} bytes")
+    return PreparedImage(media_type, base64.b64encode(encoded).decode('ascii'), digest,
+                         original_bytes, width, height)
+
+
+class ImagePreprocessor:
+    """Prepare images on worker threads, remembering recent results by content hash."""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._prepared: 'OrderedDict[str, PreparedImage]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def prepare(self, data: bytes, digest: Optional[str] = None) -> PreparedImage:
+        """Return the prepared form of ``data``, computing it in a thread if needed."""
+        if digest is None:
+            digest = await asyncio.to_thread(image_digest, data)
+        with self._lock:
+            image = self._prepared.get(digest)
+            if image is not None:
+                self._prepared.move_to_end(digest)
+                return image
+        image = await asyncio.to_thread(prepare_image, data, digest)
+        with self._lock:
+            self._prepared[digest] = image
+            while len(self._prepared) > self.max_entries:
+                self._prepared.popitem(last=False)
+        return image
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from .ai_generator import normalize_description
+from .exporters import EXPORT_FORMATS
+from .artifacts import ArtifactStore
+from .pool import GeneratorPool, Tenant
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ('succeeded', 'failed')
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another job."""
+
+
+class TenantQuotaError(QueueFullError):
+    """Raised when a tenant already has as many jobs as its quota allows."""
+
+# Jobs submitted without a tenant share this one.
+DEFAULT_TENANT = Tenant('default')
+
+
+@dataclass
+class Job:
+    id: str
+    description: str
+    output_file: str
+    output_format: str = 'svg'
+    tenant: str = DEFAULT_TENANT.name
+    artifact: Optional[str] = None
+    status: str = 'queued'
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    version: int = 0
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATES
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'status': self.status,
+            'description': self.description,
+            'format': self.output_format,
+            'artifact': self.artifact,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class JobQueue:
+    """Bounded in-process queue that runs generations on a background event loop."""
+
+    def __init__(
+        self,
+        generator,
+        output_dir: str,
+        workers: int = 4,
+        max_queue: int = 100,
+        retention: float = 3600.0,
+        artifacts: Optional[ArtifactStore] = None
+    ):
+        """Create a queue that renders into ``output_dir``.
+
+        ``generator`` is either one generator shared by every job or a
+        :class:`~.pool.GeneratorPool` that lends each job an instance for
+        its tenant. ``workers`` generations run at once and at most
+        ``max_queue`` jobs may wait behind them. Finished jobs are forgotten
+        after ``retention`` seconds. With ``artifacts``, each result is moved
+        into that store under its netlist hash and named on the job instead
+        of being kept in ``output_dir``. The worker thread starts on the
+        first submission.
+        """
+        self.generator = generator
+        self.output_dir = output_dir
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retention = retention
+        self.artifacts = artifacts
+        self._jobs: Dict[str, Job] = {}
+        self._inflight: Dict[Tuple[str, str, str], Job] = {}
+        self._tenants: Dict[str, Tenant] = {}
+        self._active: Dict[str, int] = {}
+        self._pending = 0
+        self._changed = threading.Condition()
+        self._loop = None
+        self._queue = None
+        self._tasks = []
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+            ready.set()
+            loop.run_forever()
+            loop.close()
+
+        self._thread = threading.Thread(target=run, name='schematic-jobs', daemon=True)
+        self._thread.start()
+        ready.wait()
+        logger.info(f"Started job queue with {self.workers} workers")
+
+    def submit(self, description: str, output_format: str = 'svg', tenant: Tenant = DEFAULT_TENANT) -> Job:
+        """Queue a generation, or return the tenant's in-flight job for the same description and format.
+
+        Raises :class:`TenantQuotaError` if ``tenant`` already has
+        ``max_queued`` unfinished jobs.
+        """
+        if output_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {output_format}")
+        key = (tenant.name, output_format, normalize_description(description))
+        with self._changed:
+            self._ensure_started()
+            self._purge()
+            existing = self._inflight.get(key)
+            if existing is not None:
+                logger.debug(f"Merged request into in-flight job {existing.id}")
+                return existing
+            if self._pending >= self.max_queue:
+                raise QueueFullError("Job queue is full")
+            if self._active.get(tenant.name, 0) >= tenant.max_queued:
+                raise TenantQuotaError(f"Tenant {tenant.name} has too many unfinished jobs")
+            job_id = uuid.uuid4().hex
+            job = Job(
+                id=job_id,
+                description=description,
+                output_file=os.path.join(self.output_dir, job_id + EXPORT_FORMATS[output_format]),
+                output_format=output_format,
+                tenant=tenant.name
+            )
+            self._jobs[job_id] = job
+            self._inflight[key] = job
+            self._tenants[tenant.name] = tenant
+            self._active[tenant.name] = self._active.get(tenant.name, 0) + 1
+            self._pending += 1
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._changed:
+            return self._jobs.get(job_id)
+
+    def has_artifact(self, tenant: str, name: str) -> bool:
+        """Whether a retained job of ``tenant`` produced the artifact called ``name``."""
+        with self._changed:
+            return any(job.tenant == tenant and job.artifact == name for job in self._jobs.values())
+
+    def wait(self, job_id: str, version: int = -1, timeout: Optional[float] = None) -> Optional[Job]:
+        """Block until the job changes from ``version`` (or finishes) or ``timeout`` passes."""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            self._changed.wait_for(lambda: job.version != version or job.done, timeout)
+            return job
+
+    def wait_done(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        """Block until the job reaches a terminal state or ``timeout`` passes."""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._changed.wait_for(lambda: job.done, timeout)
+            return job
+
+    def _update(self, job: Job, **changes):
+        with self._changed:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._changed.notify_all()
+
+    def _purge(self):
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+    @asynccontextmanager
+    async def _generator_for(self, tenant: str):
+        if isinstance(self.generator, GeneratorPool):
+            async with self.generator.acquire(self._tenants[tenant]) as generator:
+                yield generator
+        else:
+            yield self.generator
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            with self._changed:
+                self._pending -= 1
+            self._update(job, status='running', started=time.time())
+            try:
+                os.makedirs(self.output_dir, exist_ok=True)
+                artifact = None
+                async with self._generator_for(job.tenant) as generator:
+                    if self.artifacts is None:
+                        await generator.generate_schematic_from_description(
+                            job.description, job.output_file, output_format=job.output_format,
+                            similarity_scope=job.tenant
+                        )
+                    else:
+                        filename, netlist_key = await generator.generate_schematic(
+                            job.description, job.output_file, output_format=job.output_format,
+                            similarity_scope=job.tenant
+                        )
+                if self.artifacts is not None:
+                    artifact = await asyncio.to_thread(self._publish, netlist_key, filename, job.output_format)
+                status, error = 'succeeded', None
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {str(e)}")
+                status, error = 'failed', str(e)
+            with self._changed:
+                self._inflight.pop((job.tenant, job.output_format, normalize_description(job.description)), None)
+                self._active[job.tenant] -= 1
+                if not self._active[job.tenant]:
+                    del self._active[job.tenant]
+            self._update(job, status=status, error=error, artifact=artifact, finished=time.time())
+
+    def _publish(self, netlist_key: str, filename: str, output_format: str) -> str:
+        try:
+            return self.artifacts.put_file(netlist_key, filename, output_format).name
+        finally:
+            os.remove(filename)
+
+    async def _cancel_workers(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if isinstance(self.generator, GeneratorPool):
+            await self.generator.close()
+
+    def shutdown(self):
+        """Cancel running jobs and stop the worker loop."""
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._cancel_workers(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+            self._loop = None
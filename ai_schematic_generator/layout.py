@@ -0,0 +1,367 @@
+"""Automatic component placement and orthogonal wire routing.
+
+Placement is layered: every connected part of the netlist is walked
+breadth-first, each component's layer is its distance from the first
+component, and rows inside a layer are ordered by the barycenter of their
+neighbours in the previous layer to keep wires short.  Tall layers are split
+into columns and the columns wrap into bands so the drawing stays roughly
+square.
+
+Routing is grid maze routing: A* over unit cells with a bend penalty and a
+penalty for reusing cells, against a hash-grid spatial index of component
+footprints and pins.  Searches are confined to a window around each net and
+capped, and fall back to an L-shaped wire, so layout stays fast on netlists
+with thousands of parts.
+"""
+import bisect
+import heapq
+import logging
+from collections import deque
+from itertools import repeat
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Cell = Tuple[int, int]
+Point = Tuple[float, float]
+
+# Wire terminals of each element drawn at rotation 0, relative to its
+# position, where schemdraw draws them: (input, output).  As in the netlist
+# exporters, a connection leaves its start component at the output and enters
+# its end component at the input: pins 1 and 2 of two-terminal parts, the base
+# and collector of a transistor.
+TWO_TERMINAL_PINS: Tuple[Point, Point] = ((0.0, 0.0), (3.0, 0.0))
+PINS = {
+    'transistor': ((0.0, 0.0), (0.7517, 0.6967)),
+}
+INPUT, OUTPUT = 0, 1
+
+# Body cells of each element drawn at rotation 0, relative to its position.
+# The cells nearest the terminals are reserved separately; wires may end there
+# but never pass through.
+TWO_TERMINAL_FOOTPRINT = ((1, 0), (2, 0))
+FOOTPRINTS = {
+    'transistor': ((0, -1), (0, 1), (1, -1), (1, 0)),
+}
+
+LAYER_SPACING = 6
+ROW_SPACING = 4
+MAX_ROWS_PER_COLUMN = 16
+MAX_COLUMNS_PER_BAND = 24
+
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+# Detours tried by pattern routing before falling back to a maze search.
+JOG_OFFSETS = (1, -1, 2, -2)
+# Rows halfway between placement rows are free of component bodies.
+CHANNEL = ROW_SPACING // 2
+PATTERN_CHOICES = 3
+
+
+@dataclass
+class Layout:
+    positions: Dict[str, Cell]
+    routes: Dict[Tuple[str, str], List[Point]]
+
+
+def _adjacency(ids: Sequence[str], connections: Iterable[Tuple[str, str]]) -> Dict[str, List[str]]:
+    adjacency: Dict[str, List[str]] = {component_id: [] for component_id in ids}
+    for start, end in connections:
+        if start != end and start in adjacency and end in adjacency:
+            adjacency[start].append(end)
+            adjacency[end].append(start)
+    return adjacency
+
+
+def layered_placement(
+    ids: Sequence[str],
+    connections: Iterable[Tuple[str, str]],
+    layer_spacing: int = LAYER_SPACING,
+    row_spacing: int = ROW_SPACING,
+    max_rows: int = MAX_ROWS_PER_COLUMN,
+    max_columns: int = MAX_COLUMNS_PER_BAND
+) -> Dict[str, Cell]:
+    """Assign grid positions to ``ids`` from the connection graph.
+
+    Runs in ``O(V log V + E)`` and depends only on the order of ``ids`` and
+    ``connections``, so the same netlist always gets the same layout.
+    """
+    adjacency = _adjacency(ids, connections)
+    index = {component_id: i for i, component_id in enumerate(ids)}
+    positions: Dict[str, Cell] = {}
+    top = 0
+
+    for root in ids:
+        if root in positions:
+            continue
+        # Breadth-first layering of this connected part.
+        layers: List[List[str]] = [[root]]
+        seen = {root}
+        queue = deque([(root, 0)])
+        while queue:
+            node, depth = queue.popleft()
+            for neighbour in adjacency[node]:
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    if depth + 1 == len(layers):
+                        layers.append([])
+                    layers[depth + 1].append(neighbour)
+                    queue.append((neighbour, depth + 1))
+
+        # Barycenter ordering against the previous layer.
+        rows: Dict[str, int] = {root: 0}
+        for depth in range(1, len(layers)):
+            def barycenter(node):
+                placed = [rows[n] for n in adjacency[node] if n in rows]
+                return (sum(placed) / len(placed) if placed else 0.0, index[node])
+            layers[depth].sort(key=barycenter)
+            for row, node in enumerate(layers[depth]):
+                rows[node] = row
+
+        # Split tall layers into columns and wrap the columns into bands so
+        # big parts stay roughly square instead of one long strip.
+        columns = [layer[i:i + max_rows] for layer in layers for i in range(0, len(layer), max_rows)]
+        for band_start in range(0, len(columns), max_columns):
+            band = columns[band_start:band_start + max_columns]
+            for column, nodes in enumerate(band):
+                for row, node in enumerate(nodes):
+                    positions[node] = (column * layer_spacing, -(top + row * row_spacing))
+            top += max(len(nodes) for nodes in band) * row_spacing + row_spacing
+
+    return positions
+
+
+class GridRouter:
+    """Orthogonal maze router over a hash grid of blocked cells."""
+
+    def __init__(
+        self,
+        bend_cost: float = 2.0,
+        reuse_cost: float = 4.0,
+        margin: int = 4,
+        greed: float = 1.5,
+        expansions_per_cell: int = 16
+    ):
+        """Create an empty router.
+
+        ``greed`` weights the A* heuristic (1.0 gives shortest routes, larger
+        values search less).  A net may expand at most ``expansions_per_cell``
+        states per cell of its Manhattan length before it falls back to an
+        L-shaped wire.
+        """
+        self.bend_cost = bend_cost
+        self.reuse_cost = reuse_cost
+        self.margin = margin
+        self.greed = greed
+        self.expansions_per_cell = expansions_per_cell
+        # Spatial index: cell -> id of the component that owns it, plus the
+        # blocked x per row and y per column for checking straight runs.
+        self.blocked: Dict[Cell, str] = {}
+        self.used: Dict[Cell, int] = {}
+        self._rows: Dict[int, List[int]] = {}
+        self._columns: Dict[int, List[int]] = {}
+
+    def place(self, component_id: str, position: Cell, footprint: Sequence[Cell],
+              pins: Sequence[Cell] = ((0, 0),)):
+        """Block the cells of a component and reserve its pin cells."""
+        x, y = position
+        for dx, dy in tuple(pins) + tuple(footprint):
+            cell = (x + dx, y + dy)
+            if cell not in self.blocked:
+                bisect.insort(self._rows.setdefault(cell[1], []), cell[0])
+                bisect.insort(self._columns.setdefault(cell[0], []), cell[1])
+            self.blocked[cell] = component_id
+
+    def _run_blocked(self, a: Cell, b: Cell, start: Cell, end: Cell) -> bool:
+        """Whether the straight run from ``a`` to ``b`` hits a blocked cell other than the pins."""
+        if a[1] == b[1]:
+            line, fixed, low, high = self._rows.get(a[1]), a[1], min(a[0], b[0]), max(a[0], b[0])
+            cell = lambda v: (v, fixed)
+        else:
+            line, fixed, low, high = self._columns.get(a[0]), a[0], min(a[1], b[1]), max(a[1], b[1])
+            cell = lambda v: (fixed, v)
+        if not line:
+            return False
+        i = bisect.bisect_left(line, low)
+        while i < len(line) and line[i] <= high:
+            if cell(line[i]) not in (start, end):
+                return True
+            i += 1
+        return False
+
+    def route(self, start: Cell, end: Cell) -> List[Cell]:
+        """Return the corner cells of a wire from ``start`` to ``end``."""
+        path = self._pattern(start, end)
+        if path is None:
+            path = self._search(start, end, self.reuse_cost)
+        if path is None:
+            # Congested area: accept overlapping wires rather than give up.
+            path = self._search(start, end, 0.0)
+        if path is None:
+            logger.debug(f"No route found from {start} to {end}; using an L-shaped wire")
+            path = _expand([start, (end[0], start[1]), end])
+        # Cells next to the pins are shared by every wire on that pin.
+        for cell in path[2:-2]:
+            self.used[cell] = self.used.get(cell, 0) + 1
+        return _corners(path)
+
+    def _pattern(self, start: Cell, end: Cell):
+        """Try L- and Z-shaped routes, which need no search, before maze routing."""
+        (sx, sy), (ex, ey) = start, end
+        candidates = [[start, (ex, sy), end], [start, (sx, ey), end]]
+        for offset in JOG_OFFSETS:
+            candidates.append([start, (sx, sy + offset), (ex, sy + offset), end])
+            candidates.append([start, (sx, ey + offset), (ex, ey + offset), end])
+            candidates.append([start, (sx + offset, sy), (sx + offset, ey), end])
+            candidates.append([start, (ex + offset, sy), (ex + offset, ey), end])
+        # Leave the output pin rightwards, enter the input pin from the left
+        # and cross over in a channel row.
+        for channel in (sy + CHANNEL, sy - CHANNEL, ey + CHANNEL, ey - CHANNEL):
+            for out in (1, 2):
+                candidates.append([start, (sx + out, sy), (sx + out, channel),
+                                   (ex - out, channel), (ex - out, ey), end])
+        scored = []
+        for i, corners in enumerate(candidates):
+            runs = list(zip(corners, corners[1:]))
+            if any(self._run_blocked(a, b, start, end) for a, b in runs):
+                continue
+            length = sum(abs(a[0] - b[0]) + abs(a[1] - b[1]) for a, b in runs)
+            scored.append((length + self.bend_cost * (len(corners) - 2), i, corners))
+        scored.sort()
+
+        # Only the cheapest few clear routes are walked cell by cell to price congestion.
+        best, best_cost = None, None
+        for base, _, corners in scored[:PATTERN_CHOICES]:
+            if best_cost is not None and base >= best_cost:
+                break
+            cells = _expand(corners)
+            cost = base + self.reuse_cost * sum(map(self.used.get, cells, repeat(0)))
+            if best_cost is None or cost < best_cost:
+                best, best_cost = cells, cost
+        return best
+
+    def _search(self, start: Cell, end: Cell, reuse_cost: float):
+        if start == end:
+            return [start]
+        x_min = min(start[0], end[0]) - self.margin
+        x_max = max(start[0], end[0]) + self.margin
+        y_min = min(start[1], end[1]) - self.margin
+        y_max = max(start[1], end[1]) + self.margin
+        blocked, used = self.blocked, self.used
+        ex, ey = end
+        greed = self.greed
+        distance = abs(start[0] - ex) + abs(start[1] - ey)
+        budget = self.expansions_per_cell * (distance + 2 * self.margin)
+
+        # States are (cell, direction index); -1 means "no direction yet".
+        best = {(start, -1): 0.0}
+        parent = {}
+        heap = [(greed * distance, 0.0, start, -1)]
+        expansions = 0
+        while heap:
+            _, cost, cell, direction = heapq.heappop(heap)
+            if cell == end:
+                path = [cell]
+                state = (cell, direction)
+                while state in parent:
+                    state = parent[state]
+                    path.append(state[0])
+                path.reverse()
+                return path
+            if cost > best.get((cell, direction), float('inf')):
+                continue
+            expansions += 1
+            if expansions > budget:
+                return None
+            x, y = cell
+            for d, (dx, dy) in enumerate(DIRECTIONS):
+                nx, ny = x + dx, y + dy
+                if not (x_min <= nx <= x_max and y_min <= ny <= y_max):
+                    continue
+                nxt = (nx, ny)
+                # Wires may only enter a blocked cell at their own end pin.
+                if nxt in blocked and nxt != end:
+                    continue
+                step = 1.0 + reuse_cost * used.get(nxt, 0)
+                if direction != -1 and d != direction:
+                    step += self.bend_cost
+                new_cost = cost + step
+                if new_cost < best.get((nxt, d), float('inf')):
+                    best[(nxt, d)] = new_cost
+                    parent[(nxt, d)] = (cell, direction)
+                    heapq.heappush(heap, (new_cost + greed * (abs(nx - ex) + abs(ny - ey)), new_cost, nxt, d))
+        return None
+
+
+def _expand(corners: List[Cell]) -> List[Cell]:
+    """Return every cell on the orthogonal polyline through ``corners``."""
+    cells = [corners[0]]
+    for (x0, y0), (x1, y1) in zip(corners, corners[1:]):
+        dx = (x1 > x0) - (x1 < x0)
+        dy = (y1 > y0) - (y1 < y0)
+        x, y = x0, y0
+        while (x, y) != (x1, y1):
+            x, y = x + dx, y + dy
+            cells.append((x, y))
+    return cells
+
+
+def _corners(path: List[Cell]) -> List[Cell]:
+    """Drop the cells of ``path`` that lie on a straight run."""
+    if len(path) <= 2:
+        return list(path)
+    corners = [path[0]]
+    for previous, cell, following in zip(path, path[1:], path[2:]):
+        if (cell[0] - previous[0], cell[1] - previous[1]) != (following[0] - cell[0], following[1] - cell[1]):
+            corners.append(cell)
+    corners.append(path[-1])
+    return corners
+
+
+def _pin_cell(terminal: Point) -> Cell:
+    """The grid cell nearest a terminal, reserved for the wires ending there."""
+    return (round(terminal[0]), round(terminal[1]))
+
+
+def _lead(terminal: Point, cell: Cell) -> List[Point]:
+    """Points from a terminal to its pin cell, orthogonally, without the cell itself."""
+    if terminal == cell:
+        return []
+    if terminal[0] != cell[0] and terminal[1] != cell[1]:
+        return [terminal, (terminal[0], float(cell[1]))]
+    return [terminal]
+
+
+def compute_layout(components: Sequence, connections: Sequence[Tuple[str, str]],
+                   router: GridRouter = None) -> Layout:
+    """Place ``components`` and route ``connections`` between their terminals.
+
+    ``components`` are objects with ``id`` and ``type`` attributes and are
+    drawn unrotated.  Routes are keyed by connection tuple and listed as
+    corner points from the start component's output terminal to the end
+    component's input terminal.
+    """
+    ids = [component.id for component in components]
+    positions = layered_placement(ids, connections)
+    router = router or GridRouter()
+    terminals: Dict[str, List[Point]] = {}
+    for component in components:
+        x, y = positions[component.id]
+        pins = PINS.get(component.type, TWO_TERMINAL_PINS)
+        terminals[component.id] = [(x + dx, y + dy) for dx, dy in pins]
+        router.place(component.id, (x, y), FOOTPRINTS.get(component.type, TWO_TERMINAL_FOOTPRINT),
+                     [_pin_cell(pin) for pin in pins])
+
+    nets = []
+    for start, end in connections:
+        if start != end:
+            source, target = terminals[start][OUTPUT], terminals[end][INPUT]
+            nets.append(((start, end), source, target, _pin_cell(source), _pin_cell(target)))
+    # Short nets first so they get the direct paths.
+    nets.sort(key=lambda net: abs(net[3][0] - net[4][0]) + abs(net[3][1] - net[4][1]))
+    routes = {}
+    for conn, source, target, source_cell, target_cell in nets:
+        cells = router.route(source_cell, target_cell)
+        points = [(float(x), float(y)) for x, y in cells]
+        routes[conn] = _lead(source, source_cell) + points + _lead(target, target_cell)[::-1]
+    return Layout(positions=positions, routes=routes)
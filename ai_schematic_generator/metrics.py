@@ -0,0 +1,113 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Sequence
+
+# Pipeline stages in the order they run.
+STAGES = (
+    'image_prepare',
+    'prompt_build',
+    'similarity_lookup',
+    'api_ttfb',
+    'api_total',
+    'json_parse',
+    'netlist_build',
+    'layout',
+    'render',
+    'export',
+    'file_write',
+)
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed durations."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Thread-safe registry of per-stage histograms and counters."""
+
+    def __init__(self, prefix: str = 'schematic'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms: Dict[str, Histogram] = {}
+            self.counters: Dict[str, float] = {}
+
+    def observe(self, stage: str, seconds: float):
+        """Record one duration for ``stage``."""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name: str, amount: float = 1):
+        """Increment counter ``name``."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one observation of ``stage``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict:
+        """Return per-stage count/total/mean and counter values."""
+        with self._lock:
+            stages = {
+                stage: {
+                    'count': h.count,
+                    'total': h.sum,
+                    'mean': h.sum / h.count if h.count else 0.0,
+                }
+                for stage, h in self.histograms.items()
+            }
+            return {'stages': stages, 'counters': dict(self.counters)}
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        name = f"{self.prefix}_stage_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each pipeline stage.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            for stage in sorted(self.histograms):
+                h = self.histograms[stage]
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {h.sum}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+            for counter in sorted(self.counters):
+                counter_name = f"{self.prefix}_{counter}_total"
+                lines.append(f"# TYPE {counter_name} counter")
+                lines.append(f"{counter_name} {self.counters[counter]}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the generators, the CLI and the web app.
+METRICS = Metrics()
@@ -0,0 +1,174 @@
+"""Compact array-backed netlist storage.
+
+Component ids, types and values are interned strings, positions and
+rotations live in growable NumPy arrays, and connections are an integer edge
+array with a CSR adjacency built on demand.  Drawing geometry lives in
+:mod:`.svg_writer`, which measures each symbol once per rotation.
+"""
+import sys
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+INITIAL_CAPACITY = 16
+
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    """Return ``array`` with room for at least ``size`` rows."""
+    if size <= len(array):
+        return array
+    capacity = max(size, 2 * len(array), INITIAL_CAPACITY)
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class Netlist:
+    """Components and undirected, deduplicated connections in flat arrays."""
+
+    __slots__ = (
+        'ids', 'index', 'type_names', 'values', '_type_codes', '_types',
+        '_positions', '_rotations', '_edges', '_edge_keys', '_size', '_edge_count', '_csr'
+    )
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.type_names: List[str] = []
+        self.values: List[Optional[str]] = []
+        self._type_codes: Dict[str, int] = {}
+        self._types = np.zeros(0, dtype=np.uint8)
+        self._positions = np.zeros((0, 2), dtype=np.float64)
+        self._rotations = np.zeros(0, dtype=np.float64)
+        self._edges = np.zeros((0, 2), dtype=np.int32)
+        self._edge_keys = set()
+        self._size = 0
+        self._edge_count = 0
+        self._csr = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def types(self) -> np.ndarray:
+        """Type code per component; ``type_names[code]`` is the type."""
+        return self._types[:self._size]
+
+    @property
+    def positions(self) -> np.ndarray:
+        """``(n, 2)`` component positions."""
+        return self._positions[:self._size]
+
+    @property
+    def rotations(self) -> np.ndarray:
+        """Component rotations in degrees."""
+        return self._rotations[:self._size]
+
+    @property
+    def edges(self) -> np.ndarray:
+        """``(m, 2)`` component indices of each connection, in insertion order."""
+        return self._edges[:self._edge_count]
+
+    def add_component(self, component_id: str, type: str, value: Optional[str] = None,
+                      position: Sequence[float] = (0, 0), rotation: float = 0) -> int:
+        """Add or replace a component and return its index."""
+        code = self._type_codes.get(type)
+        if code is None:
+            code = self._type_codes[type] = len(self.type_names)
+            self.type_names.append(sys.intern(type))
+        i = self.index.get(component_id)
+        if i is None:
+            i = self._size
+            component_id = sys.intern(component_id)
+            self.index[component_id] = i
+            self.ids.append(component_id)
+            self.values.append(None)
+            self._size += 1
+            self._types = _grow(self._types, self._size)
+            self._positions = _grow(self._positions, self._size)
+            self._rotations = _grow(self._rotations, self._size)
+            self._csr = None
+        self.values[i] = sys.intern(value) if isinstance(value, str) else value
+        self._types[i] = code
+        self._positions[i] = position
+        self._rotations[i] = rotation
+        return i
+
+    def add_edge(self, start: str, end: str) -> bool:
+        """Connect two components; return False if they already were."""
+        a, b = self.index[start], self.index[end]
+        key = (a << 32) | b if a <= b else (b << 32) | a
+        if key in self._edge_keys:
+            return False
+        self._edge_keys.add(key)
+        self._edge_count += 1
+        self._edges = _grow(self._edges, self._edge_count)
+        self._edges[self._edge_count - 1] = (a, b)
+        self._csr = None
+        return True
+
+    def remove_component(self, component_id: str) -> None:
+        """Remove a component and its connections; later indices shift down by one."""
+        i = self.index.pop(component_id)
+        n = self._size
+        for array in (self._types, self._positions, self._rotations):
+            array[i:n - 1] = array[i + 1:n]
+        del self.ids[i]
+        del self.values[i]
+        self._size = n - 1
+        for j in range(i, self._size):
+            self.index[self.ids[j]] = j
+        edges = self.edges
+        kept = edges[(edges != i).all(axis=1)]
+        kept[kept > i] -= 1
+        self._edge_count = len(kept)
+        self._edges[:self._edge_count] = kept
+        self._edge_keys = {(a << 32) | b if a <= b else (b << 32) | a for a, b in kept.tolist()}
+        self._csr = None
+
+    def remove_edge(self, start: str, end: str) -> bool:
+        """Disconnect two components; return False if they were not connected."""
+        a, b = self.index[start], self.index[end]
+        key = (a << 32) | b if a <= b else (b << 32) | a
+        if key not in self._edge_keys:
+            return False
+        self._edge_keys.discard(key)
+        edges = self.edges
+        row = int(np.flatnonzero(((edges[:, 0] == a) & (edges[:, 1] == b))
+                                 | ((edges[:, 0] == b) & (edges[:, 1] == a)))[0])
+        self._edges[row:self._edge_count - 1] = self._edges[row + 1:self._edge_count]
+        self._edge_count -= 1
+        self._csr = None
+        return True
+
+    def connection_pairs(self) -> List[Tuple[str, str]]:
+        """Connections as ``(start_id, end_id)`` pairs in insertion order."""
+        ids = self.ids
+        return [(ids[a], ids[b]) for a, b in self.edges.tolist()]
+
+    def set_geometry(self, positions: np.ndarray, rotations: Optional[np.ndarray] = None):
+        """Replace every position (and optionally rotation) at once."""
+        self._positions[:self._size] = positions
+        self._rotations[:self._size] = 0 if rotations is None else rotations
+
+    def adjacency(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Undirected CSR adjacency ``(indptr, indices)`` over component indices."""
+        if self._csr is None:
+            edges = self.edges
+            sources = np.concatenate([edges[:, 0], edges[:, 1]])
+            targets = np.concatenate([edges[:, 1], edges[:, 0]])
+            order = np.argsort(sources, kind='stable')
+            counts = np.bincount(sources, minlength=self._size)
+            indptr = np.zeros(self._size + 1, dtype=np.int64)
+            np.cumsum(counts, out=indptr[1:])
+            self._csr = (indptr, targets[order].astype(np.int32))
+        return self._csr
+
+    def neighbours(self, component_id: str) -> List[str]:
+        """Ids of the components connected to ``component_id``."""
+        indptr, indices = self.adjacency()
+        i = self.index[component_id]
+        return [self.ids[j] for j in indices[indptr[i]:indptr[i + 1]].tolist()]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.ids)
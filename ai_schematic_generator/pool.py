@@ -0,0 +1,201 @@
+"""Reusable generator instances for long-running servers.
+
+A :class:`GeneratorPool` hands out :class:`AISchematicGenerator` instances
+bound to a tenant's API key, resets them when they come back and retires
+them after a number of uses or once the process grows past a memory
+ceiling, so a server's footprint stays flat however many requests it sees.
+The pool never holds more than ``max_size`` instances and each
+:class:`Tenant` has its own limit on concurrent generations.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, List, Optional
+
+from .metrics import METRICS
+
+if TYPE_CHECKING:
+    from .ai_generator import AISchematicGenerator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_USES = 100
+# RSS rarely falls after a peak, so memory-driven recycling is rate-limited.
+DEFAULT_RSS_RECYCLE_INTERVAL = 60.0
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """A client of the service with its own API key and quotas.
+
+    ``max_concurrent`` generations run at once; ``max_queued`` jobs may be
+    queued or running in total.  Without an ``api_key`` the pool factory's
+    default is used.
+    """
+    name: str
+    api_key: Optional[str] = None
+    max_concurrent: int = 4
+    max_queued: int = 100
+
+
+def load_tenants(path: str) -> Dict[str, Tenant]:
+    """Read tenants from a JSON file mapping access tokens to tenant settings.
+
+    Each value is an object with ``name`` and optional ``api_key``,
+    ``max_concurrent`` and ``max_queued``.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected an object mapping tokens to tenants")
+    return {token: Tenant(**settings) for token, settings in data.items()}
+
+
+def process_rss() -> Optional[int]:
+    """Current resident set size of this process in bytes, or None if unknown."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@dataclass
+class _Slot:
+    generator: 'AISchematicGenerator'
+    api_key: Optional[str]
+    uses: int = 0
+
+
+class GeneratorPool:
+    """A capped pool of generators shared by tenants, recycled as they age."""
+
+    def __init__(
+        self,
+        factory: Callable[[Optional[str]], 'AISchematicGenerator'],
+        max_size: int = 4,
+        max_uses: int = DEFAULT_MAX_USES,
+        max_rss_bytes: Optional[int] = None,
+        rss_recycle_interval: float = DEFAULT_RSS_RECYCLE_INTERVAL
+    ):
+        """Create an empty pool.
+
+        ``factory(api_key)`` builds a generator for a tenant's key.  An
+        instance is closed after ``max_uses`` requests, or on release while
+        the process RSS is above ``max_rss_bytes``; at most one instance is
+        retired for memory every ``rss_recycle_interval`` seconds, so a
+        process that stays large does not rebuild a client per request.
+        When the pool is full, an idle instance for another key is closed to
+        make room; if none is idle, callers wait.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.factory = factory
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_rss_bytes = max_rss_bytes
+        self.rss_recycle_interval = rss_recycle_interval
+        self._last_rss_recycle: Optional[float] = None
+        self._idle: List[_Slot] = []
+        self._size = 0
+        self._changed: Optional[asyncio.Condition] = None
+        self._quotas: Dict[str, asyncio.Semaphore] = {}
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        """Instances currently alive, idle or in use."""
+        return self._size
+
+    def _condition(self) -> asyncio.Condition:
+        # Created on first use so it belongs to the loop that uses the pool.
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    @asynccontextmanager
+    async def acquire(self, tenant: Tenant) -> AsyncIterator['AISchematicGenerator']:
+        """Borrow a generator for ``tenant``, waiting for its quota and a free instance."""
+        quota = self._quotas.get(tenant.name)
+        if quota is None:
+            quota = self._quotas[tenant.name] = asyncio.Semaphore(tenant.max_concurrent)
+        async with quota:
+            slot = await self._checkout(tenant.api_key)
+            try:
+                yield slot.generator
+            finally:
+                await self._checkin(slot)
+
+    async def _checkout(self, api_key: Optional[str]) -> _Slot:
+        changed = self._condition()
+        evicted = None
+        async with changed:
+            while True:
+                for i in range(len(self._idle) - 1, -1, -1):
+                    if self._idle[i].api_key == api_key:
+                        return self._idle.pop(i)
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                if self._idle:
+                    # Replace the longest-idle instance of another key.
+                    evicted = self._idle.pop(0)
+                    break
+                await changed.wait()
+        if evicted is not None:
+            await self._close(evicted)
+        try:
+            generator = self.factory(api_key)
+        except BaseException:
+            async with changed:
+                self._size -= 1
+                changed.notify()
+            raise
+        METRICS.inc('pool_created')
+        return _Slot(generator, api_key)
+
+    async def _checkin(self, slot: _Slot):
+        slot.uses += 1
+        retire = self._closed or slot.uses >= self.max_uses
+        rss = None
+        if not retire and self.max_rss_bytes is not None:
+            now = time.monotonic()
+            if (self._last_rss_recycle is None
+                    or now - self._last_rss_recycle >= self.rss_recycle_interval):
+                rss = process_rss()
+                if rss is not None and rss > self.max_rss_bytes:
+                    retire = True
+                    self._last_rss_recycle = now
+        changed = self._condition()
+        if retire:
+            logger.debug(f"Recycling generator after {slot.uses} uses (rss={rss})")
+            await self._close(slot)
+            async with changed:
+                self._size -= 1
+                changed.notify()
+            return
+        slot.generator.reset()
+        async with changed:
+            self._idle.append(slot)
+            changed.notify()
+
+    async def _close(self, slot: _Slot):
+        METRICS.inc('pool_recycled')
+        try:
+            await slot.generator.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close pooled generator: {str(e)}")
+
+    async def close(self):
+        """Close every idle instance; instances in use are closed as they come back."""
+        changed = self._condition()
+        async with changed:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._closed = True
+        for slot in idle:
+            await self._close(slot)
@@ -0,0 +1,146 @@
+"""Prompt templates and output budgets for schematic generation.
+
+Every request sends the same short system prompt (instructions and a
+compact schema) and differs only in a user message holding the description.
+The prompt is kept well below the minimum length the API caches, so it is
+not marked for prompt caching; keeping it small is cheaper.  The output budget
+is estimated from the description instead of always asking for the maximum;
+responses cut off at the budget are continued rather than retried.
+"""
+import re
+from dataclasses import dataclass
+from typing import List
+
+# Upper bound for one request; continuation extends a truncated response.
+MAX_OUTPUT_TOKENS = 4096
+MIN_OUTPUT_TOKENS = 256
+MAX_CONTINUATIONS = 3
+# Approximate output tokens per part and connection in minified JSON.
+TOKENS_PER_COMPONENT = 28
+TOPOLOGY_TOKENS_PER_COMPONENT = 18
+TOKENS_PER_CONNECTION = 12
+BASE_TOKENS = 40
+MIN_COMPONENTS = 4
+HEADROOM = 1.5
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A fixed system prompt plus a per-request user message."""
+    system: str
+    tokens_per_component: int
+    # Introduces the per-request text in the user message.
+    label: str = 'Description'
+
+    def user_message(self, description: str) -> str:
+        return f"{self.label}: {description}"
+
+    def render(self, description: str) -> str:
+        """The whole prompt as one string, for cache keys and token estimates."""
+        return f"{self.system}\n\n{self.user_message(description)}"
+
+
+_INSTRUCTIONS = (
+    "Turn the user's circuit description into a schematic. Reply with one minified JSON "
+    "object and nothing else, no code fences or explanation."
+)
+_TYPES = "type is one of resistor, capacitor, inductor, diode, transistor."
+
+PLACED_TEMPLATE = PromptTemplate(
+    system=(
+        f"{_INSTRUCTIONS}\n"
+        'Schema: {"components":[{"type":str,"id":str,"value":str,"position":[x,y],"rotation":deg}],'
+        '"connections":[{"start":id,"end":id}]}\n'
+        f"{_TYPES} Omit value when there is none and rotation when it is 0."
+    ),
+    tokens_per_component=TOKENS_PER_COMPONENT
+)
+
+# Used when layout is computed locally: no positions or rotations.
+TOPOLOGY_TEMPLATE = PromptTemplate(
+    system=(
+        f"{_INSTRUCTIONS}\n"
+        'Schema: {"components":[{"type":str,"id":str,"value":str}],'
+        '"connections":[{"start":id,"end":id}]}\n'
+        f"{_TYPES} Omit value when there is none."
+    ),
+    tokens_per_component=TOPOLOGY_TOKENS_PER_COMPONENT
+)
+
+# Edits of an existing schematic: the request is its canonical JSON followed
+# by the change, and the reply is a patch for SchematicEditor.apply_patch.
+EDIT_TEMPLATE = PromptTemplate(
+    system=(
+        "Change the user's schematic as they ask. Reply with one minified JSON array of edit "
+        "operations and nothing else, no code fences or explanation.\n"
+        'Operations: {"op":"add","component":{"type":str,"id":str,"value":str,"position":[x,y],"rotation":deg}}, '
+        '{"op":"update","id":id,...changed fields of type,value,position,rotation}, {"op":"remove","id":id}, '
+        '{"op":"connect","start":id,"end":id}, {"op":"disconnect","start":id,"end":id}\n'
+        f"{_TYPES} Touch only what the change needs."
+    ),
+    tokens_per_component=TOKENS_PER_COMPONENT,
+    label='Schematic'
+)
+
+_NUMBER_WORDS = {
+    'an': 1, 'one': 1, 'single': 1, 'two': 2, 'pair': 2, 'dual': 2, 'three': 3, 'four': 4,
+    'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'twelve': 12, 'sixteen': 16,
+    'twenty': 20,
+}
+_PART_WORDS = (
+    'resistor', 'capacitor', 'cap', 'inductor', 'coil', 'choke', 'diode', 'led', 'zener',
+    'transistor', 'bjt', 'mosfet', 'fet', 'opamp', 'stage', 'component', 'part',
+)
+# Named circuits that imply several parts without listing them.
+_CIRCUIT_SIZES = {
+    'divider': 2, 'filter': 3, 'rc': 2, 'rlc': 3, 'bridge': 4, 'rectifier': 4, 'amplifier': 6,
+    'oscillator': 6, 'multivibrator': 8, 'regulator': 4, 'mirror': 4, 'ladder': 8, 'array': 8,
+}
+# Unit words that make a preceding number a value ("100 nF") rather than a count.
+_UNITS = {'k', 'm', 'pf', 'nf', 'uf', 'f', 'mh', 'uh', 'h', 'ohm', 'ohms', 'v', 'mv', 'a', 'ma', 'hz', 'khz'}
+_WORD = re.compile(r"\d+(?:\.\d+)?[a-zµω]*|[a-z]+")
+
+
+def _count(tokens: List[str], i: int) -> int:
+    """The count written just before ``tokens[i]``, skipping values such as "10k"."""
+    for j in range(i - 1, max(-1, i - 4), -1):
+        token = tokens[j]
+        if token.isdigit():
+            if j + 1 < i and tokens[j + 1] in _UNITS:
+                continue
+            return int(token)
+        if token in _NUMBER_WORDS:
+            return _NUMBER_WORDS[token]
+    return 1
+
+
+def estimate_components(description: str) -> int:
+    """Rough number of components a description asks for.
+
+    Counts part names, multiplied by a preceding count ("four LEDs",
+    "3 resistors"), or takes a typical size for a named circuit if that is
+    larger.  Never returns less than :data:`MIN_COMPONENTS`.
+    """
+    tokens = _WORD.findall(description.lower().replace('op-amp', 'opamp'))
+    parts = 0
+    implied = 0
+    for i, token in enumerate(tokens):
+        word = token[:-1] if token.endswith('s') and token[:-1] in _PART_WORDS else token
+        if word in _PART_WORDS:
+            parts += min(_count(tokens, i), 256)
+        elif word in _CIRCUIT_SIZES:
+            implied = max(implied, _CIRCUIT_SIZES[word])
+    return max(MIN_COMPONENTS, parts, implied)
+
+
+def estimate_max_tokens(description: str, template: PromptTemplate = PLACED_TEMPLATE) -> int:
+    """Output budget for ``description`` with ``template``, with headroom, clamped."""
+    components = estimate_components(description)
+    # Most schematics have about one connection per component.
+    estimate = BASE_TOKENS + components * (template.tokens_per_component + TOKENS_PER_CONNECTION)
+    return max(MIN_OUTPUT_TOKENS, min(MAX_OUTPUT_TOKENS, int(estimate * HEADROOM)))
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Rough token cost of a request: ~4 characters per prompt token plus the output budget."""
+    return len(prompt) // 4 + max_tokens
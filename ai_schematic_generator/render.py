@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from .schematic_generator import ELEMENT_FACTORIES, SchematicGenerator
+from .svg_writer import symbol_geometry
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_worker():
+    """Draw each unrotated symbol once when a worker process starts.
+
+    schemdraw is already loaded with this module; this fills the symbol
+    geometry cache used by the compact SVG writer.
+    """
+    for factory in ELEMENT_FACTORIES.values():
+        symbol_geometry(factory)
+    logger.debug(f"Render worker {os.getpid()} ready")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def render_schematic(json_str: str, output_file: str, layout: bool = False) -> str:
+    """Render a JSON description to ``output_file`` on a fresh generator.
+
+    With ``layout`` set, positions and wires come from the layout engine.
+    """
+    generator = SchematicGenerator()
+    generator.from_json(json_str)
+    if layout:
+        generator.auto_layout()
+    return generator.save(output_file)
+
+
+class RenderPool:
+    """Renders schematics in worker processes so the event loop stays free."""
+
+    def __init__(self, max_workers: Optional[int] = None, warm: bool = True):
+        """Start a pool of ``max_workers`` processes (default: CPU count).
+
+        Each worker warms up in its initializer when it starts.  With
+        ``warm`` set, one no-op task per worker is submitted and awaited so
+        processes start now rather than on the first render; the executor
+        may serve them with fewer processes, which then start on demand.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_warm_worker
+        )
+        if warm:
+            for future in [self._executor.submit(_ping) for _ in range(self.max_workers)]:
+                future.result()
+        logger.info(f"Started render pool with {self.max_workers} workers")
+
+    async def render(self, json_str: str, output_file: str, layout: bool = False) -> str:
+        """Render in a worker process and return the written filename."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, render_schematic, json_str, output_file, layout)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
@@ -0,0 +1,150 @@
+import datetime
+import email.utils
+import json
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+import anthropic
+
+from .streaming import StreamParseError
+from .validation import SchematicValidationError
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Errors raised while parsing or drawing bad model output; a new completion may fix them.
+OUTPUT_ERRORS = (json.JSONDecodeError, SchematicValidationError, StreamParseError)
+
+TYPE_ALIASES = {
+    'r': 'resistor',
+    'res': 'resistor',
+    'c': 'capacitor',
+    'cap': 'capacitor',
+    'l': 'inductor',
+    'coil': 'inductor',
+    'd': 'diode',
+    'led': 'diode',
+    'zener': 'diode',
+    'q': 'transistor',
+    'bjt': 'transistor',
+    'npn': 'transistor',
+    'npn_transistor': 'transistor',
+}
+
+_FENCE = re.compile(r"```[a-zA-Z]*\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+
+def retry_after(exc: Exception) -> Optional[float]:
+    """Return the server-requested delay in seconds, if the error carries one."""
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    value = headers.get('retry-after-ms')
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        # HTTP dates are always GMT.
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return max(parsed.timestamp() - time.time(), 0.0)
+
+
+def strip_code_fence(text: str) -> str:
+    """Return the body of the first fenced code block in ``text``, or ``text`` itself."""
+    fenced = _FENCE.search(text)
+    return fenced.group(1) if fenced else text
+
+
+def repair_json(text: str) -> Optional[str]:
+    """Cheaply repair common model output problems without a new API call.
+
+    Strips code fences and surrounding prose, removes trailing commas and maps
+    component type aliases (``res``, ``cap``, ``led`` ...) to known types.
+    Returns the repaired JSON text, or None if it still does not parse.
+    """
+    text = strip_code_fence(text)
+    start = text.find('{')
+    end = text.rfind('}')
+    if start == -1 or end < start:
+        return None
+    text = _TRAILING_COMMA.sub(r'\1', text[start:end + 1])
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    for comp in data.get('components', []):
+        if isinstance(comp, dict) and isinstance(comp.get('type'), str):
+            kind = comp['type'].strip().lower().replace(' ', '_').replace('-', '_')
+            comp['type'] = TYPE_ALIASES.get(kind, kind)
+    return json.dumps(data)
+
+
+@dataclass
+class RetryPolicy:
+    """Decides whether and when a failed generation attempt is retried."""
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    jitter: bool = True
+    # Longest server-requested wait worth sitting out; beyond it the operation fails.
+    max_retry_after: float = 60.0
+
+    def classify(self, exc: Exception) -> str:
+        """Classify ``exc`` as 'transient', 'output' or 'fatal'.
+
+        Transient errors (rate limits, overload, 5xx, connection problems) are
+        retried after a backoff; output errors (unparseable or invalid model
+        output) are retried immediately; fatal errors are not retried.  A
+        transient error asking for a wait longer than ``max_retry_after`` is
+        fatal.
+        """
+        if isinstance(exc, (anthropic.APIConnectionError, anthropic.RateLimitError,
+                            anthropic.InternalServerError)):
+            return self._transient(exc)
+        if isinstance(exc, anthropic.APIStatusError):
+            return self._transient(exc) if exc.status_code in RETRYABLE_STATUS else 'fatal'
+        if isinstance(exc, OUTPUT_ERRORS):
+            return 'output'
+        return 'fatal'
+
+    def _transient(self, exc: Exception) -> str:
+        requested = retry_after(exc)
+        if requested is not None and requested > self.max_retry_after:
+            logger.warning(f"Server asked to wait {requested:.0f}s, more than {self.max_retry_after:.0f}s")
+            return 'fatal'
+        return 'transient'
+
+    def delay(self, attempt: int, exc: Optional[Exception] = None) -> float:
+        """Seconds to wait before retry number ``attempt + 1``.
+
+        A server-requested wait is honoured as is; ``max_delay`` only caps
+        the exponential backoff.
+        """
+        requested = retry_after(exc) if exc is not None else None
+        if requested is not None:
+            return requested
+        delay = min(self.base_delay * (2 ** attempt), self.max_delay)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
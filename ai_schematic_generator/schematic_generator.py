@@ -1,96 +1,344 @@
 import schemdraw
 from schemdraw import elements as elm
+from collections.abc import Mapping
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import hashlib
 import json
 import math
 import os
+import tempfile
+from .exporters import export_netlist, output_filename
+from .layout import compute_layout
+from .metrics import METRICS
+from .netlist import Netlist
+from .svg_writer import place_element, render_svg
+from .validation import SchematicValidationError, validate_schematic
 
-@dataclass
+# Bump when rendering output changes so cached SVGs are invalidated.
+RENDER_VERSION = 4
+
+# Schematic element for each component type.
+ELEMENT_FACTORIES: Dict[str, Callable[[], elm.Element]] = {
+    'resistor': elm.Resistor,
+    'capacitor': elm.Capacitor,
+    'inductor': elm.Inductor,
+    'diode': elm.Diode,
+    'transistor': elm.BjtNpn,
+}
+
+# Netlists with at least this many components are written with shared
+# <defs>/<use> symbols instead of one full schemdraw path per part.
+COMPACT_SVG_THRESHOLD = 500
+
+Point = Tuple[float, float]
+
+@dataclass(slots=True)
 class Component:
     type: str
     id: str
     value: Optional[str] = None
     position: Tuple[float, float] = (0, 0)
     rotation: float = 0
-    connections: List[str] = None
+
+    @classmethod
+    def from_dict(cls, comp: dict) -> 'Component':
+        """Build a component from one entry of the JSON ``components`` list."""
+        return cls(
+            type=comp['type'],
+            id=comp['id'],
+            value=comp.get('value'),
+            position=tuple(comp.get('position', (0, 0))),
+            rotation=comp.get('rotation', 0)
+        )
+
+def replace_file(filename: str, data: bytes):
+    """Write ``data`` to a new file and move it over ``filename``.
+
+    Writing in place would also change any render cache entry hard-linked
+    to ``filename``.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename) or '.', suffix='.tmp')
+    try:
+        # mkstemp creates the file owner-only; outputs are ordinary files.
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, filename)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def parse_schematic_json(json_str: str) -> Tuple[List[Component], List[Tuple[str, str]]]:
+    """Parse and validate a JSON description into components and connection pairs.
+
+    The whole document is checked before anything is built; problems raise
+    :class:`SchematicValidationError` listing every issue.
+    """
+    with METRICS.timer('json_parse'):
+        data = json.loads(json_str)
+        issues = validate_schematic(data, ELEMENT_FACTORIES)
+        if issues:
+            raise SchematicValidationError(issues, json_str)
+        components = [Component.from_dict(comp) for comp in data.get('components', [])]
+        connections = [(conn['start'], conn['end']) for conn in data.get('connections', [])]
+    return components, connections
+
+def netlist_hash(components: List[Component], connections: List[Tuple[str, str]],
+                 layout: bool = False) -> str:
+    """Hash a netlist independently of JSON key order and whitespace.
+
+    ``layout`` marks netlists drawn with :meth:`SchematicGenerator.auto_layout`,
+    whose output does not depend on the given positions.
+    """
+    canonical = {
+        'version': RENDER_VERSION,
+        'components': [
+            [c.type, c.id, c.value, [float(v) for v in c.position], float(c.rotation)]
+            for c in components
+        ],
+        'connections': [list(conn) for conn in connections],
+    }
+    if layout:
+        canonical['layout'] = True
+    payload = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def merge_collinear(segments: List[Tuple[Point, Point]]) -> List[Tuple[Point, Point]]:
+    """Merge overlapping or touching segments that lie on the same line.
+
+    Zero-length segments are dropped.  The result is ordered by line, then by
+    position along the line, so it is deterministic for a given input.
+    """
+    lines: Dict[Tuple[float, float, float], List[List[float]]] = {}
+    for (x0, y0), (x1, y1) in segments:
+        dx, dy = x1 - x0, y1 - y0
+        length = math.hypot(dx, dy)
+        if length == 0:
+            continue
+        dx, dy = dx / length, dy / length
+        # Canonical direction so A->B and B->A share a line key.
+        if dx < -1e-12 or (abs(dx) <= 1e-12 and dy < 0):
+            dx, dy = -dx, -dy
+        offset = x0 * dy - y0 * dx
+        key = (round(dx, 9) + 0.0, round(dy, 9) + 0.0, round(offset, 9) + 0.0)
+        t0, t1 = sorted((x0 * dx + y0 * dy, x1 * dx + y1 * dy))
+        lines.setdefault(key, []).append([t0, t1])
+
+    merged = []
+    for (dx, dy, offset), intervals in sorted(lines.items()):
+        intervals.sort()
+        runs = [intervals[0]]
+        for t0, t1 in intervals[1:]:
+            if t0 <= runs[-1][1] + 1e-9:
+                runs[-1][1] = max(runs[-1][1], t1)
+            else:
+                runs.append([t0, t1])
+        # Point on the line closest to the origin, then walk along it.
+        bx, by = offset * dy, -offset * dx
+        for t0, t1 in runs:
+            merged.append(((bx + t0 * dx, by + t0 * dy), (bx + t1 * dx, by + t1 * dy)))
+    return merged
+
+def svg_filename(filename: str) -> str:
+    """Return ``filename`` with its extension forced to .svg."""
+    return output_filename(filename, 'svg')
+
+class ComponentView(Mapping):
+    """Read-only ``id -> Component`` view of a :class:`Netlist`.
+
+    Components are built on access; change them through the generator.
+    """
+    __slots__ = ('_netlist',)
+
+    def __init__(self, netlist: Netlist):
+        self._netlist = netlist
+
+    def __getitem__(self, component_id: str) -> Component:
+        netlist = self._netlist
+        i = netlist.index[component_id]
+        x, y = netlist.positions[i].tolist()
+        return Component(
+            type=netlist.type_names[netlist.types[i]],
+            id=netlist.ids[i],
+            value=netlist.values[i],
+            position=(x, y),
+            rotation=float(netlist.rotations[i])
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._netlist.ids)
+
+    def __len__(self) -> int:
+        return len(self._netlist)
+
+    def __contains__(self, component_id) -> bool:
+        return component_id in self._netlist.index
 
 class SchematicGenerator:
-    def __init__(self):
-        self.components = {}
-        self.connections = []
-        self.drawing = schemdraw.Drawing()
+    def __init__(self, compact_threshold: Optional[int] = COMPACT_SVG_THRESHOLD):
+        """Create an empty schematic.
+
+        ``compact_threshold`` is the component count from which :meth:`save`
+        writes shared-symbol SVG; ``None`` always uses the full renderer.
+        """
+        self.netlist = Netlist()
+        self.compact_threshold = compact_threshold
+        self.routes: Dict[Tuple[str, str], List[Point]] = {}
+        self._drawing = None
+    
+    @property
+    def components(self) -> ComponentView:
+        """Components by id."""
+        return ComponentView(self.netlist)
+    
+    @property
+    def connections(self) -> List[Tuple[str, str]]:
+        """Deduplicated connections in the order they were added."""
+        return self.netlist.connection_pairs()
+    
+    @property
+    def drawing(self) -> schemdraw.Drawing:
+        """The schemdraw drawing, built on first use after any change."""
+        if self._drawing is None:
+            self._drawing = self._build_drawing()
+        return self._drawing
     
     def add_component(self, component: Component):
         """Add a component to the schematic."""
-        self.components[component.id] = component
-        
-        # Create the component based on its type
-        if component.type == 'resistor':
-            elem = elm.Resistor()
-        elif component.type == 'capacitor':
-            elem = elm.Capacitor()
-        elif component.type == 'inductor':
-            elem = elm.Inductor()
-        elif component.type == 'diode':
-            elem = elm.Diode()
-        elif component.type == 'transistor':
-            elem = elm.BjtNpn()
-        else:
+        if component.type not in ELEMENT_FACTORIES:
             raise ValueError(f"Unknown component type: {component.type}")
-            
-        # Position the component
-        elem = elem.at(component.position)
-        
-        # Apply rotation if needed
-        if component.rotation != 0:
-            theta = math.radians(component.rotation)
-            direction = (math.cos(theta), math.sin(theta))
-            elem = elem.to((
-                component.position[0] + direction[0],
-                component.position[1] + direction[1]
-            ))
+        self.netlist.add_component(
+            component.id, component.type, component.value, component.position, component.rotation
+        )
+        self._drawing = None
+    
+    def add_connection(self, start_component: str, end_component: str):
+        """Add a wire connection between components.
+
+        Wires are undirected, so repeating a connection in either direction
+        is a no-op.
+        """
+        for component_id in (start_component, end_component):
+            if component_id not in self.netlist.index:
+                raise KeyError(f"Unknown component: {component_id}")
+        if self.netlist.add_edge(start_component, end_component):
+            self._drawing = None
+
+    def remove_component(self, component_id: str):
+        """Remove a component together with its connections and their routes."""
+        if component_id not in self.netlist.index:
+            raise KeyError(f"Unknown component: {component_id}")
+        self.netlist.remove_component(component_id)
+        self.routes = {key: route for key, route in self.routes.items() if component_id not in key}
+        self._drawing = None
+
+    def remove_connection(self, start_component: str, end_component: str) -> bool:
+        """Remove the wire between two components, in either direction.
+
+        Returns False if they were not connected.
+        """
+        for component_id in (start_component, end_component):
+            if component_id not in self.netlist.index:
+                raise KeyError(f"Unknown component: {component_id}")
+        if not self.netlist.remove_edge(start_component, end_component):
+            return False
+        self.routes.pop((start_component, end_component), None)
+        self.routes.pop((end_component, start_component), None)
+        self._drawing = None
+        return True
+
+    def wire_segments(self) -> List[Tuple[Point, Point]]:
+        """Return the deduplicated connections as merged line segments."""
+        netlist = self.netlist
+        ends = netlist.positions[netlist.edges].tolist()
+        if not self.routes:
+            return merge_collinear([tuple(map(tuple, pair)) for pair in ends])
+        segments = []
+        for (start, end), pair in zip(netlist.connection_pairs(), ends):
+            route = self.routes.get((start, end))
+            if route:
+                segments.extend(zip(route, route[1:]))
+            else:
+                segments.append(tuple(map(tuple, pair)))
+        return merge_collinear(segments)
+    
+    def auto_layout(self):
+        """Place every component and route every wire from the connection graph.
+
+        Positions given by the model are replaced and rotations reset, and
+        wires are drawn along orthogonal routes from each connection's start
+        output terminal to its end input terminal.
+        """
+        with METRICS.timer('layout'):
+            result = compute_layout(list(self.components.values()), self.connections)
+            self.netlist.set_geometry([result.positions[component_id] for component_id in self.netlist.ids])
+            self.routes = result.routes
+            self._drawing = None
+    
+    def _element(self, component: Component) -> elm.Element:
+        elem = place_element(ELEMENT_FACTORIES[component.type], component.position, component.rotation)
             
         # Add label
         if component.value:
             elem = elem.label(f'{component.id}\n{component.value}')
         else:
             elem = elem.label(component.id)
-            
-        self.drawing.add(elem)
+        return elem
     
-    def add_connection(self, start_component: str, end_component: str):
-        """Add a wire connection between components."""
-        self.connections.append((start_component, end_component))
-        start_pos = self.components[start_component].position
-        end_pos = self.components[end_component].position
-        self.drawing.add(elm.Line().at(start_pos).to(end_pos))
+    def _build_drawing(self) -> schemdraw.Drawing:
+        drawing = schemdraw.Drawing()
+        for component in self.components.values():
+            drawing.add(self._element(component))
+        for start, end in self.wire_segments():
+            drawing.add(elm.Line().at(start).to(end))
+        return drawing
     
     def from_json(self, json_str: str):
         """Load schematic from JSON description."""
-        data = json.loads(json_str)
-        
-        # Add components
-        for comp in data.get('components', []):
-            component = Component(
-                type=comp['type'],
-                id=comp['id'],
-                value=comp.get('value'),
-                position=tuple(comp.get('position', (0, 0))),
-                rotation=comp.get('rotation', 0)
-            )
-            self.add_component(component)
-        
-        # Add connections
-        for conn in data.get('connections', []):
-            self.add_connection(conn['start'], conn['end'])
+        components, connections = parse_schematic_json(json_str)
+        self.load(components, connections)
     
-    def save(self, filename: str):
-        """Save the schematic to a file."""
-        # Ensure file extension is .svg
-        base, ext = os.path.splitext(filename)
-        if not ext or ext.lower() != '.svg':
-            filename = base + '.svg'
-            
-        self.drawing.save(filename)
+    def load(self, components: List[Component], connections: List[Tuple[str, str]]):
+        """Add already-parsed components and connections."""
+        with METRICS.timer('netlist_build'):
+            for component in components:
+                self.add_component(component)
+            for start, end in connections:
+                self.add_connection(start, end)
+    
+    def netlist_hash(self) -> str:
+        """Return the canonical hash of the current components and connections."""
+        return netlist_hash(list(self.components.values()), self.connections)
+    
+    def is_compact(self) -> bool:
+        """Whether :meth:`save` will use the shared-symbol SVG writer."""
+        return self.compact_threshold is not None and len(self.components) >= self.compact_threshold
+    
+    def render(self) -> bytes:
+        """Render the schematic to SVG bytes."""
+        if self.is_compact():
+            return render_svg(self.netlist, self.wire_segments(), ELEMENT_FACTORIES)
+        return self.drawing.get_imagedata('svg')
+    
+    def export(self, output_format: str) -> str:
+        """Serialise the connectivity as SPICE, KiCad or canonical JSON text."""
+        with METRICS.timer('export'):
+            return export_netlist(self.netlist, output_format)
+    
+    def save(self, filename: str, output_format: str = 'svg'):
+        """Save the schematic to a file.
+
+        SVG is drawn; the other formats of ``EXPORT_FORMATS`` are written
+        straight from the netlist. The extension is forced to match the format.
+        """
+        filename = output_filename(filename, output_format)
+        if output_format == 'svg':
+            with METRICS.timer('render'):
+                data = self.render()
+        else:
+            data = self.export(output_format).encode('utf-8')
+        with METRICS.timer('file_write'):
+            replace_file(filename, data)
         return filename
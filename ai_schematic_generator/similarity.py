@@ -0,0 +1,290 @@
+"""Near-duplicate lookup of circuit descriptions.
+
+Exact response caching misses rephrasings such as "voltage divider with two
+10k resistors" and "two 10k resistor divider".  A :class:`SimilarityIndex`
+remembers the model output for every description it has seen and returns the
+stored output for a new description that is close enough to one of them.
+
+Descriptions are reduced to tokens (lowercased, plurals and number words
+folded, filler words dropped) and embedded as a hashed, L2-normalised vector
+of those tokens and their character trigrams, so no model or network access
+is needed.  Candidates are found with random-hyperplane LSH and then scored
+by exact cosine similarity.  Two descriptions only ever match if they name
+the same kinds of part, the same values and counts ("10k", "2") and the
+same qualifiers ("low" versus "high", "npn" versus "pnp"), however similar
+the rest is.
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from .metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_MAX_ENTRIES = 10000
+DIMENSIONS = 1024
+# 16 tables of 8 bits find a neighbour at cosine 0.85 about 98% of the time.
+LSH_TABLES = 16
+LSH_BITS = 8
+# Trigrams catch spelling variants without outweighing whole words.
+TRIGRAM_WEIGHT = 0.3
+
+_TOKEN = re.compile(r"\d+(?:\.\d+)?[a-zµω]*|[a-z]+")
+_NUMBER_WORDS = {
+    'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5', 'six': '6', 'seven': '7',
+    'eight': '8', 'nine': '9', 'ten': '10', 'eleven': '11', 'twelve': '12', 'twenty': '20',
+    'pair': '2',
+}
+_STOPWORDS = frozenset((
+    'a', 'an', 'and', 'as', 'at', 'basic', 'build', 'by', 'circuit', 'create', 'design', 'draw',
+    'each', 'for', 'from', 'generate', 'give', 'i', 'in', 'into', 'is', 'it', 'make', 'me', 'need',
+    'of', 'on', 'please', 'schematic', 'show', 'simple', 'that', 'the', 'to', 'using', 'want',
+    'which', 'with',
+))
+# Words that flip the meaning of otherwise identical descriptions.
+_QUALIFIERS = frozenset((
+    'astable', 'band', 'base', 'bistable', 'boost', 'buck', 'collector', 'drain', 'emitter',
+    'full', 'gate', 'half', 'high', 'inverting', 'low', 'monostable', 'negative', 'nmos',
+    'noninverting', 'notch', 'npn', 'parallel', 'pmos', 'pnp', 'positive', 'series', 'source',
+))
+# Part nouns, with synonyms folded; a description naming another part is another circuit.
+_PARTS = {
+    'resistor': 'resistor', 'pot': 'potentiometer', 'potentiometer': 'potentiometer',
+    'capacitor': 'capacitor', 'cap': 'capacitor', 'inductor': 'inductor', 'coil': 'inductor',
+    'choke': 'inductor', 'diode': 'diode', 'led': 'led', 'zener': 'zener', 'transistor': 'transistor',
+    'bjt': 'transistor', 'mosfet': 'mosfet', 'fet': 'mosfet', 'opamp': 'opamp',
+    'transformer': 'transformer', 'crystal': 'crystal', 'battery': 'battery', 'switch': 'switch',
+    'relay': 'relay', 'fuse': 'fuse', 'speaker': 'speaker', 'motor': 'motor', 'lamp': 'lamp',
+}
+_UNIT_SUFFIX = re.compile(r"(ohms?|ω)$")
+_UNITS = frozenset(('k', 'm', 'meg', 'u', 'µ', 'n', 'p', 'f', 'h', 'v', 'a', 'w', 'hz', 'khz', 'mhz',
+                    'uf', 'nf', 'pf', 'mh', 'uh', 'ohm', 'ohms'))
+
+
+def description_tokens(description: str) -> List[str]:
+    """Significant tokens of ``description``, in order.
+
+    Values keep their unit prefix ("10k", "100nf") and absorb a unit
+    written apart ("10 k"); number words become digits.
+    """
+    text = description.lower().replace('op-amp', 'opamp').replace('non-inverting', 'noninverting')
+    tokens: List[str] = []
+    for token in _TOKEN.findall(text):
+        if token[0].isdigit():
+            tokens.append(_UNIT_SUFFIX.sub('', token))
+            continue
+        if token in _UNITS and tokens and tokens[-1][0].isdigit():
+            # "10 k" -> "10k"; "10k ohm" -> "10k".
+            tokens[-1] += _UNIT_SUFFIX.sub('', token) if tokens[-1].replace('.', '').isdigit() else ''
+            continue
+        if token in _NUMBER_WORDS:
+            tokens.append(_NUMBER_WORDS[token])
+            continue
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(_PARTS.get(token, token))
+    return tokens
+
+
+def _guard(tokens: List[str]) -> FrozenSet[str]:
+    """Tokens two descriptions must share exactly to be considered the same circuit."""
+    return frozenset(token for token in tokens
+                     if token[0].isdigit() or token in _QUALIFIERS or token in _PARTS)
+
+
+def _bucket(feature: str, dimensions: int) -> Tuple[int, float]:
+    # crc32 is stable across processes, unlike hash().
+    digest = zlib.crc32(feature.encode('utf-8'))
+    return digest % dimensions, 1.0 if digest & 0x80000000 else -1.0
+
+
+def embed(tokens: List[str], dimensions: int = DIMENSIONS) -> np.ndarray:
+    """Unit-length hashed bag of ``tokens`` and their character trigrams."""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for token in set(tokens):
+        index, sign = _bucket(token, dimensions)
+        vector[index] += sign
+        padded = f"#{token}#"
+        for i in range(len(padded) - 2):
+            index, sign = _bucket(padded[i:i + 3], dimensions)
+            vector[index] += sign * TRIGRAM_WEIGHT
+    norm = float(np.linalg.norm(vector))
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+@dataclass(frozen=True)
+class Match:
+    """A stored description close to a query, with its model output."""
+    description: str
+    content: str
+    score: float
+
+
+@dataclass
+class _Entry:
+    description: str
+    content: str
+    scope: str
+    guard: FrozenSet[str]
+    buckets: Tuple[int, ...]
+    row_id: Optional[int] = None
+
+
+class SimilarityIndex:
+    """Model outputs of past descriptions, looked up by nearest description."""
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        path: Optional[str] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        dimensions: int = DIMENSIONS,
+        tables: int = LSH_TABLES,
+        bits: int = LSH_BITS,
+        seed: int = 0
+    ):
+        """Create an index returning stored outputs at cosine similarity >= ``threshold``.
+
+        With ``path``, entries are kept in SQLite and reloaded on start-up.
+        Beyond ``max_entries`` the oldest entry is replaced.  ``tables`` and
+        ``bits`` size the LSH tables; ``seed`` fixes their hyperplanes.
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.threshold = threshold
+        self.path = path
+        self.max_entries = max_entries
+        self.dimensions = dimensions
+        self._planes = np.random.default_rng(seed).standard_normal(
+            (tables * bits, dimensions)).astype(np.float32)
+        self._bit_weights = (1 << np.arange(bits, dtype=np.int64))
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(tables)]
+        self._vectors = np.zeros((0, dimensions), dtype=np.float32)
+        # Slot -> entry; slots are reused round-robin once the index is full.
+        self._entries: List[_Entry] = []
+        self._next = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS descriptions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, scope TEXT NOT NULL, "
+                "description TEXT NOT NULL, content TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT id, scope, description, content FROM descriptions ORDER BY id DESC LIMIT ?",
+                (max_entries,)
+            ).fetchall()
+            for row_id, scope, description, content in reversed(rows):
+                self._insert(description, content, scope, row_id)
+        logger.debug(f"Initialized similarity index (path={path}, entries={len(self)})")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _buckets(self, vector: np.ndarray) -> Tuple[int, ...]:
+        bits = (self._planes @ vector > 0).reshape(len(self._tables), -1)
+        return tuple((bits @ self._bit_weights).tolist())
+
+    def _insert(self, description: str, content: str, scope: str, row_id: Optional[int]) -> Optional[_Entry]:
+        """Index an entry in the next slot and return the entry it replaced."""
+        tokens = description_tokens(description)
+        vector = embed(tokens, self.dimensions)
+        entry = _Entry(description, content, scope, _guard(tokens), self._buckets(vector), row_id)
+        slot = self._next
+        self._next = (slot + 1) % self.max_entries
+        replaced = None
+        if slot < len(self._entries):
+            replaced = self._entries[slot]
+            for table, bucket in zip(self._tables, replaced.buckets):
+                table[bucket].remove(slot)
+                if not table[bucket]:
+                    del table[bucket]
+            self._entries[slot] = entry
+        else:
+            if slot == len(self._vectors):
+                # Grow geometrically so inserts stay amortised O(1).
+                grown = np.zeros((min(max(16, 2 * slot), self.max_entries), self.dimensions), dtype=np.float32)
+                grown[:slot] = self._vectors
+                self._vectors = grown
+            self._entries.append(entry)
+        self._vectors[slot] = vector
+        for table, bucket in zip(self._tables, entry.buckets):
+            table.setdefault(bucket, []).append(slot)
+        return replaced
+
+    def add(self, description: str, content: str, scope: str = ''):
+        """Remember ``content`` as the model output for ``description``.
+
+        ``scope`` separates outputs that are not interchangeable, such as
+        responses to different prompt templates.
+        """
+        with self._lock:
+            row_id = None
+            if self._db is not None:
+                row_id = self._db.execute(
+                    "INSERT INTO descriptions (scope, description, content, created) VALUES (?, ?, ?, ?)",
+                    (scope, description, content, time.time())
+                ).lastrowid
+            replaced = self._insert(description, content, scope, row_id)
+            if self._db is not None:
+                if replaced is not None and replaced.row_id is not None:
+                    self._db.execute("DELETE FROM descriptions WHERE id = ?", (replaced.row_id,))
+                self._db.commit()
+
+    def search(self, description: str, scope: str = '', limit: int = 1) -> List[Match]:
+        """The stored descriptions closest to ``description``, best first, at or above the threshold."""
+        tokens = description_tokens(description)
+        if not tokens:
+            return []
+        vector = embed(tokens, self.dimensions)
+        guard = _guard(tokens)
+        with self._lock:
+            candidates = set()
+            for table, bucket in zip(self._tables, self._buckets(vector)):
+                candidates.update(table.get(bucket, ()))
+            slots = [slot for slot in candidates
+                     if self._entries[slot].scope == scope and self._entries[slot].guard == guard]
+            if not slots:
+                return []
+            scores = self._vectors[slots] @ vector
+            ranked = sorted(zip(scores.tolist(), slots), reverse=True)
+            return [
+                Match(self._entries[slot].description, self._entries[slot].content, score)
+                for score, slot in ranked[:limit] if score >= self.threshold
+            ]
+
+    def lookup(self, description: str, scope: str = '') -> Optional[Match]:
+        """The closest stored match for ``description``, or None below the threshold."""
+        with METRICS.timer('similarity_lookup'):
+            matches = self.search(description, scope)
+        METRICS.inc('similarity_hits' if matches else 'similarity_misses')
+        return matches[0] if matches else None
+
+    def close(self):
+        """Close the on-disk store."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
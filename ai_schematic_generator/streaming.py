@@ -0,0 +1,122 @@
+import json
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Characters that may appear outside strings in well-formed JSON.
+_JSON_BARE = set(' \t\r\n,:{}[]0123456789+-.eEtrufalsn')
+
+
+class StreamParseError(ValueError):
+    """Raised as soon as a streamed response can no longer be valid JSON."""
+
+
+class IncrementalSchematicParser:
+    """Incrementally parses a streamed schematic JSON document.
+
+    ``feed`` returns each object of the top-level ``components`` array as soon
+    as its closing brace arrives, and raises ``StreamParseError`` on the first
+    character that makes the document invalid.
+    """
+
+    def __init__(self):
+        self._text = ''
+        self._document_start = None
+        self._document_end = None
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_key = None
+        self._array_keys = []
+        self._component_start = None
+        self._started = False
+        self._finished = False
+        self._fence = False
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consume ``chunk`` and return any components completed by it."""
+        completed = []
+        start = len(self._text)
+        self._text += chunk
+        for offset, char in enumerate(chunk):
+            index = start + offset
+            if self._finished:
+                if not char.isspace() and char != '`':
+                    logger.debug("Ignoring trailing text after JSON document")
+                    return completed
+                continue
+            if not self._started:
+                if char.isspace():
+                    continue
+                if char == '`' or (self._fence and char not in '{'):
+                    # Tolerate a leading ```json code fence.
+                    self._fence = True
+                    continue
+                if char != '{':
+                    raise StreamParseError(f"Expected '{{' at offset {index}, got {char!r}")
+                self._started = True
+                self._document_start = index
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_key = self._text[self._string_start + 1:index]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char in '{[':
+                if char == '{' and self._stack == ['{', '['] and self._array_keys[-1] == 'components':
+                    self._component_start = index
+                if char == '[':
+                    self._array_keys.append(self._last_key if len(self._stack) == 1 else None)
+                self._stack.append(char)
+            elif char in '}]':
+                expected = '{' if char == '}' else '['
+                if not self._stack or self._stack[-1] != expected:
+                    raise StreamParseError(f"Unexpected {char!r} at offset {index}")
+                self._stack.pop()
+                if char == ']':
+                    self._array_keys.pop()
+                if char == '}' and self._component_start is not None and self._stack == ['{', '[']:
+                    completed.append(self._parse_component(self._component_start, index))
+                    self._component_start = None
+                if not self._stack:
+                    self._finished = True
+                    self._document_end = index
+            elif char not in _JSON_BARE:
+                raise StreamParseError(f"Unexpected character {char!r} at offset {index}")
+        return completed
+
+    def _parse_component(self, start: int, end: int) -> Dict:
+        text = self._text[start:end + 1]
+        try:
+            component = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise StreamParseError(f"Malformed component at offset {start}: {e}")
+        if not isinstance(component.get('type'), str) or not isinstance(component.get('id'), str):
+            raise StreamParseError(f"Component at offset {start} is missing a type or id")
+        return component
+
+    def close(self) -> str:
+        """Finish parsing and return the complete JSON document text."""
+        if not self._finished:
+            raise StreamParseError("Stream ended before the JSON document was complete")
+        document = self._text[self._document_start:self._document_end + 1]
+        try:
+            json.loads(document)
+        except json.JSONDecodeError as e:
+            raise StreamParseError(f"Malformed JSON document: {e}")
+        return document
@@ -0,0 +1,290 @@
+"""Compact SVG output for large netlists.
+
+Every component type is drawn once per rotation as a ``<symbol>`` in
+``<defs>``, from the element :func:`place_element` builds for the full
+renderer; each part is a ``<use>`` reference to it, and all wires share a
+single ``<path>``.  Output size and render time grow with the number of
+parts, not with the points per symbol.
+"""
+import math
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+import numpy as np
+import schemdraw
+from schemdraw import segments
+
+Point = Tuple[float, float]
+Segment = Tuple[Point, Point]
+Box = Tuple[float, float, float, float]
+
+# schemdraw's SVG backend draws one drawing unit as 36 points.
+SCALE = 36.0
+STROKE_WIDTH = 2
+FONT_SIZE = 14
+ARC_STEPS = 8
+MARGIN = 1.0
+LABEL_OFFSET = 0.45
+
+
+def _num(value: float) -> str:
+    text = f"{value:.2f}".rstrip('0').rstrip('.')
+    return '0' if text in ('', '-0') else text
+
+
+def _xy(point: Point) -> str:
+    # Drawing units are y-up, SVG is y-down.
+    return f"{_num(point[0] * SCALE)},{_num(-point[1] * SCALE)}"
+
+
+def _polyline(points: Sequence[Point]) -> str:
+    """Path data for ``points``; NaN points split the line into subpaths."""
+    parts = []
+    pen_down = False
+    for x, y in points:
+        if math.isnan(x) or math.isnan(y):
+            pen_down = False
+            continue
+        parts.append(('L' if pen_down else 'M') + _xy((x, y)))
+        pen_down = True
+    return ''.join(parts)
+
+
+def _arc_points(arc: segments.SegmentArc) -> List[Point]:
+    cx, cy = arc.center
+    angle = math.radians(arc.angle)
+    theta1, theta2 = arc.theta1, arc.theta2
+    if theta2 < theta1:
+        theta2 += 360
+    points = []
+    for step in range(ARC_STEPS + 1):
+        t = math.radians(theta1 + (theta2 - theta1) * step / ARC_STEPS)
+        x, y = arc.width / 2 * math.cos(t), arc.height / 2 * math.sin(t)
+        points.append((cx + x * math.cos(angle) - y * math.sin(angle),
+                       cy + x * math.sin(angle) + y * math.cos(angle)))
+    return points
+
+
+def _circle_points(circle: segments.SegmentCircle) -> List[Point]:
+    cx, cy = circle.center
+    steps = ARC_STEPS * 2
+    return [(cx + circle.radius * math.cos(2 * math.pi * i / steps),
+             cy + circle.radius * math.sin(2 * math.pi * i / steps)) for i in range(steps + 1)]
+
+
+def place_element(factory: Callable[[], schemdraw.elements.Element], position: Point,
+                  rotation: float) -> schemdraw.elements.Element:
+    """Build the element for a component at ``position``, turned by ``rotation`` degrees.
+
+    Rotated two-terminal parts are drawn one unit long towards their
+    rotation; other elements are turned in place.
+    """
+    element = factory().at(position)
+    if rotation != 0:
+        if isinstance(element, schemdraw.elements.Element2Term):
+            theta = math.radians(rotation)
+            element = element.to((position[0] + math.cos(theta), position[1] + math.sin(theta)))
+        else:
+            # Multi-terminal elements have no end point to aim at.
+            element = element.theta(rotation)
+    return element
+
+
+def normalize_rotation(rotation: float) -> float:
+    """``rotation`` in ``[0, 360)`` degrees, to the 0.01 degree the symbol ids keep."""
+    return round(rotation % 360, 2) % 360
+
+
+def symbol_name(name: str, rotation: float) -> str:
+    """``id`` of the ``<symbol>`` drawing type ``name`` at ``rotation``."""
+    rotation = normalize_rotation(rotation)
+    return name if rotation == 0 else f"{name}-r{_num(rotation)}"
+
+
+@lru_cache(maxsize=None)
+def symbol_geometry(factory: Callable[[], schemdraw.elements.Element],
+                    rotation: float = 0.0) -> Tuple[str, str, Box]:
+    """Return ``(stroke_path, fill_path, bbox)`` for one element drawn at the origin.
+
+    The element comes from :func:`place_element`, as in the full renderer,
+    so a ``<use>`` at a component's position draws exactly the same part.
+    """
+    drawing = schemdraw.Drawing()
+    element = drawing.add(place_element(factory, (0, 0), rotation))
+    stroke, fill = [], []
+    points: List[Point] = []
+    for segment in element.segments:
+        segment = segment.xform(element.transform)
+        if isinstance(segment, segments.Segment):
+            path = [tuple(p) for p in segment.path]
+        elif isinstance(segment, segments.SegmentPoly):
+            path = [tuple(p) for p in segment.verts]
+            if segment.closed:
+                path.append(path[0])
+        elif isinstance(segment, segments.SegmentArc):
+            path = _arc_points(segment)
+        elif isinstance(segment, segments.SegmentCircle):
+            path = _circle_points(segment)
+        else:
+            # Text and other decorations are replaced by the component label.
+            continue
+        data = _polyline(path)
+        (fill if getattr(segment, 'fill', None) else stroke).append(data)
+        points.extend(p for p in path if not math.isnan(p[0]))
+    xs = [p[0] for p in points] or [0.0]
+    ys = [p[1] for p in points] or [0.0]
+    return ''.join(stroke), ''.join(fill), (min(xs), min(ys), max(xs), max(ys))
+
+
+def _attr_id(element_id: Optional[str]) -> str:
+    return '' if element_id is None else f' id="{escape(element_id, {chr(34): "&quot;"})}"'
+
+
+def symbol_def(name: str, geometry: Tuple[str, str, Box]) -> str:
+    """The ``<symbol>`` drawn once per component type."""
+    stroke, fill, _ = geometry
+    body = f'<path d="{stroke}"/>' if stroke else ''
+    if fill:
+        body += f'<path d="{fill}" style="fill:black"/>'
+    return f'<symbol id="{name}" overflow="visible">{body}</symbol>'
+
+
+def symbol_table(netlist, factories: Dict[str, Callable[[], schemdraw.elements.Element]]
+                 ) -> Tuple[List[str], Dict[str, Tuple[str, str, Box]]]:
+    """The symbol name of each component and the geometry of every symbol used.
+
+    Rotations are normalised first, so every rotation sharing a symbol id
+    also shares the geometry drawn for it.
+    """
+    names = []
+    geometry = {}
+    for code, rotation in zip(netlist.types.tolist(), netlist.rotations.tolist()):
+        type_name = netlist.type_names[code]
+        rotation = normalize_rotation(rotation)
+        name = symbol_name(type_name, rotation)
+        if name not in geometry:
+            geometry[name] = symbol_geometry(factories[type_name], rotation)
+        names.append(name)
+    return names, geometry
+
+
+def part_symbol(type_name: str, rotation: float,
+                factories: Dict[str, Callable[[], schemdraw.elements.Element]]
+                ) -> Tuple[str, Tuple[str, str, Box]]:
+    """The symbol name and geometry of one component, as :func:`symbol_table` finds them."""
+    rotation = normalize_rotation(rotation)
+    return symbol_name(type_name, rotation), symbol_geometry(factories[type_name], rotation)
+
+
+def part_extent(box: Box, position: Point) -> Tuple[Point, Box]:
+    """Label anchor and extent of one symbol ``box`` placed at ``position``.
+
+    The same as :func:`label_anchors` and :func:`drawing_bounds` give for
+    that component alone.
+    """
+    x0, y0, x1, y1 = box[0] + position[0], box[1] + position[1], box[2] + position[0], box[3] + position[1]
+    anchor = ((x0 + x1) / 2, y1 + LABEL_OFFSET)
+    return anchor, (min(x0, anchor[0]), y0, max(x1, anchor[0]), max(y1, anchor[1] + LABEL_OFFSET))
+
+
+def component_boxes(netlist, symbols: Sequence[str], geometry: Dict[str, Tuple[str, str, Box]]) -> np.ndarray:
+    """``(n, 4)`` placed ``xmin, ymin, xmax, ymax`` of each component's symbol."""
+    if not len(netlist):
+        return np.zeros((0, 4))
+    boxes = np.array([geometry[name][2] for name in symbols], dtype=np.float64)
+    return boxes + np.tile(netlist.positions, 2)
+
+
+def label_anchors(netlist, symbols: Sequence[str], geometry: Dict[str, Tuple[str, str, Box]]) -> np.ndarray:
+    """``(n, 2)`` label positions, centred above each placed symbol."""
+    boxes = component_boxes(netlist, symbols, geometry)
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, boxes[:, 3] + LABEL_OFFSET], axis=1)
+
+
+def use_element(name: str, position: Point, element_id: Optional[str] = None) -> str:
+    """A ``<use>`` placing the ``name`` symbol."""
+    px, py = position
+    return f'<use{_attr_id(element_id)} href="#{name}" x="{_num(px * SCALE)}" y="{_num(-py * SCALE)}"/>'
+
+
+def label_element(component_id: str, value: Optional[str], anchor: Point,
+                  element_id: Optional[str] = None) -> str:
+    """The ``<text>`` label of one component."""
+    text = component_id if not value else f"{component_id} {value}"
+    lx, ly = anchor
+    return f'<text{_attr_id(element_id)} x="{_num(lx * SCALE)}" y="{_num(-ly * SCALE)}">{escape(text)}</text>'
+
+
+def wire_path(wires: Iterable[Segment], element_id: Optional[str] = None) -> str:
+    """One ``<path>`` drawing every segment of ``wires``; empty if there are none."""
+    data = ''.join(f"M{_xy(start)}L{_xy(end)}" for start, end in wires)
+    return f'<path{_attr_id(element_id)} d="{data}"/>' if data else ''
+
+
+def _frame(bounds: Box) -> Tuple[float, float, float, float]:
+    x0, y0, x1, y1 = bounds
+    left, right = (x0 - MARGIN) * SCALE, (x1 + MARGIN) * SCALE
+    top, bottom = -(y1 + MARGIN) * SCALE, -(y0 - MARGIN) * SCALE
+    return left, top, right - left, bottom - top
+
+
+def view_box(bounds: Box) -> str:
+    """The ``viewBox`` attribute for drawing-unit ``bounds``, margins included."""
+    return ' '.join(_num(value) for value in _frame(bounds))
+
+
+def svg_document(bounds: Box, defs: Iterable[str], wires: Iterable[str],
+                 uses: Iterable[str], labels: Iterable[str]) -> bytes:
+    """Assemble the SVG from its fragments; ``bounds`` is in drawing units, before margins."""
+    width, height = _frame(bounds)[2:]
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_num(width)}pt" height="{_num(height)}pt" '
+        f'viewBox="{view_box(bounds)}">',
+        f'<defs>{"".join(defs)}</defs>',
+        f'<g style="stroke:black;fill:none;stroke-width:{STROKE_WIDTH};stroke-linecap:round;stroke-linejoin:round">',
+    ]
+    parts.extend(wire for wire in wires if wire)
+    parts.extend(uses)
+    parts.append('</g>')
+    parts.append(f'<g style="font-family:sans-serif;font-size:{FONT_SIZE}px;text-anchor:middle" fill="black">')
+    parts.extend(labels)
+    parts.append('</g></svg>')
+    return '\n'.join(parts).encode('utf-8')
+
+
+def drawing_bounds(netlist, symbols: Sequence[str], geometry: Dict[str, Tuple[str, str, Box]],
+                   labels_at: np.ndarray, xs: List[float], ys: List[float]) -> Box:
+    """Extent of the components, their labels and the wire points ``xs``/``ys``."""
+    xs, ys = list(xs), list(ys)
+    if len(netlist):
+        boxes = component_boxes(netlist, symbols, geometry)
+        x0, y0 = float(boxes[:, 0].min()), float(boxes[:, 1].min())
+        x1, y1 = float(boxes[:, 2].max()), float(boxes[:, 3].max())
+        xs.extend((x0, x1, float(labels_at[:, 0].min()), float(labels_at[:, 0].max())))
+        ys.extend((y0, y1, float(labels_at[:, 1].max()) + LABEL_OFFSET))
+    if not xs:
+        xs, ys = [0.0], [0.0]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def render_svg(netlist, wires: Iterable[Segment],
+               factories: Dict[str, Callable[[], schemdraw.elements.Element]]) -> bytes:
+    """Render a :class:`~.netlist.Netlist` and wire segments as SVG with shared symbols."""
+    symbols, geometry = symbol_table(netlist, factories)
+    defs = [symbol_def(name, g) for name, g in geometry.items()]
+    labels_at = label_anchors(netlist, symbols, geometry)
+
+    values, positions = netlist.values, netlist.positions.tolist()
+    anchors = labels_at.tolist()
+    uses = []
+    labels = []
+    for i, component_id in enumerate(netlist.ids):
+        uses.append(use_element(symbols[i], positions[i]))
+        labels.append(label_element(component_id, values[i], anchors[i]))
+
+    wires = list(wires)
+    xs = [x for start, end in wires for x in (start[0], end[0])]
+    ys = [y for start, end in wires for y in (start[1], end[1])]
+    bounds = drawing_bounds(netlist, symbols, geometry, labels_at, xs, ys)
+    return svg_document(bounds, defs, [wire_path(wires)], uses, labels)
@@ -0,0 +1,169 @@
+"""Single-pass validation of schematic JSON before any drawing work.
+
+Model output is checked as a whole (component types, unique ids, numeric
+positions and rotations, connection endpoints) and every problem is
+reported at once as a :class:`ValidationIssue`, so a retry can tell the
+model exactly what to fix.
+"""
+import math
+from dataclasses import dataclass
+from typing import Any, Collection, Dict, List, Optional, Set
+
+
+@dataclass(frozen=True)
+class ValidationIssue:
+    path: str
+    code: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.message}"
+
+
+class SchematicValidationError(ValueError):
+    """Raised when a schematic document fails validation; ``issues`` lists why."""
+
+    def __init__(self, issues: List[ValidationIssue], document: Optional[str] = None):
+        self.issues = list(issues)
+        # The raw model output, when known, so a retry can quote it back.
+        self.document = document
+        shown = "; ".join(str(issue) for issue in self.issues[:5])
+        more = f" (and {len(self.issues) - 5} more)" if len(self.issues) > 5 else ""
+        super().__init__(f"Invalid schematic: {shown}{more}")
+
+    def __reduce__(self):
+        return (type(self), (self.issues, self.document))
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def validate_component(comp: Any, index: int, component_types: Collection[str],
+                       seen_ids: Optional[Set[str]] = None, path: Optional[str] = None) -> List[ValidationIssue]:
+    """Check one entry of the ``components`` list; adds its id to ``seen_ids``.
+
+    Issues are reported under ``components[index]`` unless ``path`` is given.
+    """
+    path = path or f"components[{index}]"
+    if not isinstance(comp, dict):
+        return [ValidationIssue(path, 'not_object', "must be an object")]
+    issues = []
+    kind = comp.get('type')
+    if not isinstance(kind, str) or kind not in component_types:
+        issues.append(ValidationIssue(
+            f"{path}.type", 'unknown_type',
+            f"unknown type {kind!r}; expected one of {', '.join(sorted(component_types))}"
+        ))
+    component_id = comp.get('id')
+    if not isinstance(component_id, str) or not component_id:
+        issues.append(ValidationIssue(f"{path}.id", 'missing_id', "must be a non-empty string"))
+    elif seen_ids is not None:
+        if component_id in seen_ids:
+            issues.append(ValidationIssue(f"{path}.id", 'duplicate_id', f"duplicate id {component_id!r}"))
+        seen_ids.add(component_id)
+    value = comp.get('value')
+    if value is not None and not isinstance(value, str):
+        issues.append(ValidationIssue(f"{path}.value", 'bad_value', "must be a string"))
+    if 'position' in comp:
+        position = comp['position']
+        if not (isinstance(position, (list, tuple)) and len(position) == 2 and all(map(_is_number, position))):
+            issues.append(ValidationIssue(f"{path}.position", 'bad_position', "must be [x, y] with finite numbers"))
+    if 'rotation' in comp and not _is_number(comp['rotation']):
+        issues.append(ValidationIssue(f"{path}.rotation", 'bad_rotation', "must be a finite number"))
+    return issues
+
+
+def validate_schematic(data: Any, component_types: Collection[str]) -> List[ValidationIssue]:
+    """Return every problem in a parsed schematic document; empty if it is valid."""
+    if not isinstance(data, dict):
+        return [ValidationIssue('$', 'not_object', "document must be a JSON object")]
+    issues: List[ValidationIssue] = []
+    components = data.get('components', [])
+    connections = data.get('connections', [])
+    if not isinstance(components, list):
+        issues.append(ValidationIssue('components', 'not_list', "must be a list"))
+        components = []
+    if not isinstance(connections, list):
+        issues.append(ValidationIssue('connections', 'not_list', "must be a list"))
+        connections = []
+
+    ids: Set[str] = set()
+    for index, comp in enumerate(components):
+        issues.extend(validate_component(comp, index, component_types, ids))
+
+    for index, conn in enumerate(connections):
+        path = f"connections[{index}]"
+        if not isinstance(conn, dict):
+            issues.append(ValidationIssue(path, 'not_object', "must be an object"))
+            continue
+        for end in ('start', 'end'):
+            component_id = conn.get(end)
+            if not isinstance(component_id, str):
+                issues.append(ValidationIssue(f"{path}.{end}", 'missing_endpoint', "must be a component id"))
+            elif component_id not in ids:
+                issues.append(ValidationIssue(
+                    f"{path}.{end}", 'unknown_endpoint', f"unknown component {component_id!r}"
+                ))
+    return issues
+
+
+PATCH_OPS = ('add', 'update', 'remove', 'connect', 'disconnect')
+# Fields an ``update`` operation may change.
+UPDATE_FIELDS = ('type', 'value', 'position', 'rotation')
+
+
+def validate_patch(ops: Any, components: Dict[str, Dict], component_types: Collection[str]) -> List[ValidationIssue]:
+    """Return every problem in an edit patch applied to ``components`` (id -> component dict).
+
+    Operations are checked in order against the schematic as the earlier
+    ones leave it, so a patch may add a part and then connect it.
+    """
+    if not isinstance(ops, list):
+        return [ValidationIssue('$', 'not_list', "patch must be a list of operations")]
+    issues: List[ValidationIssue] = []
+    state = dict(components)
+    for index, op in enumerate(ops):
+        path = f"patch[{index}]"
+        if not isinstance(op, dict):
+            issues.append(ValidationIssue(path, 'not_object', "must be an object"))
+            continue
+        kind = op.get('op')
+        if kind not in PATCH_OPS:
+            issues.append(ValidationIssue(
+                f"{path}.op", 'unknown_op', f"unknown op {kind!r}; expected one of {', '.join(PATCH_OPS)}"
+            ))
+        elif kind == 'add':
+            comp = op.get('component')
+            found = validate_component(comp, index, component_types, set(state), f"{path}.component")
+            issues.extend(found)
+            if not found:
+                state[comp['id']] = comp
+        elif kind in ('update', 'remove'):
+            component_id = op.get('id')
+            if not isinstance(component_id, str) or component_id not in state:
+                issues.append(ValidationIssue(f"{path}.id", 'unknown_id', f"unknown component {component_id!r}"))
+            elif kind == 'remove':
+                del state[component_id]
+            else:
+                merged = dict(state[component_id], **{field: op[field] for field in UPDATE_FIELDS if field in op})
+                found = validate_component(merged, index, component_types, path=path)
+                issues.extend(found)
+                if not found:
+                    state[component_id] = merged
+        else:
+            for end in ('start', 'end'):
+                component_id = op.get(end)
+                if not isinstance(component_id, str):
+                    issues.append(ValidationIssue(f"{path}.{end}", 'missing_endpoint', "must be a component id"))
+                elif component_id not in state:
+                    issues.append(ValidationIssue(
+                        f"{path}.{end}", 'unknown_endpoint', f"unknown component {component_id!r}"
+                    ))
+    return issues
+
+
+def correction_prompt(issues: List[ValidationIssue]) -> str:
+    """Follow-up message asking the model to fix ``issues`` in its last reply."""
+    lines = "\n".join(f"- {issue}" for issue in issues)
+    return f"That JSON is invalid:\n{lines}\nReply with the corrected JSON only."
@@ -0,0 +1,41 @@
+"""Deterministic synthetic circuits for benchmarks."""
+import random
+
+TYPES = ('resistor', 'capacitor', 'inductor', 'diode', 'transistor')
+PREFIXES = {'resistor': 'R', 'capacitor': 'C', 'inductor': 'L', 'diode': 'D', 'transistor': 'Q'}
+VALUES = {
+    'resistor': ('1k', '4.7k', '10k', '100k'),
+    'capacitor': ('100nF', '1uF', '10uF'),
+    'inductor': ('1mH', '10uH'),
+    'diode': ('1N4148', 'LED'),
+    'transistor': ('2N3904', 'BC547'),
+}
+
+
+def synthetic_circuit(components: int, seed: int = 0) -> dict:
+    """Build a circuit with ``components`` parts laid out on a grid.
+
+    Parts are chained in order and roughly one in five gets an extra random
+    connection, so the netlist has a realistic mix of series and branch wires.
+    """
+    rng = random.Random(seed)
+    columns = max(1, int(components ** 0.5))
+    parts = []
+    for i in range(components):
+        kind = TYPES[i % len(TYPES)]
+        parts.append({
+            'type': kind,
+            'id': f"{PREFIXES[kind]}{i + 1}",
+            'value': rng.choice(VALUES[kind]),
+            'position': [(i % columns) * 3, (i // columns) * 3],
+            'rotation': rng.choice((0, 0, 90)),
+        })
+    connections = [
+        {'start': parts[i]['id'], 'end': parts[i + 1]['id']}
+        for i in range(components - 1)
+    ]
+    for i in range(0, components, 5):
+        j = rng.randrange(components)
+        if j != i:
+            connections.append({'start': parts[i]['id'], 'end': parts[j]['id']})
+    return {'components': parts, 'connections': connections}
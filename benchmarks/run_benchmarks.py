@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""Offline throughput benchmarks for the schematic pipeline.
+
+Runs the real rendering, layout, CLI startup, AISchematicGenerator and Flask /generate code paths
+against a local stub of the Messages API, reports ops/sec, p50/p99 latency and
+peak RSS per benchmark, and compares the results with stored baselines.
+
+    python benchmarks/run_benchmarks.py                    # run and compare
+    python benchmarks/run_benchmarks.py --save-baseline    # record new baselines
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from circuits import synthetic_circuit
+from stub_server import StubConfig, start_stub_server
+
+DEFAULT_BASELINE = os.path.join(HERE, 'baselines.json')
+DEFAULT_SIZES = (2, 10, 100, 1000, 5000)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize(latencies, wall):
+    return {
+        'ops': len(latencies),
+        'ops_per_sec': len(latencies) / wall if wall else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def iterations_for(size, requested):
+    # Keep the big circuits from dominating the run time.
+    return max(1, min(requested, 5000 // max(size, 1) or 1))
+
+
+def bench_render(size, args, workdir):
+    from ai_schematic_generator.schematic_generator import SchematicGenerator
+    document = json.dumps(synthetic_circuit(size))
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations_for(size, args.iterations)):
+        t0 = time.perf_counter()
+        generator = SchematicGenerator()
+        generator.from_json(document)
+        generator.save(os.path.join(workdir, f"render_{size}_{i}.svg"))
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def bench_layout(size, args):
+    from ai_schematic_generator.schematic_generator import SchematicGenerator
+    document = json.dumps(synthetic_circuit(size))
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations_for(size, args.iterations)):
+        generator = SchematicGenerator()
+        generator.from_json(document)
+        t0 = time.perf_counter()
+        generator.auto_layout()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+STARTUP_COMMANDS = {
+    'startup_help': ['--help'],
+    'startup_no_key': ['generate', 'benchmark circuit'],
+}
+
+
+def bench_startup(name, args):
+    """Time ``ai_schematics`` invocations that should never import the SDK or renderer."""
+    command = [sys.executable, '-m', 'ai_schematic_generator.cli'] + STARTUP_COMMANDS[name]
+    env = {key: value for key, value in os.environ.items() if key != 'ANTHROPIC_API_KEY'}
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.dirname(HERE), env.get('PYTHONPATH')]))
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        t0 = time.perf_counter()
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        latencies.append(time.perf_counter() - t0)
+    result = summarize(latencies, time.perf_counter() - start)
+    # The work happens in the children, so report their peak instead.
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    result['peak_rss_mb'] = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    return result
+
+
+def bench_generator(args, workdir, stream=False):
+    from ai_schematic_generator.ai_generator import AISchematicGenerator
+    config = StubConfig(components=args.components, latency=args.latency, error_rate=args.error_rate)
+    server, url = start_stub_server(config)
+
+    async def run():
+        latencies = []
+        semaphore = asyncio.Semaphore(args.concurrency)
+        async with AISchematicGenerator('stub-key', base_url=url,
+                                        max_connections=args.concurrency) as generator:
+            async def one(i):
+                async with semaphore:
+                    t0 = time.perf_counter()
+                    # Distinct descriptions so requests are not coalesced.
+                    await generator.generate_schematic_from_description(
+                        f"benchmark circuit {i}", os.path.join(workdir, f"gen_{i}.svg"),
+                        max_retries=5, stream=stream
+                    )
+                    latencies.append(time.perf_counter() - t0)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(args.iterations)))
+            return latencies, time.perf_counter() - start
+
+    try:
+        latencies, wall = asyncio.run(run())
+    finally:
+        server.shutdown()
+    return summarize(latencies, wall)
+
+
+def bench_flask(args, workdir):
+    config = StubConfig(components=args.components, latency=args.latency, error_rate=args.error_rate)
+    server, url = start_stub_server(config)
+    os.environ['ANTHROPIC_BASE_URL'] = url
+    os.environ.setdefault('ANTHROPIC_API_KEY', 'stub-key')
+    os.chdir(workdir)
+    import wsgi
+    client = wsgi.app.test_client()
+    latencies = []
+    start = time.perf_counter()
+    try:
+        for i in range(args.iterations):
+            t0 = time.perf_counter()
+            response = client.post('/generate', json={'description': f"benchmark circuit {i}"})
+            if response.status_code != 200:
+                raise RuntimeError(f"/generate failed: {response.get_json()}")
+            latencies.append(time.perf_counter() - t0)
+        return summarize(latencies, time.perf_counter() - start)
+    finally:
+        wsgi.jobs.shutdown()
+        server.shutdown()
+
+
+def benchmark_names(args):
+    names = [f"render_{size}" for size in args.sizes]
+    names += [f"layout_{size}" for size in args.sizes]
+    names += list(STARTUP_COMMANDS)
+    names += ['generator', 'generator_stream', 'flask_generate']
+    if args.only:
+        names = [name for name in names if any(pattern in name for pattern in args.only)]
+    return names
+
+
+def run_one(name, args):
+    with tempfile.TemporaryDirectory() as workdir:
+        if name.startswith('render_'):
+            return bench_render(int(name.split('_')[1]), args, workdir)
+        if name.startswith('layout_'):
+            return bench_layout(int(name.split('_')[1]), args)
+        if name in STARTUP_COMMANDS:
+            return bench_startup(name, args)
+        if name == 'generator':
+            return bench_generator(args, workdir)
+        if name == 'generator_stream':
+            return bench_generator(args, workdir, stream=True)
+        if name == 'flask_generate':
+            return bench_flask(args, workdir)
+    raise ValueError(f"Unknown benchmark: {name}")
+
+
+def run_isolated(name, argv):
+    """Run one benchmark in a fresh interpreter so peak RSS is per benchmark."""
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', name] + argv,
+        capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        sys.stderr.write(process.stderr)
+        raise RuntimeError(f"Benchmark {name} failed")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['ops_per_sec'] < base['ops_per_sec'] * (1 - tolerance):
+            regressions.append(f"{name}: {result['ops_per_sec']:.2f} ops/s vs baseline {base['ops_per_sec']:.2f}")
+        if result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{name}: {result['peak_rss_mb']:.1f} MB peak RSS vs baseline {base['peak_rss_mb']:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='Component counts for the render benchmarks')
+    parser.add_argument('--iterations', type=int, default=20, help='Operations per benchmark')
+    parser.add_argument('--concurrency', type=int, default=8, help='In-flight generations')
+    parser.add_argument('--components', type=int, default=10, help='Circuit size returned by the stub')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stub response latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Stub 429/529 injection rate')
+    parser.add_argument('--only', nargs='+', help='Only run benchmarks whose name contains one of these')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed fractional regression')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_one(args.worker, args)))
+        return 0
+
+    argv = [arg for arg in sys.argv[1:] if arg != '--save-baseline']
+    results = {}
+    print(f"{'Benchmark':<20} {'ops/sec':>10} {'p50 ms':>10} {'p99 ms':>10} {'peak MB':>10}")
+    print("-" * 64)
+    for name in benchmark_names(args):
+        result = results[name] = run_isolated(name, argv)
+        print(f"{name:<20} {result['ops_per_sec']:>10.2f} {result['p50_ms']:>10.1f} "
+              f"{result['p99_ms']:>10.1f} {result['peak_rss_mb']:>10.1f}")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Local Anthropic-compatible Messages API stub for offline benchmarks.
+
+Serves ``POST /v1/messages`` (plain and ``stream: true``) with a synthetic
+circuit of a configurable size, after a configurable latency, and can inject
+429/529 errors at a given rate.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from circuits import synthetic_circuit
+
+
+class StubConfig:
+    def __init__(self, components=10, latency=0.05, error_rate=0.0, chunk_size=64, seed=0):
+        self.components = components
+        self.latency = latency
+        self.error_rate = error_rate
+        self.chunk_size = chunk_size
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_event(self, event, data):
+        payload = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+        self.wfile.write(f"{len(payload):x}\r\n".encode('ascii') + payload + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/v1/messages':
+            self._send_json(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        config = self.config
+
+        with config.lock:
+            config.requests += 1
+            fail = config.random.random() < config.error_rate
+            if fail:
+                config.errors += 1
+        time.sleep(config.latency)
+        if fail:
+            status, kind = config.random.choice([(429, 'rate_limit_error'), (529, 'overloaded_error')])
+            self._send_json(status, {'type': 'error', 'error': {'type': kind, 'message': 'injected'}},
+                            {'retry-after': '0'})
+            return
+
+        text = json.dumps(synthetic_circuit(config.components))
+        prompt = json.dumps(request.get('messages', []))
+        usage = {'input_tokens': len(prompt) // 4, 'output_tokens': len(text) // 4}
+        message = {
+            'id': f"msg_{uuid.uuid4().hex}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': request.get('model', 'stub'),
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': usage,
+        }
+        if not request.get('stream'):
+            self._send_json(200, message)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self._send_event('message_start', {'type': 'message_start', 'message': dict(
+            message, content=[], stop_reason=None, usage=dict(usage, output_tokens=0))})
+        self._send_event('content_block_start', {
+            'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}})
+        for i in range(0, len(text), config.chunk_size):
+            self._send_event('content_block_delta', {
+                'type': 'content_block_delta', 'index': 0,
+                'delta': {'type': 'text_delta', 'text': text[i:i + config.chunk_size]}})
+        self._send_event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        self._send_event('message_delta', {
+            'type': 'message_delta', 'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+            'usage': {'output_tokens': usage['output_tokens']}})
+        self._send_event('message_stop', {'type': 'message_stop'})
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_stub_server(config: StubConfig, host='127.0.0.1', port=0):
+    """Start the stub in a daemon thread and return ``(server, base_url)``."""
+    handler = type('ConfiguredStubHandler', (StubHandler,), {'config': config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--components', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds before each response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests failing with 429/529')
+    args = parser.parse_args()
+    server, url = start_stub_server(
+        StubConfig(args.components, args.latency, args.error_rate), port=args.port
+    )
+    print(f"Stub Anthropic API listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
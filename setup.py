@@ -4,13 +4,19 @@ setup(
     name="ai-schematic-generator",
     version="0.1.0",
     packages=find_packages(),
+    python_requires=">=3.10",
     install_requires=[
-        "anthropic",
+        "anthropic>=0.42.0",
+        "httpx",
         "schemdraw",
         "numpy",
         "click",
         "rich",
     ],
+    extras_require={
+        "images": ["Pillow", "cairosvg"],
+        "artifacts": ["brotli", "boto3"],
+    },
     entry_points={
         'console_scripts': [
             'ai_schematics=ai_schematic_generator.cli:cli',
@@ -14,7 +14,7 @@ logging.basicConfig(
 @pytest.fixture
 def mock_anthropic_client(monkeypatch):
     """Mock Anthropic client for testing."""
-    mock_client = MagicMock(spec=anthropic.Anthropic)
+    mock_client = MagicMock(spec=anthropic.AsyncAnthropic)
     
     # Create async mock for messages.create
     mock_messages = AsyncMock()
@@ -44,8 +44,9 @@ def mock_anthropic_client(monkeypatch):
     
     mock_messages.create = AsyncMock(return_value=mock_response)
     mock_client.messages = mock_messages
+    mock_client.close = AsyncMock()
     
-    monkeypatch.setattr('anthropic.Anthropic', lambda *args, **kwargs: mock_client)
+    monkeypatch.setattr('anthropic.AsyncAnthropic', lambda *args, **kwargs: mock_client)
     return mock_client
 
 @pytest.fixture(scope='function')
@@ -54,3 +55,8 @@ def event_loop(request):
     loop = asyncio.new_event_loop()
     yield loop
     loop.close()
+
+@pytest.fixture(autouse=True)
+def isolated_daemon_socket(monkeypatch, tmp_path):
+    """Keep CLI tests from handing work to a daemon the developer is running."""
+    monkeypatch.setenv('AI_SCHEMATICS_SOCKET', str(tmp_path / 'd.sock'))
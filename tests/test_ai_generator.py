@@ -1,4 +1,5 @@
 import pytest
+import asyncio
 from ai_schematic_generator.ai_generator import AISchematicGenerator
 
 class TestAISchematicGenerator:
@@ -13,3 +14,82 @@ class TestAISchematicGenerator:
         prompt = ai_generator._generate_circuit_prompt(description)
         assert description in prompt
         assert "JSON" in prompt
+
+    @pytest.mark.asyncio
+    async def test_async_context_manager_closes_client(self, mock_anthropic_client):
+        """Test that leaving the context closes the client and its pool."""
+        async with AISchematicGenerator("dummy-api-key") as generator:
+            assert not generator.http_client.is_closed
+        mock_anthropic_client.close.assert_awaited_once()
+        assert generator.http_client.is_closed
+
+    def test_connection_pool_settings(self, mock_anthropic_client, monkeypatch):
+        """Test that pool size and timeouts are configurable."""
+        pool, client = {}, {}
+        monkeypatch.setattr('anthropic.DefaultAsyncHttpxClient', lambda **kwargs: pool.update(kwargs))
+        monkeypatch.setattr('anthropic.AsyncAnthropic', lambda **kwargs: client.update(kwargs))
+        AISchematicGenerator("dummy-api-key", max_connections=4, timeout=12.0, connect_timeout=3.0)
+        assert pool['limits'].max_connections == 4
+        assert pool['limits'].max_keepalive_connections == 4
+        assert client['timeout'].read == 12.0
+        assert client['timeout'].connect == 3.0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_descriptions_share_one_call(self, ai_generator, mock_anthropic_client, tmp_path):
+        """Test that concurrent equivalent descriptions are coalesced."""
+        response = mock_anthropic_client.messages.create.return_value
+
+        async def slow_create(**kwargs):
+            await asyncio.sleep(0.01)
+            return response
+
+        mock_anthropic_client.messages.create.side_effect = slow_create
+        outputs = [tmp_path / f"out{i}.svg" for i in range(3)]
+        await asyncio.gather(
+            ai_generator.generate_schematic_from_description("Voltage divider", str(outputs[0])),
+            ai_generator.generate_schematic_from_description("voltage   divider", str(outputs[1])),
+            ai_generator.generate_schematic_from_description(" VOLTAGE DIVIDER ", str(outputs[2])),
+        )
+        assert mock_anthropic_client.messages.create.await_count == 1
+        assert all(output.exists() for output in outputs)
+        assert ai_generator._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_coalesced_failure_propagates(self, ai_generator, mock_anthropic_client, tmp_path):
+        """Test that followers see the leader's failure."""
+        async def failing_create(**kwargs):
+            await asyncio.sleep(0.01)
+            raise Exception("API down")
+
+        mock_anthropic_client.messages.create.side_effect = failing_create
+        results = await asyncio.gather(
+            ai_generator.generate_schematic_from_description("divider", str(tmp_path / "a.svg"), max_retries=1),
+            ai_generator.generate_schematic_from_description("divider", str(tmp_path / "b.svg"), max_retries=1),
+            return_exceptions=True
+        )
+        assert all("API down" in str(result) for result in results)
+        assert mock_anthropic_client.messages.create.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_edit_schematic_applies_patch(self, ai_generator, mock_anthropic_client):
+        """Test that an edit sends the current schematic and applies the reply."""
+        from ai_schematic_generator.editor import SchematicEditor
+        editor = SchematicEditor.from_json(mock_anthropic_client.messages.create.return_value.content)
+        mock_anthropic_client.messages.create.return_value.content = (
+            '```json\n[{"op":"update","id":"R2","value":"4.7k"}]\n```'
+        )
+        ops = await ai_generator.edit_schematic(editor, "change R2 to 4.7k")
+        assert ops == [{"op": "update", "id": "R2", "value": "4.7k"}]
+        assert editor.schematic.components["R2"].value == "4.7k"
+        request = mock_anthropic_client.messages.create.call_args.kwargs
+        assert '"id":"R2"' in request["messages"][0]["content"]
+        assert request["messages"][0]["content"].endswith("Change: change R2 to 4.7k")
+
+    @pytest.mark.asyncio
+    async def test_generate_schematic_returns_netlist_hash(self, ai_generator, mock_anthropic_client, tmp_path):
+        """Test that the netlist hash of the result is returned with the filename."""
+        from ai_schematic_generator.schematic_generator import netlist_hash, parse_schematic_json
+        content = mock_anthropic_client.messages.create.return_value.content
+        filename, key = await ai_generator.generate_schematic("divider", str(tmp_path / "out.json"), output_format='json')
+        assert filename.endswith("out.json")
+        assert key == netlist_hash(*parse_schematic_json(content))
@@ -0,0 +1,150 @@
+import gzip
+import io
+import os
+import pytest
+from ai_schematic_generator.artifacts import (
+    Artifact, ArtifactStore, LocalBackend, S3Backend, iter_chunks, parse_accept_encoding
+)
+from ai_schematic_generator.jobs import JobQueue, normalize_description
+from ai_schematic_generator.pool import Tenant
+from tests.test_jobs import FakeGenerator
+
+KEY = "ab" * 32
+SVG = b"<svg>" + b"<path d='M0,0L1,1'/>" * 50 + b"</svg>"
+
+class MissingObject(Exception):
+    """What boto3 raises for an unknown key."""
+
+    def __init__(self):
+        super().__init__("Not Found")
+        self.response = {'Error': {'Code': '404'}}
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 client calls the backend uses."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **extra):
+        self.objects[(Bucket, Key)] = (Body, extra)
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise MissingObject()
+        return {'ContentLength': len(self.objects[(Bucket, Key)][0])}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise MissingObject()
+        return {'Body': io.BytesIO(self.objects[(Bucket, Key)][0])}
+
+class TestArtifactStore:
+    @pytest.fixture(params=['local', 's3'])
+    def store(self, request, tmp_path):
+        """Create a store on each backend."""
+        if request.param == 'local':
+            return ArtifactStore(LocalBackend(str(tmp_path / 'artifacts')))
+        return ArtifactStore(S3Backend(FakeS3Client(), 'bucket', 'schematics/'))
+
+    def test_put_and_get(self, store):
+        """Test that an artifact round-trips with a gzip variant."""
+        artifact = store.put(KEY, SVG)
+        assert artifact.name == KEY + ".svg"
+        assert 'gzip' in artifact.encodings
+        assert store.get(artifact.name) == artifact
+        assert store.read(artifact) == SVG
+        assert gzip.decompress(store.read(artifact, 'gzip')) == SVG
+
+    def test_stored_once(self, store):
+        """Test that the same netlist is only written once."""
+        store.put(KEY, SVG)
+        assert store.put(KEY, b"<svg/>").size == len(SVG)
+
+    def test_small_artifacts_are_not_compressed(self, store):
+        """Test that tiny files get no compressed variant."""
+        assert store.put(KEY, b"* netlist\n.end\n", 'spice').encodings == ()
+
+    def test_rejects_unknown_names(self, store):
+        """Test that names must be a hash and a known extension."""
+        store.put(KEY, SVG)
+        assert store.get(KEY + ".png") is None
+        assert store.get("../" + KEY + ".svg") is None
+        assert store.get("cd" * 32 + ".svg") is None
+
+    def test_local_writes_are_atomic(self, tmp_path):
+        """Test that no temporary files are left behind."""
+        backend = LocalBackend(str(tmp_path))
+        ArtifactStore(backend).put(KEY, SVG)
+        names = sorted(os.listdir(tmp_path / KEY[:2]))
+        assert names == [KEY + ".svg", KEY + ".svg.gz"]
+
+    def test_negotiate(self):
+        """Test encoding choice from Accept-Encoding."""
+        artifact = Artifact(KEY + ".svg", 'svg', 10, ('br', 'gzip'))
+        assert artifact.negotiate("gzip, deflate, br") == 'br'
+        assert artifact.negotiate("gzip, br;q=0") == 'gzip'
+        assert artifact.negotiate("*") == 'br'
+        assert artifact.negotiate("") is None
+        assert parse_accept_encoding("gzip;q=0.5, br") == {'gzip': 0.5, 'br': 1.0}
+
+    def test_iter_chunks_closes(self):
+        """Test that streaming yields every chunk and closes the source."""
+        stream = io.BytesIO(b"x" * 10)
+        assert list(iter_chunks(stream, 4)) == [b"xxxx", b"xxxx", b"xx"]
+        assert stream.closed
+
+class TestArtifactRoutes:
+    @pytest.fixture
+    def client(self, monkeypatch, tmp_path, mock_anthropic_client):
+        """Create a Flask test client whose jobs publish to a local artifact store."""
+        import wsgi
+        store = ArtifactStore(LocalBackend(str(tmp_path / 'artifacts')))
+        generator = FakeGenerator()
+        generator.release.set()
+        queue = JobQueue(generator, str(tmp_path / 'jobs'), workers=1, artifacts=store)
+        monkeypatch.setattr(wsgi, 'jobs', queue)
+        monkeypatch.setattr(wsgi, 'artifacts', store)
+        yield wsgi.app.test_client()
+        queue.shutdown()
+
+    def test_job_publishes_artifact(self, client, tmp_path):
+        """Test that a finished job names its artifact and keeps no local copy."""
+        data = client.post('/generate', json={'description': 'voltage divider'}).get_json()
+        assert data['file'].startswith('/artifacts/')
+        assert os.listdir(tmp_path / 'jobs') == []
+        assert client.get(data['file']).get_data() == b"<svg/>"
+
+    def test_etag_and_compression(self, client):
+        """Test conditional requests and pre-compressed responses."""
+        import wsgi
+        # The fake generator's netlist key for "voltage divider"; a stored artifact is never rewritten.
+        key = normalize_description("voltage divider").encode().hex().ljust(64, '0')[:64]
+        wsgi.artifacts.put(key, SVG)
+        url = client.post('/generate', json={'description': 'voltage divider'}).get_json()['file']
+        response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert 'immutable' in response.headers['Cache-Control']
+        assert gzip.decompress(response.get_data()) == SVG
+        etag = response.headers['ETag']
+        for condition in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+            cached = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': condition})
+            assert cached.status_code == 304
+        assert client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': '"other"'}).status_code == 200
+        plain = client.get(url, headers={'If-None-Match': etag})
+        assert plain.status_code == 200
+        assert plain.get_data() == SVG
+        assert client.get('/artifacts/missing.svg').status_code == 404
+
+    def test_artifacts_are_private_to_their_tenant(self, client, monkeypatch):
+        """Test that only a tenant with a job that produced an artifact can fetch it."""
+        import wsgi
+        monkeypatch.setattr(wsgi, 'tenants', {'tok-a': Tenant('acme'), 'tok-b': Tenant('globex')})
+        url = client.post('/generate', json={'description': 'voltage divider'},
+                          headers={'Authorization': 'Bearer tok-a'}).get_json()['file']
+        assert client.get(url, headers={'Authorization': 'Bearer tok-a'}).status_code == 200
+        assert client.get(url, headers={'Authorization': 'Bearer tok-b'}).status_code == 404
+        assert client.get(url).status_code == 401
+        wsgi.artifacts.put(KEY, SVG)
+        assert client.get(f'/artifacts/{KEY}.svg', headers={'Authorization': 'Bearer tok-a'}).status_code == 404
@@ -0,0 +1,192 @@
+import pytest
+import asyncio
+import io
+import json
+import os
+from unittest.mock import MagicMock
+from click.testing import CliRunner
+from ai_schematic_generator.ai_generator import AISchematicGenerator
+from ai_schematic_generator.batch import (
+    BatchItem, JsonlResultStore, RateLimiter, SqliteResultStore, find_images, read_batch_items,
+    run_analysis_batch, run_batch
+)
+from ai_schematic_generator.cache import ResponseCache
+from ai_schematic_generator.cli import cli
+
+class FakeGenerator:
+    """Generator stand-in that records concurrency."""
+
+    def __init__(self, fail_on=None):
+        self.in_flight = 0
+        self.peak = 0
+        self.fail_on = fail_on
+
+    async def generate_schematic_from_description(self, description, output_file):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if description == self.fail_on:
+            raise Exception("boom")
+        return f"Successfully generated schematic: {output_file}"
+
+class FakeAnalyzer:
+    """Analyzer stand-in that records concurrency and what it was sent."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.seen = []
+
+    async def analyze_image(self, data, digest=None):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        self.seen.append(data)
+        if data == b'bad':
+            raise Exception("boom")
+        return f"analysis of {data.decode()}"
+
+class TestBatch:
+    def test_read_jsonl(self):
+        """Test reading JSONL objects and plain strings."""
+        stream = io.StringIO('{"id": "div", "description": "divider"}\n\n"rc filter"\n')
+        items = read_batch_items(stream, 'jsonl', 'out')
+        assert items[0] == BatchItem('div', 'divider', 'out/div.svg')
+        assert items[1].description == 'rc filter'
+        assert items[1].id == '2'
+
+    def test_read_csv(self):
+        """Test reading CSV rows with an explicit output."""
+        stream = io.StringIO('description,output\ndivider,a.svg\n')
+        items = read_batch_items(stream, 'csv', 'out')
+        assert items == [BatchItem('1', 'divider', 'a.svg')]
+
+    def test_missing_description(self):
+        """Test that entries without a description are rejected."""
+        with pytest.raises(ValueError):
+            read_batch_items(io.StringIO('{"id": "x"}\n'), 'jsonl', 'out')
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self, tmp_path):
+        """Test that no more than ``concurrency`` generations run at once."""
+        generator = FakeGenerator(fail_on='d3')
+        items = [BatchItem(str(i), f'd{i}', str(tmp_path / f'{i}.svg')) for i in range(10)]
+        results = [r async for r in run_batch(generator, items, concurrency=3)]
+        assert generator.peak == 3
+        assert len(results) == 10
+        assert [r['id'] for r in results if not r['success']] == ['3']
+
+    @pytest.mark.asyncio
+    async def test_rate_limiter_waits(self, monkeypatch):
+        """Test that the limiter sleeps once the request bucket is empty."""
+        sleeps = []
+
+        async def fake_sleep(delay):
+            sleeps.append(delay)
+            limiter._requests += 1
+
+        monkeypatch.setattr('ai_schematic_generator.batch.asyncio.sleep', fake_sleep)
+        limiter = RateLimiter(requests_per_minute=60)
+        limiter._requests = 1
+        await limiter.acquire()
+        await limiter.acquire()
+        assert len(sleeps) == 1
+        assert sleeps[0] == pytest.approx(1.0, abs=0.05)
+
+    @pytest.mark.asyncio
+    async def test_rate_limiter_gates_every_api_call(self, mock_anthropic_client, tmp_path):
+        """Test that retries take from the limiter and cache hits do not."""
+        calls = []
+
+        class CountingLimiter(RateLimiter):
+            async def acquire(self, tokens=0):
+                calls.append(tokens)
+                await super().acquire(tokens)
+
+        good = mock_anthropic_client.messages.create.return_value
+        bad = MagicMock(content="not json")
+        mock_anthropic_client.messages.create.side_effect = [bad, good]
+        generator = AISchematicGenerator("dummy-api-key", cache=ResponseCache())
+        items = [BatchItem('1', 'divider', str(tmp_path / '1.svg')),
+                 BatchItem('2', 'divider', str(tmp_path / '2.svg'))]
+        results = [r async for r in run_batch(generator, items, concurrency=1,
+                                              rate_limiter=CountingLimiter(requests_per_minute=600))]
+
+        assert all(r['success'] for r in results)
+        assert mock_anthropic_client.messages.create.await_count == 2
+        assert len(calls) == 2
+        assert all(tokens > 0 for tokens in calls)
+
+    def test_generate_batch_command(self, mock_anthropic_client, monkeypatch, tmp_path):
+        """Test that the CLI streams one JSONL line per description."""
+        monkeypatch.setenv('ANTHROPIC_API_KEY', 'dummy-key')
+        runner = CliRunner(mix_stderr=False)
+        result = runner.invoke(cli, [
+            'generate-batch', '-', '-d', str(tmp_path), '-j', '2'
+        ], input='"divider one"\n"divider two"\n', catch_exceptions=False)
+
+        assert result.exit_code == 0
+        lines = [json.loads(line) for line in result.stdout.splitlines()]
+        assert sorted(line['id'] for line in lines) == ['1', '2']
+        assert all(line['success'] for line in lines)
+        assert (tmp_path / '1.svg').exists()
+
+class TestAnalysisBatch:
+    def test_find_images(self, tmp_path):
+        """Test walking directories and globs for image files in a stable order."""
+        (tmp_path / "b").mkdir()
+        for name in ("a.png", "b/c.SVG", "b/notes.txt", "d.jpg"):
+            (tmp_path / name).write_bytes(b"x")
+        found = list(find_images([str(tmp_path)], ('.png', '.svg', '.jpg')))
+        assert [p[len(str(tmp_path)) + 1:] for p in found] == ["a.png", "d.jpg", os.path.join("b", "c.SVG")]
+        assert list(find_images([str(tmp_path / "*.png")], ('.png',))) == [str(tmp_path / "a.png")]
+
+    @pytest.mark.asyncio
+    async def test_skips_known_and_duplicate_content(self, tmp_path):
+        """Test that stored and repeated content is never sent twice."""
+        paths = []
+        for i, content in enumerate([b"one", b"two", b"one", b"three", b"bad"] + [b"x%d" % n for n in range(6)]):
+            path = tmp_path / f"{i}.png"
+            path.write_bytes(content)
+            paths.append(str(path))
+        from ai_schematic_generator.images import image_digest
+        analyzer = FakeAnalyzer()
+        results = [r async for r in run_analysis_batch(analyzer, iter(paths), {image_digest(b"two")}, concurrency=3)]
+
+        assert len(results) == len(paths)
+        assert analyzer.peak == 3
+        assert sorted(analyzer.seen) == sorted([b"one", b"three", b"bad"] + [b"x%d" % n for n in range(6)])
+        assert sum(1 for r in results if r.get('skipped')) == 2
+        assert [r['path'] for r in results if r.get('success') is False] == [paths[4]]
+
+    @pytest.mark.parametrize("store_class,name", [(JsonlResultStore, "r.jsonl"), (SqliteResultStore, "r.db")])
+    def test_store_resume(self, tmp_path, store_class, name):
+        """Test that only successful results are skipped when a run resumes."""
+        store = store_class(str(tmp_path / name))
+        store.add({'path': 'a.png', 'digest': 'aaa', 'success': True, 'analysis': 'ok', 'elapsed': 1.0})
+        store.add({'path': 'b.png', 'digest': 'bbb', 'success': False, 'error': 'boom', 'elapsed': 1.0})
+        store.close()
+        if store_class is JsonlResultStore:
+            with open(tmp_path / name, 'a') as f:
+                f.write('{"path": "c.png", "dig')
+        assert store_class(str(tmp_path / name)).done == {'aaa'}
+
+    def test_analyze_batch_command(self, mock_anthropic_client, monkeypatch, tmp_path):
+        """Test that a second run over the same archive skips everything."""
+        monkeypatch.setenv('ANTHROPIC_API_KEY', 'dummy-key')
+        archive = tmp_path / "archive"
+        archive.mkdir()
+        for i in range(3):
+            (archive / f"{i}.svg").write_text(f'<svg xmlns="http://www.w3.org/2000/svg" id="s{i}"/>')
+        results = tmp_path / "results.jsonl"
+        runner = CliRunner(mix_stderr=False)
+        for expected in ("Analyzed 3, skipped 0", "Analyzed 0, skipped 3"):
+            result = runner.invoke(cli, ['analyze-batch', str(archive), '-r', str(results), '-j', '2'],
+                                   catch_exceptions=False)
+            assert result.exit_code == 0
+            assert expected in result.stderr
+        assert mock_anthropic_client.messages.create.await_count == 3
+        rows = [json.loads(line) for line in results.read_text().splitlines()]
+        assert len(rows) == 3 and all(row['success'] for row in rows)
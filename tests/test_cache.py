@@ -0,0 +1,162 @@
+import pytest
+import os
+import shutil
+from ai_schematic_generator.ai_generator import MODEL, AISchematicGenerator
+from ai_schematic_generator.cache import ResponseCache, RenderCache, make_cache_key
+from ai_schematic_generator.prompts import MAX_OUTPUT_TOKENS
+from ai_schematic_generator.schematic_generator import (
+    SchematicGenerator, parse_schematic_json, netlist_hash
+)
+
+class TestResponseCache:
+    def test_cache_key_is_stable(self):
+        """Test that keys depend on model, prompt and max_tokens only."""
+        key = make_cache_key("model", "prompt", 2000)
+        assert key == make_cache_key("model", "prompt", 2000)
+        assert key != make_cache_key("model", "prompt", 1000)
+        assert key != make_cache_key("other", "prompt", 2000)
+
+    def test_memory_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = ResponseCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.stats.evictions == 1
+
+    def test_ttl_expiry(self, monkeypatch):
+        """Test that entries expire after the TTL."""
+        now = [1000.0]
+        monkeypatch.setattr('ai_schematic_generator.cache.time.time', lambda: now[0])
+        cache = ResponseCache(ttl=10)
+        cache.set("a", "1")
+        assert cache.get("a") == "1"
+        now[0] += 11
+        assert cache.get("a") is None
+
+    def test_disk_tier_persists(self, tmp_path):
+        """Test that the SQLite tier survives a new cache instance."""
+        path = str(tmp_path / "responses.sqlite3")
+        cache = ResponseCache(path=path)
+        cache.set("a", "1")
+        cache.close()
+
+        cache = ResponseCache(path=path)
+        assert cache.get("a") == "1"
+        assert cache.stats.disk_hits == 1
+        cache.close()
+
+    def test_disk_size_eviction(self, tmp_path):
+        """Test that the disk tier stays under its byte budget."""
+        cache = ResponseCache(max_entries=1, path=str(tmp_path / "r.sqlite3"), max_disk_bytes=10)
+        cache.set("a", "x" * 6)
+        cache.set("b", "y" * 6)
+        cache._memory.clear()
+        assert cache.get("a") is None
+        assert cache.get("b") == "y" * 6
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_generator_uses_cache(self, mock_anthropic_client, tmp_path):
+        """Test that a repeated description skips the API call."""
+        generator = AISchematicGenerator("dummy-api-key", cache=ResponseCache())
+        description = "voltage divider with two 10k resistors"
+
+        await generator.generate_schematic_from_description(description, str(tmp_path / "a.svg"))
+        await generator.generate_schematic_from_description(description, str(tmp_path / "b.svg"))
+
+        assert mock_anthropic_client.messages.create.await_count == 1
+        assert generator.cache.stats.hits == 1
+        assert generator.cache.stats.misses == 1
+        assert (tmp_path / "b.svg").exists()
+
+    @pytest.mark.asyncio
+    async def test_stale_cached_response_is_dropped(self, mock_anthropic_client, tmp_path):
+        """Test that a cached response that no longer validates falls through to the API."""
+        generator = AISchematicGenerator("dummy-api-key", cache=ResponseCache())
+        description = "voltage divider with two 10k resistors"
+        key = make_cache_key(MODEL, generator._generate_circuit_prompt(description), MAX_OUTPUT_TOKENS)
+        generator.cache.set(key, '{"components": [{"type": "resistor", "id": "R1", "value": 10000}], "connections": []}')
+
+        await generator.generate_schematic_from_description(description, str(tmp_path / "a.svg"))
+
+        assert mock_anthropic_client.messages.create.await_count == 1
+        assert generator.cache.get(key) == mock_anthropic_client.messages.create.return_value.content
+        assert (tmp_path / "a.svg").exists()
+
+class TestRenderCache:
+    def test_netlist_hash_ignores_json_formatting(self):
+        """Test that key order and whitespace do not change the netlist hash."""
+        a = '{"components": [{"type": "resistor", "id": "R1", "position": [0, 0]}], "connections": []}'
+        b = '{"connections":[],"components":[{"position":[0.0,0],"id":"R1","type":"resistor"}]}'
+        assert netlist_hash(*parse_schematic_json(a)) == netlist_hash(*parse_schematic_json(b))
+
+    def test_fetch_and_store(self, tmp_path):
+        """Test storing an SVG and fetching it to a new location."""
+        cache = RenderCache(str(tmp_path / "renders"))
+        source = tmp_path / "source.svg"
+        source.write_text("<svg/>")
+
+        assert not cache.fetch("abc", str(tmp_path / "out.svg"))
+        cache.store("abc", str(source))
+        assert cache.fetch("abc", str(tmp_path / "out.svg"))
+        assert (tmp_path / "out.svg").read_text() == "<svg/>"
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 1
+
+    def test_hard_link(self, tmp_path):
+        """Test that link mode shares the stored file."""
+        cache = RenderCache(str(tmp_path / "renders"), link=True)
+        source = tmp_path / "source.svg"
+        source.write_text("<svg/>")
+        cache.store("abc", str(source))
+        assert cache.fetch("abc", str(tmp_path / "out.svg"))
+        assert os.path.samefile(cache._path("abc"), str(tmp_path / "out.svg"))
+
+    def test_saving_over_linked_output_keeps_entry(self, tmp_path):
+        """Test that rewriting a hard-linked output replaces it instead of writing through the link."""
+        cache = RenderCache(str(tmp_path / "renders"), link=True)
+        source = tmp_path / "source.svg"
+        source.write_text("<svg/>")
+        cache.store("abc", str(source))
+        assert cache.fetch("abc", str(tmp_path / "out.svg"))
+
+        SchematicGenerator().save(str(tmp_path / "out.svg"))
+        with open(cache._path("abc")) as f:
+            assert f.read() == "<svg/>"
+        assert not os.path.samefile(cache._path("abc"), str(tmp_path / "out.svg"))
+
+    def test_entry_evicted_while_fetching_is_a_miss(self, tmp_path, monkeypatch):
+        """Test that an entry removed between the lookup and the copy counts as a miss."""
+        cache = RenderCache(str(tmp_path / "renders"))
+        source = tmp_path / "source.svg"
+        source.write_text("<svg/>")
+        cache.store("abc", str(source))
+        copyfile = shutil.copyfile
+
+        def evict_then_copy(src, dst):
+            os.remove(src)
+            return copyfile(src, dst)
+
+        monkeypatch.setattr(shutil, 'copyfile', evict_then_copy)
+        assert not cache.fetch("abc", str(tmp_path / "out.svg"))
+        assert cache.stats.misses == 1
+        assert cache.stats.hits == 0
+
+    @pytest.mark.asyncio
+    async def test_generator_skips_rendering(self, mock_anthropic_client, tmp_path, monkeypatch):
+        """Test that a cached netlist is not drawn again."""
+        generator = AISchematicGenerator(
+            "dummy-api-key", render_cache=RenderCache(str(tmp_path / "renders"))
+        )
+        await generator.generate_schematic_from_description("divider", str(tmp_path / "a.svg"))
+
+        def fail_save(self, filename):
+            raise AssertionError("rendered twice")
+        monkeypatch.setattr(SchematicGenerator, 'save', fail_save)
+
+        await generator.generate_schematic_from_description("divider", str(tmp_path / "b.svg"))
+        assert (tmp_path / "b.svg").read_bytes() == (tmp_path / "a.svg").read_bytes()
@@ -1,3 +1,6 @@
+import os
+import subprocess
+import sys
 import pytest
 from click.testing import CliRunner
 from ai_schematic_generator.cli import cli
@@ -24,6 +27,24 @@ class TestCLI:
         assert 'generate' in result.output
         assert 'analyze' in result.output
 
+    @pytest.mark.parametrize("args", [["--help"], ["generate", "--help"], ["generate", "voltage divider"]])
+    def test_startup_skips_heavy_imports(self, args):
+        """Test that help and the API key check never import the SDK or renderer."""
+        script = (
+            "import sys\n"
+            "from ai_schematic_generator.cli import cli\n"
+            "try:\n"
+            "    cli(sys.argv[1:], standalone_mode=False)\n"
+            "except Exception:\n"
+            "    pass\n"
+            "heavy = ('anthropic', 'httpx', 'schemdraw', 'matplotlib', 'numpy')\n"
+            "print('loaded:', *[m for m in heavy if m in sys.modules])\n"
+        )
+        env = {k: v for k, v in os.environ.items() if k != 'ANTHROPIC_API_KEY'}
+        result = subprocess.run([sys.executable, "-c", script] + args, capture_output=True,
+                                text=True, env=env, check=True)
+        assert result.stdout.splitlines()[-1] == "loaded:"
+
     def test_generate_command(self, runner, mock_anthropic_client, monkeypatch):
         """Test generate command with mock API."""
         monkeypatch.setenv('ANTHROPIC_API_KEY', 'dummy-key')
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import stat
+import tempfile
+import threading
+import time
+import pytest
+from click.testing import CliRunner
+from ai_schematic_generator.ai_generator import AISchematicGenerator
+from ai_schematic_generator.cli import cli
+from ai_schematic_generator.daemon import (
+    DaemonUnavailable, SchematicDaemon, _prepare_directory, daemon_listening, default_socket_path, send_request
+)
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to about 100 bytes, so keep this short.
+    with tempfile.TemporaryDirectory(prefix="ais") as directory:
+        yield os.path.join(directory, "d.sock")
+
+@pytest.fixture
+def daemon(mock_anthropic_client, socket_path):
+    """Run a daemon on a background thread for the duration of a test."""
+    factories = []
+
+    def factory(layout, cache_dir):
+        factories.append((layout, cache_dir))
+        return AISchematicGenerator("dummy-api-key", layout=layout)
+
+    server = SchematicDaemon(socket_path, factory)
+    server.factories = factories
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_until_complete, args=(server.serve_forever(),))
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not daemon_listening(socket_path):
+        assert time.monotonic() < deadline, "daemon did not start"
+        time.sleep(0.01)
+    yield server
+    loop.call_soon_threadsafe(server.stop)
+    thread.join(10)
+    loop.close()
+
+class TestDaemon:
+    def test_unavailable(self, socket_path):
+        """Test that a missing or stale socket means no daemon."""
+        with pytest.raises(DaemonUnavailable):
+            send_request(socket_path, {'command': 'ping'})
+        open(socket_path, 'w').close()
+        with pytest.raises(DaemonUnavailable):
+            send_request(socket_path, {'command': 'ping'})
+
+    def test_socket_is_private(self, daemon, socket_path):
+        """Test that the socket is created readable and writable by its owner only."""
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+
+    def test_foreign_socket_is_not_trusted(self, daemon, socket_path, monkeypatch):
+        """Test that a socket owned by another user is ignored."""
+        uid = os.getuid()
+        monkeypatch.setattr(os, 'getuid', lambda: uid + 1)
+        with pytest.raises(DaemonUnavailable):
+            send_request(socket_path, {'command': 'ping'})
+
+    def test_default_socket_is_in_a_private_directory(self, monkeypatch, tmp_path):
+        """Test that without XDG_RUNTIME_DIR the socket lives in a per-user directory."""
+        monkeypatch.delenv('XDG_RUNTIME_DIR', raising=False)
+        monkeypatch.setenv('TMPDIR', str(tmp_path))
+        path = default_socket_path()
+        assert os.path.dirname(path) == str(tmp_path / f"ai_schematics-{os.getuid()}")
+        _prepare_directory(os.path.dirname(path))
+        assert stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode) == 0o700
+
+    def test_shared_directory_is_refused(self, tmp_path):
+        """Test that a directory other users can write to, without the sticky bit, is refused."""
+        shared = tmp_path / "shared"
+        shared.mkdir()
+        shared.chmod(0o777)
+        with pytest.raises(RuntimeError):
+            _prepare_directory(str(shared))
+        shared.chmod(0o1777)
+        _prepare_directory(str(shared))
+
+    def test_generate(self, daemon, socket_path, tmp_path):
+        """Test that generations reuse one warm generator."""
+        for name in ("a.svg", "b.svg"):
+            reply = send_request(socket_path, {
+                'command': 'generate', 'description': f"two resistors {name}",
+                'output': str(tmp_path / name),
+            })
+            assert reply['success'] is True
+            assert (tmp_path / name).exists()
+        assert daemon.factories == [(False, None)]
+
+    def test_errors_are_replied(self, daemon, socket_path):
+        """Test that failures come back as replies instead of dropping the connection."""
+        reply = send_request(socket_path, {'command': 'explode'})
+        assert reply == {'success': False, 'error': 'Unknown command: explode'}
+        reply = send_request(socket_path, {'command': 'analyze', 'image_path': '/nonexistent.svg'})
+        assert reply['success'] is False
+
+    def test_stop_removes_socket(self, socket_path, mock_anthropic_client):
+        """Test that a stale socket file is replaced and removed on shutdown."""
+        open(socket_path, 'w').close()
+        server = SchematicDaemon(socket_path, lambda layout, cache_dir: None)
+
+        async def run():
+            task = asyncio.ensure_future(server.serve_forever())
+            while not os.path.exists(socket_path) or not server._stopped:
+                await asyncio.sleep(0.01)
+            server.stop()
+            await task
+
+        asyncio.run(run())
+        assert not os.path.exists(socket_path)
+
+    def test_cli_delegates(self, daemon, socket_path, monkeypatch):
+        """Test that generate hands work to a running daemon without needing an API key."""
+        monkeypatch.delenv('ANTHROPIC_API_KEY', raising=False)
+        runner = CliRunner(mix_stderr=False)
+        with runner.isolated_filesystem():
+            result = runner.invoke(cli, ['generate', 'voltage divider', '-o', 'out.svg',
+                                         '--socket', socket_path], catch_exceptions=False)
+            assert result.exit_code == 0
+            assert 'Generation Complete' in result.stdout
+            assert os.path.exists('out.svg')
+
+            result = runner.invoke(cli, ['generate', 'voltage divider', '--no-daemon',
+                                         '--socket', socket_path])
+            assert result.exit_code == 1
+            assert 'API Key Error' in result.stdout
@@ -0,0 +1,144 @@
+import json
+import pytest
+from ai_schematic_generator import editor as editor_module
+from ai_schematic_generator.editor import (
+    SchematicEditor, component_element_id, label_element_id, wire_element_id
+)
+from ai_schematic_generator.schematic_generator import Component, SchematicGenerator
+from ai_schematic_generator.validation import SchematicValidationError
+
+DIVIDER = {
+    "components": [
+        {"type": "resistor", "id": "R1", "value": "10k", "position": [0, 0]},
+        {"type": "resistor", "id": "R2", "value": "1k", "position": [3, 0]},
+        {"type": "capacitor", "id": "C1", "position": [6, 0]},
+    ],
+    "connections": [{"start": "R1", "end": "R2"}, {"start": "R2", "end": "C1"}],
+}
+
+class TestSchematicEditor:
+    @pytest.fixture
+    def editor(self):
+        """Create an editor that has already rendered the divider once."""
+        editor = SchematicEditor.from_json(json.dumps(DIVIDER))
+        editor.flush()
+        return editor
+
+    def test_first_flush_draws_everything(self):
+        """Test that a new editor reports every element."""
+        delta = SchematicEditor.from_json(json.dumps(DIVIDER)).flush()
+        assert set(delta.updated) == {
+            "c-R1", "c-R1-label", "c-R2", "c-R2-label", "c-C1", "c-C1-label", "w-R1-R2", "w-C1-R2"
+        }
+        assert len(delta.defs) == 2
+
+    def test_value_change_redraws_one_label(self, editor):
+        """Test that changing a value touches only that label."""
+        editor.update_component("R2", value="4.7k")
+        delta = editor.flush()
+        assert list(delta.updated) == ["c-R2-label"]
+        assert "R2 4.7k" in delta.updated["c-R2-label"]
+        assert not delta.removed
+        assert not editor.flush()
+
+    def test_move_redraws_attached_wires(self, editor):
+        """Test that moving a part redraws it and only its wires."""
+        editor.update_component("C1", position=(6, 3))
+        assert set(editor.flush().updated) == {"c-C1", "c-C1-label", "w-C1-R2"}
+
+    def test_remove_component(self, editor):
+        """Test that removing a part removes its wires too."""
+        editor.remove_component("R1")
+        delta = editor.flush()
+        assert sorted(delta.removed) == ["c-R1", "c-R1-label", "w-R1-R2"]
+        assert not delta.updated
+        assert b'id="c-R1"' not in editor.render()
+
+    def test_connections(self, editor):
+        """Test adding and removing a wire."""
+        editor.add_connection("C1", "R1")
+        assert list(editor.flush().updated) == ["w-C1-R1"]
+        assert editor.remove_connection("R1", "C1")
+        assert not editor.remove_connection("R1", "C1")
+        assert editor.flush().removed == ["w-C1-R1"]
+
+    def test_render_matches_a_fresh_editor(self, editor):
+        """Test that incremental output equals rendering the result from scratch."""
+        editor.apply_patch([
+            {"op": "update", "id": "R2", "value": "4.7k", "rotation": 90},
+            {"op": "remove", "id": "R1"},
+            {"op": "add", "component": {"type": "diode", "id": "D1", "position": [9, 0]}},
+            {"op": "connect", "start": "C1", "end": "D1"},
+        ])
+        fresh = SchematicGenerator()
+        fresh.from_json(editor.schematic.export('json'))
+        # Same elements; only their order in the document may differ.
+        assert sorted(editor.render().splitlines()) == sorted(SchematicEditor(fresh).render().splitlines())
+
+    def test_bounds_are_updated_incrementally(self, monkeypatch):
+        """Test that an interior edit measures one part and only edge changes rescan the bounds."""
+        schematic = SchematicGenerator()
+        for i in range(9):
+            schematic.add_component(Component("resistor", f"R{i}", "1k", ((i % 3) * 6, (i // 3) * 4)))
+        schematic.add_connection("R1", "R4")
+        editor = SchematicEditor(schematic)
+        editor.flush()
+
+        measured, rescans = [], []
+        part_symbol = editor_module.part_symbol
+        full_bounds = editor._full_bounds
+        monkeypatch.setattr(editor_module, 'part_symbol', lambda *args: measured.append(args) or part_symbol(*args))
+        monkeypatch.setattr(editor, '_full_bounds', lambda: rescans.append(1) or full_bounds())
+
+        def fresh_view_box():
+            fresh = SchematicGenerator()
+            fresh.from_json(editor.schematic.export('json'))
+            return SchematicEditor(fresh).flush().view_box
+
+        editor.update_component("R4", position=(6.5, 4))
+        view_box = editor.flush().view_box
+        assert len(measured) == 1 and not rescans
+        assert view_box == fresh_view_box()
+
+        editor.add_component(Component("resistor", "R9", "1k", (20, 8)))
+        assert editor.flush().view_box == fresh_view_box()
+        assert not rescans
+
+        editor.remove_component("R9")
+        assert editor.flush().view_box == fresh_view_box()
+        assert len(rescans) == 1
+
+    def test_add_existing_id_updates(self, editor):
+        """Test that adding a known id replaces that component in place."""
+        editor.add_component(Component("inductor", "C1", "1mH", (6, 0)))
+        assert editor.schematic.components["C1"].type == "inductor"
+        assert set(editor.flush().updated) == {"c-C1", "c-C1-label"}
+
+    def test_invalid_patch_changes_nothing(self, editor):
+        """Test that a patch is validated as a whole before it is applied."""
+        before = editor.render()
+        with pytest.raises(SchematicValidationError) as info:
+            editor.apply_patch('[{"op": "update", "id": "R2", "value": "2k"}, {"op": "connect", "start": "R1", "end": "X9"}]')
+        assert [issue.code for issue in info.value.issues] == ["unknown_endpoint"]
+        assert info.value.document is not None
+        assert editor.schematic.components["R2"].value == "1k"
+        assert editor.render() == before
+
+    def test_update_rejects_unknown_fields(self, editor):
+        """Test that ids and unknown fields cannot be updated."""
+        with pytest.raises(ValueError):
+            editor.update_component("R1", id="R9")
+
+    def test_element_ids_do_not_collide(self):
+        """Test that ids containing the separator map to distinct SVG ids."""
+        assert wire_element_id(("a-b", "c")) != wire_element_id(("a", "b-c"))
+        assert component_element_id("x-label") != label_element_id("x")
+        assert component_element_id("a%2Db") != component_element_id("a-b")
+
+        editor = SchematicEditor()
+        for component_id in ("a", "a-b", "b-c", "c", "x", "x-label"):
+            editor.add_component(Component("resistor", component_id))
+        editor.add_connection("a-b", "c")
+        editor.add_connection("a", "b-c")
+        delta = editor.flush()
+        assert len(delta.updated) == 6 * 2 + 2
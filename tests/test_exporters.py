@@ -0,0 +1,95 @@
+import json
+import pytest
+from ai_schematic_generator.ai_generator import AISchematicGenerator
+from ai_schematic_generator.exporters import build_nets, export_netlist, output_filename, to_json
+from ai_schematic_generator.schematic_generator import Component, SchematicGenerator
+
+def rc_filter():
+    generator = SchematicGenerator()
+    generator.add_component(Component("resistor", "R1", value="10k", position=(0, 0)))
+    generator.add_component(Component("capacitor", "C1", value="100nF", position=(3, 0)))
+    generator.add_component(Component("transistor", "Q1", position=(6, 0)))
+    generator.add_component(Component("diode", "LED1", position=(9, 0)))
+    generator.add_connection("R1", "C1")
+    generator.add_connection("R1", "Q1")
+    generator.add_connection("Q1", "LED1")
+    return generator
+
+class TestExporters:
+    def test_nets(self):
+        """Test that connections join the start's output pin to the end's input pin."""
+        pin_nets, nets = build_nets(rc_filter().netlist)
+        r1, c1, q1, led1 = pin_nets
+        assert r1[1] == c1[0] == q1[1]
+        # Collector drives the diode anode; the emitter has a net of its own.
+        assert q1[0] == led1[0]
+        assert q1[2] not in (r1 + c1 + led1)
+        assert sum(len(members) for members in nets) == 2 + 2 + 3 + 2
+
+    def test_spice(self):
+        """Test the SPICE element lines and default models."""
+        spice = rc_filter().export('spice')
+        lines = spice.splitlines()
+        assert lines[0].startswith('*')
+        assert lines[1] == "R1 N1 N2 10k"
+        assert lines[2] == "C1 N2 N3 100nF"
+        assert lines[3].startswith("Q1 ") and lines[3].endswith(" NPN")
+        assert lines[4].startswith("DLED1 ")
+        assert ".model NPN NPN" in lines and ".model D D" in lines
+        assert lines[-1] == ".end"
+
+    def test_kicad(self):
+        """Test the KiCad netlist structure."""
+        kicad = rc_filter().export('kicad')
+        assert kicad.startswith('(export (version "E")')
+        assert '(comp (ref "R1") (value "10k") (libsource (lib "Device") (part "R")))' in kicad
+        assert '(node (ref "Q1") (pin "1"))' in kicad
+        assert kicad.count('(') == kicad.count(')')
+
+    def test_canonical_json(self):
+        """Test that canonical JSON ignores insertion order."""
+        first = SchematicGenerator()
+        second = SchematicGenerator()
+        parts = [Component("resistor", "R2", "1k", (3, 0)), Component("resistor", "R1", "10k")]
+        for component in parts:
+            first.add_component(component)
+        for component in reversed(parts):
+            second.add_component(component)
+        first.add_connection("R1", "R2")
+        second.add_connection("R1", "R2")
+        assert to_json(first.netlist) == to_json(second.netlist)
+        data = json.loads(first.export('json'))
+        assert [c['id'] for c in data['components']] == ["R1", "R2"]
+        assert data['connections'] == [{'start': 'R1', 'end': 'R2'}]
+
+    def test_unknown_format(self):
+        """Test that unknown formats are rejected."""
+        with pytest.raises(ValueError):
+            export_netlist(rc_filter().netlist, 'png')
+        with pytest.raises(ValueError):
+            output_filename('out.png', 'png')
+
+    def test_save_skips_drawing(self, tmp_path):
+        """Test that netlist exports never build a drawing."""
+        generator = rc_filter()
+        filename = generator.save(str(tmp_path / "out.svg"), 'spice')
+        assert filename.endswith("out.cir")
+        assert generator._drawing is None
+        assert (tmp_path / "out.cir").read_text().endswith(".end\n")
+
+    def test_output_filename(self):
+        """Test extension handling per format."""
+        assert output_filename("a/b.svg", "kicad") == "a/b.net"
+        assert output_filename("a/b", "json") == "a/b.json"
+        assert output_filename("a/b.CIR", "spice") == "a/b.CIR"
+
+    @pytest.mark.asyncio
+    async def test_generate_export(self, mock_anthropic_client, tmp_path):
+        """Test end-to-end generation straight to a netlist."""
+        generator = AISchematicGenerator("dummy-api-key")
+        await generator.generate_schematic_from_description(
+            "Two resistors", str(tmp_path / "out.svg"), output_format='json'
+        )
+        assert not (tmp_path / "out.svg").exists()
+        data = json.loads((tmp_path / "out.json").read_text())
+        assert {c['id'] for c in data['components']} == {"R1", "R2"}
@@ -0,0 +1,98 @@
+import base64
+import struct
+import sys
+import zlib
+import pytest
+from ai_schematic_generator import images
+from ai_schematic_generator.ai_generator import AISchematicGenerator
+from ai_schematic_generator.cache import ResponseCache
+from ai_schematic_generator.images import ImagePreprocessor, detect_media_type, prepare_image
+
+def make_png(width=2, height=2):
+    def chunk(kind, body):
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+    rows = b"".join(b"\x00" + b"\xff" * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+SVG = b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg"><path d="M0,0L1,1"/></svg>'
+
+class TestImages:
+    def test_detect_media_type(self):
+        """Test that formats are recognised by content, not extension."""
+        assert detect_media_type(make_png()) == 'image/png'
+        assert detect_media_type(b'\xff\xd8\xff\xe0rest') == 'image/jpeg'
+        assert detect_media_type(b'GIF89a...') == 'image/gif'
+        assert detect_media_type(b'RIFF\x00\x00\x00\x00WEBPVP8 ') == 'image/webp'
+        assert detect_media_type(b'\xef\xbb\xbf  ' + SVG) == 'image/svg+xml'
+        assert detect_media_type(b'%PDF-1.7') is None
+
+    def test_png_is_base64_with_its_media_type(self):
+        """Test that a small PNG is sent unchanged with the right media type."""
+        png = make_png()
+        block = prepare_image(png).content_block()
+        assert block['type'] == 'image'
+        assert block['source']['type'] == 'base64'
+        assert block['source']['media_type'] == 'image/png'
+        assert base64.b64decode(block['source']['data']) == png
+
+    def test_svg_without_rasterizer(self, monkeypatch):
+        """Test that SVGs fall back to markup when cairosvg is missing."""
+        monkeypatch.setattr(images, '_rasterize_svg', lambda data: None)
+        block = prepare_image(SVG).content_block()
+        assert block['type'] == 'text'
+        assert '<svg' in block['text']
+
+    def test_unsupported_format(self):
+        """Test that unknown formats are rejected before any upload."""
+        with pytest.raises(ValueError):
+            prepare_image(b'%PDF-1.7')
+
+    def test_oversized_without_pillow(self, monkeypatch):
+        """Test that too-large images fail clearly when they cannot be shrunk."""
+        monkeypatch.setitem(sys.modules, 'PIL', None)
+        monkeypatch.setattr(images, 'MAX_UPLOAD_BYTES', 10)
+        with pytest.raises(ValueError, match="Pillow"):
+            prepare_image(make_png())
+
+    def test_downscale(self):
+        """Test that large scans are downscaled to the model's useful size."""
+        Image = pytest.importorskip("PIL.Image")
+        import io
+        buffer = io.BytesIO()
+        Image.new("RGB", (4000, 3000), "white").save(buffer, "JPEG")
+        image = prepare_image(buffer.getvalue())
+        assert image.media_type == 'image/jpeg'
+        assert max(image.width, image.height) <= images.MAX_EDGE
+        assert image.width * image.height <= images.MAX_PIXELS
+
+    @pytest.mark.asyncio
+    async def test_preprocessor_caches_by_content(self, monkeypatch):
+        """Test that identical content is only prepared once."""
+        calls = []
+
+        def fake_prepare(data, digest=None):
+            calls.append(data)
+            return data
+
+        monkeypatch.setattr(images, 'prepare_image', fake_prepare)
+        preprocessor = ImagePreprocessor()
+        await preprocessor.prepare(b'one')
+        await preprocessor.prepare(b'one')
+        await preprocessor.prepare(b'two')
+        assert calls == [b'one', b'two']
+
+    @pytest.mark.asyncio
+    async def test_analyze_uses_cache(self, mock_anthropic_client, tmp_path):
+        """Test that analysing the same image content twice uploads it once."""
+        path = tmp_path / "scan.svg"
+        path.write_bytes(make_png())
+        generator = AISchematicGenerator("dummy-api-key", cache=ResponseCache())
+        first = await generator.analyze_existing_schematic(str(path))
+        copy = tmp_path / "copy.png"
+        copy.write_bytes(make_png())
+        second = await generator.analyze_existing_schematic(str(copy))
+        assert first == second
+        assert mock_anthropic_client.messages.create.await_count == 1
+        content = mock_anthropic_client.messages.create.await_args.kwargs['messages'][0]['content']
+        assert content[1]['source']['media_type'] == 'image/png'
@@ -0,0 +1,204 @@
+import pytest
+import asyncio
+import threading
+from ai_schematic_generator.jobs import JobQueue, QueueFullError, TenantQuotaError, normalize_description
+from ai_schematic_generator.pool import GeneratorPool, Tenant
+
+class FakeGenerator:
+    """Generator stand-in that blocks until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+        self.scopes = []
+
+    async def generate_schematic_from_description(self, description, output_file, output_format='svg',
+                                                  similarity_scope=''):
+        self.calls.append(description)
+        self.scopes.append(similarity_scope)
+        while not self.release.is_set():
+            await asyncio.sleep(0.005)
+        if description == "broken":
+            raise Exception("Test error")
+        with open(output_file, 'w') as f:
+            f.write("<svg/>")
+        return f"Successfully generated schematic: {output_file}"
+
+    async def generate_schematic(self, description, output_file, output_format='svg', similarity_scope=''):
+        await self.generate_schematic_from_description(description, output_file, output_format, similarity_scope)
+        return output_file, normalize_description(description).encode().hex().ljust(64, '0')[:64]
+
+    def reset(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+class TestJobQueue:
+    @pytest.fixture
+    def generator(self):
+        return FakeGenerator()
+
+    @pytest.fixture
+    def queue(self, generator, tmp_path):
+        """Create a job queue with one worker."""
+        queue = JobQueue(generator, str(tmp_path), workers=1, max_queue=2)
+        yield queue
+        generator.release.set()
+        queue.shutdown()
+
+    def test_normalize_description(self):
+        """Test whitespace and case folding."""
+        assert normalize_description("  Voltage   DIVIDER\n") == "voltage divider"
+
+    def test_job_lifecycle(self, queue, generator):
+        """Test that a job runs to completion and writes its SVG."""
+        job = queue.submit("voltage divider")
+        assert queue.get(job.id) is job
+        generator.release.set()
+        job = queue.wait_done(job.id, timeout=5)
+        assert job.status == 'succeeded'
+        with open(job.output_file) as f:
+            assert f.read() == "<svg/>"
+
+    def test_failed_job(self, queue, generator):
+        """Test that errors are recorded on the job."""
+        generator.release.set()
+        job = queue.wait_done(queue.submit("broken").id, timeout=5)
+        assert job.status == 'failed'
+        assert job.error == "Test error"
+
+    def test_identical_descriptions_are_merged(self, queue, generator):
+        """Test that in-flight duplicates share one job."""
+        first = queue.submit("voltage divider")
+        second = queue.submit("Voltage  Divider")
+        assert first is second
+        generator.release.set()
+        queue.wait_done(first.id, timeout=5)
+        assert generator.calls == ["voltage divider"]
+
+    def test_formats_are_not_merged(self, queue, generator):
+        """Test that the same description in another format is a separate job."""
+        first = queue.submit("voltage divider")
+        second = queue.submit("voltage divider", "spice")
+        assert first is not second
+        assert second.output_file.endswith(".cir")
+        with pytest.raises(ValueError):
+            queue.submit("voltage divider", "png")
+
+    def test_queue_full(self, queue):
+        """Test that the queue rejects jobs beyond its bound."""
+        first = queue.submit("a")
+        # Wait until the single worker has picked up the first job.
+        queue.wait(first.id, version=0, timeout=5)
+        assert first.status == 'running'
+        queue.submit("b")
+        queue.submit("c")
+        with pytest.raises(QueueFullError):
+            queue.submit("d")
+
+class TestJobRoutes:
+    @pytest.fixture
+    def client(self, monkeypatch, tmp_path, mock_anthropic_client):
+        """Create a Flask test client backed by a fake generator."""
+        import wsgi
+        generator = FakeGenerator()
+        generator.release.set()
+        queue = JobQueue(generator, str(tmp_path), workers=1)
+        monkeypatch.setattr(wsgi, 'jobs', queue)
+        yield wsgi.app.test_client()
+        queue.shutdown()
+
+    def test_create_and_fetch_job(self, client):
+        """Test the submit, poll and download flow."""
+        response = client.post('/jobs', json={'description': 'voltage divider'})
+        assert response.status_code == 202
+        job_id = response.get_json()['id']
+
+        events = client.get(f'/jobs/{job_id}/events').get_data(as_text=True)
+        assert '"succeeded"' in events
+
+        assert client.get(f'/jobs/{job_id}').get_json()['status'] == 'succeeded'
+        svg = client.get(f'/jobs/{job_id}/svg')
+        assert svg.status_code == 200
+        assert svg.get_data(as_text=True) == "<svg/>"
+
+    def test_unknown_job(self, client):
+        """Test that unknown job IDs return 404."""
+        assert client.get('/jobs/missing').status_code == 404
+
+    def test_generate_waits_for_job(self, client):
+        """Test the blocking /generate route."""
+        response = client.post('/generate', json={'description': 'voltage divider'})
+        assert response.get_json()['success'] is True
+
+    def test_generate_format(self, client):
+        """Test that /generate accepts an export format."""
+        response = client.post('/generate', json={'description': 'voltage divider', 'format': 'kicad'})
+        data = response.get_json()
+        assert data['success'] is True
+        assert data['format'] == 'kicad'
+        assert data['file'].endswith('.net')
+        response = client.post('/generate', json={'description': 'voltage divider', 'format': 'png'})
+        assert response.status_code == 400
+
+    def test_missing_description(self, client):
+        """Test that requests without a description are rejected."""
+        assert client.post('/jobs', json={}).status_code == 400
+
+class TestTenants:
+    @pytest.fixture
+    def queue(self, tmp_path):
+        """Create a job queue whose jobs block until released."""
+        generator = FakeGenerator()
+        queue = JobQueue(generator, str(tmp_path), workers=1)
+        yield queue
+        generator.release.set()
+        queue.shutdown()
+
+    def test_tenant_queue_quota(self, queue):
+        """Test that a tenant cannot queue more than max_queued jobs."""
+        acme = Tenant('acme', max_queued=1)
+        queue.submit("a", tenant=acme)
+        with pytest.raises(TenantQuotaError):
+            queue.submit("b", tenant=acme)
+        queue.submit("b", tenant=Tenant('globex'))
+
+    def test_tenants_are_not_merged(self, queue):
+        """Test that identical descriptions from different tenants are separate jobs."""
+        first = queue.submit("voltage divider", tenant=Tenant('acme'))
+        second = queue.submit("voltage divider", tenant=Tenant('globex'))
+        assert first is not second
+        assert second.tenant == 'globex'
+
+    def test_jobs_borrow_from_pool(self, tmp_path):
+        """Test that a queue backed by a pool runs each job on a pooled instance."""
+        created = []
+
+        def factory(api_key):
+            created.append(FakeGenerator())
+            created[-1].release.set()
+            return created[-1]
+
+        queue = JobQueue(GeneratorPool(factory, max_size=1), str(tmp_path), workers=2)
+        try:
+            jobs = [queue.submit(description, tenant=Tenant('acme', api_key='k')) for description in "abc"]
+            assert all(queue.wait_done(job.id, timeout=5).status == 'succeeded' for job in jobs)
+            assert len(created) == 1
+            assert sorted(created[0].calls) == ["a", "b", "c"]
+            assert created[0].scopes == ['acme'] * 3
+        finally:
+            queue.shutdown()
+
+    def test_routes_require_a_tenant_token(self, queue, monkeypatch, mock_anthropic_client):
+        """Test that tenants authenticate and only see their own jobs."""
+        import wsgi
+        monkeypatch.setattr(wsgi, 'jobs', queue)
+        monkeypatch.setattr(wsgi, 'tenants', {'tok-a': Tenant('acme'), 'tok-b': Tenant('globex')})
+        client = wsgi.app.test_client()
+        assert client.post('/jobs', json={'description': 'a'}).status_code == 401
+        response = client.post('/jobs', json={'description': 'a'}, headers={'Authorization': 'Bearer tok-a'})
+        assert response.status_code == 202
+        job_id = response.get_json()['id']
+        assert client.get(f'/jobs/{job_id}', headers={'X-API-Key': 'tok-a'}).status_code == 200
+        assert client.get(f'/jobs/{job_id}', headers={'X-API-Key': 'tok-b'}).status_code == 404
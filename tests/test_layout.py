@@ -0,0 +1,143 @@
+import pytest
+import schemdraw
+from ai_schematic_generator.ai_generator import AISchematicGenerator
+from ai_schematic_generator.layout import (
+    FOOTPRINTS, PINS, TWO_TERMINAL_FOOTPRINT, TWO_TERMINAL_PINS, GridRouter, compute_layout,
+    layered_placement, _expand
+)
+from ai_schematic_generator.schematic_generator import (
+    ELEMENT_FACTORIES, Component, SchematicGenerator, netlist_hash
+)
+from ai_schematic_generator.svg_writer import place_element
+
+def chain(n, kind="resistor"):
+    components = [Component(kind, f"R{i}") for i in range(n)]
+    connections = [(f"R{i}", f"R{i + 1}") for i in range(n - 1)]
+    return components, connections
+
+class TestPlacement:
+    def test_positions_are_unique_and_deterministic(self):
+        """Test that every component gets its own cell, the same every time."""
+        components, connections = chain(50)
+        ids = [c.id for c in components]
+        first = layered_placement(ids, connections)
+        assert first == layered_placement(ids, connections)
+        assert len(set(first.values())) == 50
+
+    def test_neighbours_share_a_row(self):
+        """Test that a short chain is laid out left to right."""
+        positions = layered_placement(["A", "B", "C"], [("A", "B"), ("B", "C")])
+        assert positions["A"][1] == positions["B"][1] == positions["C"][1]
+        assert positions["A"][0] < positions["B"][0] < positions["C"][0]
+
+    def test_disconnected_parts_do_not_overlap(self):
+        """Test that separate subgraphs are stacked apart."""
+        positions = layered_placement(["A", "B", "X", "Y"], [("A", "B"), ("X", "Y")])
+        assert positions["A"][1] != positions["X"][1]
+
+    def test_large_graphs_wrap(self):
+        """Test that long chains wrap into bands instead of one strip."""
+        components, connections = chain(500)
+        positions = layered_placement([c.id for c in components], connections)
+        xs = [x for x, _ in positions.values()]
+        ys = [y for _, y in positions.values()]
+        assert max(xs) - min(xs) < 500 * 6
+        assert len(set(ys)) > 1
+
+class TestRouting:
+    def test_routes_are_orthogonal_and_avoid_components(self):
+        """Test that wires join pins with horizontal and vertical runs only."""
+        components = [Component("resistor", f"R{i}") for i in range(6)] + [Component("transistor", "Q1")]
+        connections = [("R0", "R1"), ("R1", "R2"), ("R0", "R3"), ("R3", "Q1"), ("Q1", "R4"), ("R2", "R5"), ("R5", "R0")]
+        layout = compute_layout(components, connections)
+
+        footprints = {}
+        pins = {}
+        for component in components:
+            x, y = layout.positions[component.id]
+            for dx, dy in FOOTPRINTS.get(component.type, TWO_TERMINAL_FOOTPRINT):
+                footprints[(x + dx, y + dy)] = component.id
+            for dx, dy in PINS.get(component.type, TWO_TERMINAL_PINS):
+                pins[(x + round(dx), y + round(dy))] = component.id
+
+        for (start, end), route in layout.routes.items():
+            for a, b in zip(route, route[1:]):
+                assert a[0] == b[0] or a[1] == b[1]
+            # Leads from off-grid terminals are not part of the grid route.
+            grid = [(int(x), int(y)) for x, y in route if x == int(x) and y == int(y)]
+            cells = _expand(grid)
+            for cell in cells:
+                assert cell not in footprints
+            for cell in cells[1:-1]:
+                assert pins.get(cell) is None
+
+    def test_wires_end_on_terminals(self):
+        """Test that wires leave the start part's output and enter the end part's input, as drawn."""
+        generator = SchematicGenerator()
+        for component in (Component("resistor", "R1"), Component("transistor", "Q1"),
+                          Component("diode", "D1"), Component("capacitor", "C1")):
+            generator.add_component(component)
+        for start, end in (("R1", "Q1"), ("Q1", "D1"), ("D1", "C1"), ("C1", "R1")):
+            generator.add_connection(start, end)
+        generator.auto_layout()
+
+        drawing = schemdraw.Drawing()
+        anchors = {}
+        for component in generator.components.values():
+            element = drawing.add(place_element(ELEMENT_FACTORIES[component.type], component.position, 0))
+            anchors[component.id] = element.absanchors
+        inputs = {'transistor': 'base'}
+        outputs = {'transistor': 'collector'}
+        for (start, end), route in generator.routes.items():
+            start_type, end_type = generator.components[start].type, generator.components[end].type
+            assert route[0] == pytest.approx(tuple(anchors[start][outputs.get(start_type, 'end')]), abs=1e-3)
+            assert route[-1] == pytest.approx(tuple(anchors[end][inputs.get(end_type, 'start')]), abs=1e-3)
+
+    def test_maze_search_goes_around_obstacles(self):
+        """Test that the router detours when every straight path is blocked."""
+        router = GridRouter()
+        router.place("W", (2, -2), [(0, dy) for dy in range(1, 5)])
+        route = router.route((0, 0), (4, 0))
+        cells = _expand(route)
+        assert (2, 0) not in cells
+        assert route[0] == (0, 0) and route[-1] == (4, 0)
+
+class TestAutoLayout:
+    def test_generator_auto_layout(self, tmp_path):
+        """Test that auto layout replaces positions and draws routed wires."""
+        generator = SchematicGenerator()
+        for i in range(4):
+            generator.add_component(Component("capacitor", f"C{i}", position=(0, 0), rotation=90))
+        generator.add_connection("C0", "C1")
+        generator.add_connection("C1", "C2")
+        generator.add_connection("C0", "C3")
+        generator.auto_layout()
+
+        positions = [c.position for c in generator.components.values()]
+        assert len(set(positions)) == 4
+        assert all(c.rotation == 0 for c in generator.components.values())
+        for (x0, y0), (x1, y1) in generator.wire_segments():
+            assert x0 == x1 or y0 == y1
+        generator.save(str(tmp_path / "out.svg"))
+        assert (tmp_path / "out.svg").exists()
+
+    def test_layout_changes_netlist_hash(self):
+        """Test that laid-out renders are cached separately."""
+        components, connections = chain(3)
+        assert netlist_hash(components, connections) != netlist_hash(components, connections, layout=True)
+
+    def test_topology_prompt(self):
+        """Test that layout mode asks the model for topology only."""
+        generator = AISchematicGenerator("dummy-api-key", layout=True)
+        prompt = generator._generate_circuit_prompt("An RC filter")
+        assert "position" not in prompt
+        assert "rotation" not in prompt
+        assert "connections" in prompt
+
+    @pytest.mark.asyncio
+    async def test_generate_with_layout(self, mock_anthropic_client, tmp_path):
+        """Test end-to-end generation with local layout."""
+        generator = AISchematicGenerator("dummy-api-key", layout=True)
+        await generator.generate_schematic_from_description("Two resistors", str(tmp_path / "out.svg"))
+        assert (tmp_path / "out.svg").exists()
+        assert generator.schematic_generator.routes
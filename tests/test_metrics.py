@@ -0,0 +1,61 @@
+import pytest
+from click.testing import CliRunner
+from ai_schematic_generator.ai_generator import AISchematicGenerator
+from ai_schematic_generator.cli import cli
+from ai_schematic_generator.metrics import METRICS, Metrics
+
+class TestMetrics:
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        METRICS.reset()
+        yield
+        METRICS.reset()
+
+    def test_histogram_and_counters(self):
+        """Test recording durations and counters."""
+        metrics = Metrics()
+        metrics.observe('render', 0.02)
+        metrics.observe('render', 0.2)
+        metrics.inc('retries')
+        snapshot = metrics.snapshot()
+        assert snapshot['stages']['render']['count'] == 2
+        assert snapshot['stages']['render']['total'] == pytest.approx(0.22)
+        assert snapshot['counters'] == {'retries': 1}
+
+    def test_prometheus_format(self):
+        """Test the text exposition output."""
+        metrics = Metrics()
+        metrics.observe('render', 0.02)
+        metrics.inc('failures')
+        text = metrics.render_prometheus()
+        assert 'schematic_stage_seconds_bucket{stage="render",le="0.025"} 1' in text
+        assert 'schematic_stage_seconds_bucket{stage="render",le="0.01"} 0' in text
+        assert 'schematic_stage_seconds_count{stage="render"} 1' in text
+        assert 'schematic_failures_total 1' in text
+
+    @pytest.mark.asyncio
+    async def test_generation_records_stages(self, mock_anthropic_client, tmp_path):
+        """Test that a generation records every local stage."""
+        generator = AISchematicGenerator("dummy-api-key")
+        await generator.generate_schematic_from_description("divider", str(tmp_path / "out.svg"))
+        stages = METRICS.snapshot()['stages']
+        for stage in ('prompt_build', 'api_total', 'json_parse', 'netlist_build', 'render', 'file_write'):
+            assert stages[stage]['count'] == 1
+
+    def test_cli_profile(self, mock_anthropic_client, monkeypatch, tmp_path):
+        """Test that --profile prints the stage breakdown."""
+        monkeypatch.setenv('ANTHROPIC_API_KEY', 'dummy-key')
+        result = CliRunner(mix_stderr=False).invoke(cli, [
+            'generate', 'voltage divider', '-o', str(tmp_path / 'out.svg'), '--profile'
+        ], catch_exceptions=False)
+        assert result.exit_code == 0
+        assert 'Pipeline Profile' in result.stdout
+        assert 'render' in result.stdout
+
+    def test_metrics_route(self, mock_anthropic_client):
+        """Test the Prometheus endpoint."""
+        import wsgi
+        METRICS.inc('generations')
+        response = wsgi.app.test_client().get('/metrics')
+        assert response.status_code == 200
+        assert 'schematic_generations_total 1' in response.get_data(as_text=True)
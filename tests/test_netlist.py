@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from ai_schematic_generator.netlist import Netlist
+from ai_schematic_generator.schematic_generator import Component, SchematicGenerator, netlist_hash
+
+class TestNetlist:
+    @pytest.fixture
+    def netlist(self):
+        """Create a small netlist: a triangle plus an isolated part."""
+        netlist = Netlist()
+        netlist.add_component("R1", "resistor", "10k", (0, 0))
+        netlist.add_component("R2", "resistor", "1k", (3, 0), 90)
+        netlist.add_component("C1", "capacitor", None, (0, 3))
+        netlist.add_component("Q1", "transistor", None, (6, 6))
+        for start, end in [("R1", "R2"), ("R2", "C1"), ("C1", "R1")]:
+            netlist.add_edge(start, end)
+        return netlist
+
+    def test_arrays(self, netlist):
+        """Test that components are stored column-wise."""
+        assert len(netlist) == 4
+        assert netlist.positions.shape == (4, 2)
+        assert netlist.rotations.tolist() == [0, 90, 0, 0]
+        assert [netlist.type_names[t] for t in netlist.types] == ["resistor", "resistor", "capacitor", "transistor"]
+        assert netlist.edges.tolist() == [[0, 1], [1, 2], [2, 0]]
+
+    def test_ids_are_interned(self, netlist):
+        """Test that ids and types share one string object each."""
+        assert netlist.ids[0] is netlist.ids[0]
+        assert netlist.type_names.count("resistor") == 1
+
+    def test_remove_component_compacts(self, netlist):
+        """Test that removal drops the part's edges and renumbers the rest."""
+        netlist.remove_component("R2")
+        assert netlist.ids == ["R1", "C1", "Q1"]
+        assert netlist.index == {"R1": 0, "C1": 1, "Q1": 2}
+        assert netlist.positions.tolist() == [[0, 0], [0, 3], [6, 6]]
+        assert netlist.connection_pairs() == [("C1", "R1")]
+        assert netlist.neighbours("R1") == ["C1"]
+        assert not netlist.add_edge("R1", "C1")
+
+    def test_remove_edge(self, netlist):
+        """Test that an edge is removed in either direction, once."""
+        assert netlist.remove_edge("R2", "R1")
+        assert not netlist.remove_edge("R1", "R2")
+        assert netlist.connection_pairs() == [("R2", "C1"), ("C1", "R1")]
+        assert netlist.add_edge("R1", "R2")
+
+    def test_replace_component(self, netlist):
+        """Test that re-adding an id updates it in place."""
+        netlist.add_component("R1", "resistor", "22k", (1, 1))
+        assert len(netlist) == 4
+        assert netlist.values[0] == "22k"
+        assert netlist.positions[0].tolist() == [1, 1]
+
+    def test_rotation_round_trips_exactly(self):
+        """Test that a rotation reads back as given, so hashes and exports match the input."""
+        component = Component("resistor", "R1", "10k", (0.1, 0.2), 33.3)
+        generator = SchematicGenerator()
+        generator.add_component(component)
+        assert generator.components["R1"] == component
+        assert generator.netlist_hash() == netlist_hash([component], [])
+
+    def test_duplicate_edges(self, netlist):
+        """Test that edges are undirected and deduplicated."""
+        assert not netlist.add_edge("R2", "R1")
+        assert netlist.add_edge("R1", "Q1")
+        assert len(netlist.edges) == 4
+
+    def test_adjacency(self, netlist):
+        """Test the CSR adjacency and its invalidation."""
+        indptr, indices = netlist.adjacency()
+        assert indptr.tolist() == [0, 2, 4, 6, 6]
+        assert sorted(netlist.neighbours("R1")) == ["C1", "R2"]
+        assert netlist.neighbours("Q1") == []
+        netlist.add_edge("Q1", "R1")
+        assert netlist.neighbours("Q1") == ["R1"]
+        netlist.add_component("L1", "inductor")
+        assert netlist.neighbours("L1") == []
+
+    def test_growth(self):
+        """Test that arrays grow past their initial capacity."""
+        netlist = Netlist()
+        for i in range(100):
+            netlist.add_component(f"R{i}", "resistor", position=(i, 0))
+            if i:
+                netlist.add_edge(f"R{i - 1}", f"R{i}")
+        assert netlist.positions[:, 0].tolist() == list(range(100))
+        assert len(netlist.edges) == 99
+        netlist.set_geometry(np.zeros((100, 2)))
+        assert not netlist.positions.any()
+
+class TestComponentView:
+    def test_generator_components(self):
+        """Test that the generator exposes components as a read-only mapping."""
+        generator = SchematicGenerator()
+        generator.add_component(Component("resistor", "R1", value="10k", position=(1, 2), rotation=90))
+        component = generator.components["R1"]
+        assert component == Component("resistor", "R1", "10k", (1.0, 2.0), 90.0)
+        assert "R1" in generator.components and "R2" not in generator.components
+        assert len(generator.components) == 1
+        with pytest.raises(TypeError):
+            generator.components["R2"] = component
+
+    def test_component_slots(self):
+        """Test that components do not carry a per-instance dict."""
+        assert not hasattr(Component("resistor", "R1"), "__dict__")
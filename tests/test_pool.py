@@ -0,0 +1,140 @@
+import asyncio
+import json
+import pytest
+from ai_schematic_generator.pool import GeneratorPool, Tenant, load_tenants
+
+class FakeGenerator:
+    """Generator stand-in that records resets and closes."""
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.resets = 0
+        self.closed = False
+
+    def reset(self):
+        self.resets += 1
+
+    async def aclose(self):
+        self.closed = True
+
+ACME = Tenant('acme', api_key='key-a', max_concurrent=1)
+GLOBEX = Tenant('globex', api_key='key-b')
+
+class TestGeneratorPool:
+    @pytest.fixture
+    def created(self):
+        return []
+
+    @pytest.fixture
+    def pool(self, created):
+        """Create a pool of at most two instances, recycled after three uses."""
+        def factory(api_key):
+            generator = FakeGenerator(api_key)
+            created.append(generator)
+            return generator
+        return GeneratorPool(factory, max_size=2, max_uses=3)
+
+    @pytest.mark.asyncio
+    async def test_reuses_and_resets_instances(self, pool, created):
+        """Test that a released instance is reset and lent out again."""
+        for _ in range(2):
+            async with pool.acquire(ACME) as generator:
+                assert generator.api_key == 'key-a'
+        assert len(created) == 1
+        assert created[0].resets == 2
+
+    @pytest.mark.asyncio
+    async def test_recycles_after_max_uses(self, pool, created):
+        """Test that an instance is closed after max_uses and replaced."""
+        for _ in range(4):
+            async with pool.acquire(ACME):
+                pass
+        assert len(created) == 2
+        assert created[0].closed and not created[1].closed
+        assert pool.size == 1
+
+    @pytest.mark.asyncio
+    async def test_recycles_over_memory_ceiling(self, pool, created, monkeypatch):
+        """Test that instances are retired while the process is over its ceiling."""
+        monkeypatch.setattr('ai_schematic_generator.pool.process_rss', lambda: 2048)
+        pool.max_rss_bytes = 1024
+        async with pool.acquire(ACME):
+            pass
+        assert created[0].closed
+        assert pool.size == 0
+
+    @pytest.mark.asyncio
+    async def test_steady_high_memory_retires_once_per_interval(self, pool, created, monkeypatch):
+        """Test that a process staying over its ceiling does not retire an instance on every release."""
+        monkeypatch.setattr('ai_schematic_generator.pool.process_rss', lambda: 2048)
+        pool.max_rss_bytes = 1024
+        pool.max_uses = 100
+        for _ in range(5):
+            async with pool.acquire(ACME):
+                pass
+        assert len(created) == 2
+        assert created[0].closed and not created[1].closed
+
+        # As if the interval had passed.
+        pool._last_rss_recycle -= pool.rss_recycle_interval
+        async with pool.acquire(ACME):
+            pass
+        assert created[1].closed
+
+    @pytest.mark.asyncio
+    async def test_size_cap_evicts_idle_instance_of_other_key(self, pool, created):
+        """Test that a full pool closes an idle instance to serve another key."""
+        pool.max_size = 1
+        async with pool.acquire(ACME):
+            pass
+        async with pool.acquire(GLOBEX) as generator:
+            assert generator.api_key == 'key-b'
+        assert created[0].closed
+        assert pool.size == 1
+
+    @pytest.mark.asyncio
+    async def test_waits_when_every_instance_is_busy(self, pool):
+        """Test that the pool never grows past max_size."""
+        peak = 0
+
+        async def use(tenant):
+            nonlocal peak
+            async with pool.acquire(tenant):
+                peak = max(peak, pool.size)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(use(Tenant(f't{i}', api_key=str(i))) for i in range(5)))
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_tenant_concurrency_quota(self, pool):
+        """Test that a tenant never runs more than max_concurrent at once."""
+        running = peak = 0
+
+        async def use():
+            nonlocal running, peak
+            async with pool.acquire(ACME):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(use(), use(), use())
+        assert peak == 1
+
+    @pytest.mark.asyncio
+    async def test_close(self, pool, created):
+        """Test that close shuts idle instances and retires busy ones on release."""
+        async with pool.acquire(ACME):
+            async with pool.acquire(GLOBEX):
+                pass
+            await pool.close()
+            assert created[1].closed and not created[0].closed
+        assert created[0].closed
+        assert pool.size == 0
+
+    def test_load_tenants(self, tmp_path):
+        """Test reading tenants keyed by access token."""
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps({'tok': {'name': 'acme', 'api_key': 'key-a', 'max_concurrent': 2}}))
+        assert load_tenants(str(path)) == {'tok': Tenant('acme', 'key-a', 2)}
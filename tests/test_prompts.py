@@ -0,0 +1,92 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from ai_schematic_generator.ai_generator import AISchematicGenerator
+from ai_schematic_generator.prompts import (
+    MAX_OUTPUT_TOKENS, MIN_OUTPUT_TOKENS, PLACED_TEMPLATE, TOPOLOGY_TEMPLATE, estimate_components,
+    estimate_max_tokens
+)
+from tests.test_streaming import FakeStream, chunked
+
+DOCUMENT = json.dumps({
+    "components": [
+        {"type": "resistor", "id": "R1", "value": "10k", "position": [0, 0]},
+        {"type": "resistor", "id": "R2", "value": "10k", "position": [3, 0]},
+    ],
+    "connections": [{"start": "R1", "end": "R2"}],
+}, separators=(',', ':'))
+
+def response(text, stop_reason="end_turn"):
+    message = MagicMock()
+    message.content = text
+    message.stop_reason = stop_reason
+    return message
+
+class TestPrompts:
+    def test_prefix_is_stable(self):
+        """Test that only the user message depends on the description."""
+        first, second = PLACED_TEMPLATE.render("divider"), PLACED_TEMPLATE.render("rc filter")
+        assert first.startswith(PLACED_TEMPLATE.system) and second.startswith(PLACED_TEMPLATE.system)
+        assert "divider" not in PLACED_TEMPLATE.system
+        assert "position" not in TOPOLOGY_TEMPLATE.system
+
+    def test_estimate_components(self):
+        """Test counting parts without mistaking values for counts."""
+        assert estimate_components("voltage divider with two 10k resistors") == 4
+        assert estimate_components("a 100 nF capacitor and 3 resistors") == 4
+        assert estimate_components("sixteen LEDs, each with a 330 ohm resistor") == 17
+        assert estimate_components("an astable multivibrator") == 8
+
+    def test_estimate_max_tokens(self):
+        """Test that budgets grow with the circuit and stay within bounds."""
+        small = estimate_max_tokens("voltage divider")
+        large = estimate_max_tokens("an array of 40 LEDs with 40 resistors")
+        assert MIN_OUTPUT_TOKENS <= small < large <= MAX_OUTPUT_TOKENS
+        assert estimate_max_tokens("1000 resistors") == MAX_OUTPUT_TOKENS
+        assert estimate_max_tokens("40 resistors", TOPOLOGY_TEMPLATE) < estimate_max_tokens("40 resistors")
+
+class TestGeneration:
+    @pytest.mark.asyncio
+    async def test_request_uses_stable_prefix(self, mock_anthropic_client, tmp_path):
+        """Test that requests send the stable system prompt and an adaptive budget."""
+        mock_anthropic_client.messages.create.return_value = response(DOCUMENT)
+        generator = AISchematicGenerator("dummy-api-key")
+        await generator.generate_schematic_from_description("voltage divider", str(tmp_path / "out.svg"))
+        kwargs = mock_anthropic_client.messages.create.await_args.kwargs
+        assert kwargs["system"] == PLACED_TEMPLATE.system
+        assert kwargs["messages"] == [{"role": "user", "content": "Description: voltage divider"}]
+        assert kwargs["max_tokens"] == estimate_max_tokens("voltage divider")
+
+    @pytest.mark.asyncio
+    async def test_truncated_response_is_continued(self, mock_anthropic_client, tmp_path):
+        """Test that a response cut off at its budget is continued, not retried."""
+        head, tail = DOCUMENT[:40] + "  ", DOCUMENT[40:]
+        mock_anthropic_client.messages.create.side_effect = [response(head, "max_tokens"), response(tail)]
+        generator = AISchematicGenerator("dummy-api-key")
+        await generator.generate_schematic_from_description("voltage divider", str(tmp_path / "out.svg"))
+
+        assert (tmp_path / "out.svg").exists()
+        first, second = [call.kwargs for call in mock_anthropic_client.messages.create.await_args_list]
+        assert second["messages"][-1] == {"role": "assistant", "content": head.rstrip()}
+        assert second["max_tokens"] == 2 * first["max_tokens"]
+        assert set(generator.schematic_generator.components) == {"R1", "R2"}
+
+    @pytest.mark.asyncio
+    async def test_truncated_stream_is_continued(self, mock_anthropic_client, tmp_path):
+        """Test that streamed continuations feed the same parser."""
+        class FinalStream(FakeStream):
+            def __init__(self, chunks, stop_reason):
+                super().__init__(chunks)
+                self.stop_reason = stop_reason
+
+            async def get_final_message(self):
+                return MagicMock(stop_reason=self.stop_reason, usage=None)
+
+        streams = [FinalStream(chunked(DOCUMENT[:50]), "max_tokens"), FinalStream(chunked(DOCUMENT[50:]), "end_turn")]
+        mock_anthropic_client.messages.stream = MagicMock(side_effect=streams)
+        generator = AISchematicGenerator("dummy-api-key")
+        await generator.generate_schematic_from_description(
+            "voltage divider", str(tmp_path / "out.svg"), stream=True
+        )
+        assert (tmp_path / "out.svg").exists()
+        assert mock_anthropic_client.messages.stream.call_args.kwargs["messages"][-1]["content"] == DOCUMENT[:50]
@@ -0,0 +1,43 @@
+import pytest
+import json
+from ai_schematic_generator.ai_generator import AISchematicGenerator
+from ai_schematic_generator.render import RenderPool, render_schematic
+
+CIRCUIT = json.dumps({
+    "components": [
+        {"type": "resistor", "id": "R1", "value": "10k", "position": [0, 0]},
+        {"type": "capacitor", "id": "C1", "value": "1u", "position": [2, 0]}
+    ],
+    "connections": [{"start": "R1", "end": "C1"}]
+})
+
+class TestRenderPool:
+    @pytest.fixture(scope="class")
+    def pool(self):
+        """Create a single-worker render pool shared by the class."""
+        with RenderPool(max_workers=1) as pool:
+            yield pool
+
+    def test_render_schematic(self, tmp_path):
+        """Test rendering in-process with the worker entry point."""
+        filename = render_schematic(CIRCUIT, str(tmp_path / "out.png"))
+        assert filename.endswith("out.svg")
+        assert (tmp_path / "out.svg").exists()
+
+    @pytest.mark.asyncio
+    async def test_pool_render(self, pool, tmp_path):
+        """Test rendering in a worker process."""
+        filename = await pool.render(CIRCUIT, str(tmp_path / "out.svg"))
+        assert filename == str(tmp_path / "out.svg")
+        assert "<svg" in (tmp_path / "out.svg").read_text()
+
+    @pytest.mark.asyncio
+    async def test_generator_uses_pool(self, pool, mock_anthropic_client, tmp_path):
+        """Test that the generator delegates drawing to the pool."""
+        generator = AISchematicGenerator("dummy-api-key", renderer=pool)
+        result = await generator.generate_schematic_from_description(
+            "voltage divider", str(tmp_path / "out.svg")
+        )
+        assert "Successfully" in result
+        assert (tmp_path / "out.svg").exists()
+        assert generator.schematic_generator.components == {}
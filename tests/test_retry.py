@@ -0,0 +1,117 @@
+import pytest
+import email.utils
+import json
+import time
+import anthropic
+import httpx
+from ai_schematic_generator.ai_generator import AISchematicGenerator
+from ai_schematic_generator.retry import RetryPolicy, repair_json, retry_after
+from ai_schematic_generator.streaming import StreamParseError
+from ai_schematic_generator.validation import SchematicValidationError
+
+def status_error(cls, status, headers=None):
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return cls("error", response=response, body=None)
+
+class TestRetryPolicy:
+    def test_classification(self):
+        """Test that errors are sorted into transient, output and fatal."""
+        policy = RetryPolicy()
+        assert policy.classify(status_error(anthropic.RateLimitError, 429)) == 'transient'
+        assert policy.classify(status_error(anthropic.InternalServerError, 503)) == 'transient'
+        assert policy.classify(status_error(anthropic.AuthenticationError, 401)) == 'fatal'
+        assert policy.classify(status_error(anthropic.BadRequestError, 400)) == 'fatal'
+        assert policy.classify(json.JSONDecodeError("bad", "", 0)) == 'output'
+        assert policy.classify(StreamParseError("Unexpected ']' at offset 3")) == 'output'
+        assert policy.classify(SchematicValidationError([], "{}")) == 'output'
+        assert policy.classify(KeyError("R9")) == 'fatal'
+        assert policy.classify(TypeError("unsupported operand")) == 'fatal'
+        assert policy.classify(OSError("disk full")) == 'fatal'
+
+    def test_exponential_backoff(self):
+        """Test that delays double per attempt up to the cap."""
+        policy = RetryPolicy(base_delay=1, max_delay=5, jitter=False)
+        assert [policy.delay(i) for i in range(4)] == [1, 2, 4, 5]
+
+    def test_jitter_bounds(self):
+        """Test that jittered delays stay within the backoff window."""
+        policy = RetryPolicy(base_delay=1)
+        assert all(0 <= policy.delay(2) <= 4 for _ in range(50))
+
+    def test_retry_after_header(self):
+        """Test that retry-after and retry-after-ms are honoured."""
+        assert retry_after(status_error(anthropic.RateLimitError, 429, {'retry-after': '7'})) == 7
+        assert retry_after(status_error(anthropic.RateLimitError, 429, {'retry-after-ms': '250'})) == 0.25
+
+    def test_retry_after_is_not_capped(self):
+        """Test that a requested wait is honoured beyond max_delay and fails the operation when too long."""
+        policy = RetryPolicy(max_delay=3, max_retry_after=10)
+        error = status_error(anthropic.RateLimitError, 429, {'retry-after': '7'})
+        assert policy.classify(error) == 'transient'
+        assert policy.delay(0, error) == 7
+        assert policy.classify(status_error(anthropic.RateLimitError, 429, {'retry-after': '11'})) == 'fatal'
+        assert policy.classify(status_error(anthropic.InternalServerError, 503, {'retry-after': '11'})) == 'fatal'
+
+    def test_malformed_retry_after_falls_back_to_backoff(self):
+        """Test that an unparseable retry-after header is ignored instead of raising."""
+        error = status_error(anthropic.RateLimitError, 429, {'retry-after': 'soon'})
+        assert retry_after(error) is None
+        assert 0 <= RetryPolicy(base_delay=1).delay(0, error) <= 1
+
+    def test_retry_after_http_date(self):
+        """Test that an HTTP date is read as UTC, however it is written."""
+        future = email.utils.formatdate(time.time() + 30, usegmt=True)
+        assert 25 < retry_after(status_error(anthropic.RateLimitError, 429, {'retry-after': future})) <= 30
+        naive = future.replace('GMT', '-0000')
+        assert 25 < retry_after(status_error(anthropic.RateLimitError, 429, {'retry-after': naive})) <= 30
+
+class TestRepairJson:
+    def test_strips_fences_prose_and_trailing_commas(self):
+        """Test the common malformed-output cases."""
+        text = 'Sure! Here it is:\n```json\n{"components": [{"type": "Res", "id": "R1"},], "connections": [],}\n```\nEnjoy.'
+        data = json.loads(repair_json(text))
+        assert data == {"components": [{"type": "resistor", "id": "R1"}], "connections": []}
+
+    def test_unrepairable(self):
+        """Test that hopeless output returns None."""
+        assert repair_json("no json here") is None
+        assert repair_json('{"components": [') is None
+
+class TestGeneratorRetries:
+    @pytest.mark.asyncio
+    async def test_local_repair_avoids_second_call(self, mock_anthropic_client, tmp_path):
+        """Test that fenced output is repaired without another API call."""
+        response = mock_anthropic_client.messages.create.return_value
+        response.content = "```json\n" + response.content + "\n```"
+        generator = AISchematicGenerator("dummy-api-key")
+        await generator.generate_schematic_from_description("divider", str(tmp_path / "out.svg"))
+        assert mock_anthropic_client.messages.create.await_count == 1
+        assert (tmp_path / "out.svg").exists()
+
+    @pytest.mark.asyncio
+    async def test_fatal_error_is_not_retried(self, mock_anthropic_client, tmp_path):
+        """Test that authentication errors fail after one attempt."""
+        mock_anthropic_client.messages.create.side_effect = status_error(anthropic.AuthenticationError, 401)
+        generator = AISchematicGenerator("dummy-api-key")
+        with pytest.raises(Exception):
+            await generator.generate_schematic_from_description("divider", str(tmp_path / "out.svg"))
+        assert mock_anthropic_client.messages.create.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_transient_error_backs_off(self, mock_anthropic_client, tmp_path, monkeypatch):
+        """Test that rate limits are retried after the requested delay."""
+        sleeps = []
+
+        async def fake_sleep(delay):
+            sleeps.append(delay)
+
+        monkeypatch.setattr('ai_schematic_generator.ai_generator.asyncio.sleep', fake_sleep)
+        response = mock_anthropic_client.messages.create.return_value
+        mock_anthropic_client.messages.create.side_effect = [
+            status_error(anthropic.RateLimitError, 429, {'retry-after': '2'}),
+            response
+        ]
+        generator = AISchematicGenerator("dummy-api-key")
+        await generator.generate_schematic_from_description("divider", str(tmp_path / "out.svg"))
+        assert sleeps == [2]
@@ -1,5 +1,11 @@
+import os
+import re
+from xml.etree import ElementTree
 import pytest
-from ai_schematic_generator.schematic_generator import SchematicGenerator, Component
+from ai_schematic_generator.schematic_generator import (
+    ELEMENT_FACTORIES, SchematicGenerator, Component, merge_collinear
+)
+from ai_schematic_generator.svg_writer import SCALE, component_boxes, symbol_geometry, symbol_table
 
 class TestSchematicGenerator:
     @pytest.fixture
@@ -41,3 +47,111 @@ class TestSchematicGenerator:
         # Connect them
         generator.add_connection("R1", "R2")
         assert ("R1", "R2") in generator.connections
+
+    def test_duplicate_connections_are_ignored(self, generator):
+        """Test that repeated wires in either direction are dropped."""
+        generator.add_component(Component("resistor", "R1", position=(0, 0)))
+        generator.add_component(Component("resistor", "R2", position=(2, 0)))
+        generator.add_connection("R1", "R2")
+        generator.add_connection("R2", "R1")
+        generator.add_connection("R1", "R2")
+        assert generator.connections == [("R1", "R2")]
+
+    def test_connection_to_unknown_component(self, generator):
+        """Test that connecting a missing component fails immediately."""
+        generator.add_component(Component("resistor", "R1"))
+        with pytest.raises(KeyError):
+            generator.add_connection("R1", "R9")
+
+    def test_rotated_transistor_renders(self, generator, tmp_path):
+        """Test that multi-terminal elements can be rotated."""
+        generator.add_component(Component("transistor", "Q1", position=(0, 0), rotation=90))
+        assert os.path.exists(generator.save(str(tmp_path / "q.svg")))
+
+    def test_factory_registry(self):
+        """Test that every registered type builds an element."""
+        for kind, factory in ELEMENT_FACTORIES.items():
+            assert factory() is not None, kind
+
+
+class TestMergeCollinear:
+    def test_chain_is_merged(self):
+        """Test that touching segments on one line become one."""
+        merged = merge_collinear([((0, 0), (2, 0)), ((4, 0), (2, 0)), ((4, 0), (6, 0))])
+        assert merged == [((0.0, 0.0), (6.0, 0.0))]
+
+    def test_overlapping_and_separate_segments(self):
+        """Test overlaps merge while gaps and other lines are kept apart."""
+        merged = merge_collinear([
+            ((0, 0), (3, 0)), ((1, 0), (2, 0)), ((5, 0), (6, 0)),
+            ((0, 1), (0, 3)), ((0, 0), (0, 0)),
+        ])
+        assert len(merged) == 3
+        assert ((0.0, 0.0), (3.0, 0.0)) in merged
+        assert ((5.0, 0.0), (6.0, 0.0)) in merged
+
+    def test_diagonal_segments(self):
+        """Test that diagonal segments merge along their line."""
+        merged = merge_collinear([((0, 0), (1, 1)), ((1, 1), (2, 2))])
+        assert len(merged) == 1
+        (x0, y0), (x1, y1) = merged[0]
+        assert (x0, y0) == pytest.approx((0, 0), abs=1e-9)
+        assert (x1, y1) == pytest.approx((2, 2), abs=1e-9)
+
+
+class TestCompactSvg:
+    def build(self, threshold):
+        generator = SchematicGenerator(compact_threshold=threshold)
+        for i in range(6):
+            kind = ("resistor", "capacitor", "transistor")[i % 3]
+            generator.add_component(Component(kind, f"X{i}", value="1k", position=(i * 3, 0), rotation=90 * (i % 2)))
+        for i in range(5):
+            generator.add_connection(f"X{i}", f"X{i + 1}")
+        return generator
+
+    def test_uses_shared_symbols(self):
+        """Test that large netlists reference one symbol per type and rotation."""
+        data = self.build(threshold=1).render().decode('utf-8')
+        root = ElementTree.fromstring(data)
+        ns = {'svg': 'http://www.w3.org/2000/svg'}
+        assert len(root.findall('.//svg:symbol', ns)) == 6
+        assert len(root.findall('.//svg:use', ns)) == 6
+        assert data.count('<text') == 6
+        assert 'X0 1k' in data
+
+    def test_equivalent_rotations_share_one_symbol(self):
+        """Test that rotations rounding to the same symbol id also share its geometry."""
+        generator = SchematicGenerator()
+        for i, rotation in enumerate([90, 90.001, -270, 450, 359.999]):
+            generator.add_component(Component("diode", f"D{i}", position=(i * 3, 0), rotation=rotation))
+        symbols, geometry = symbol_table(generator.netlist, ELEMENT_FACTORIES)
+        assert symbols == ["diode-r90"] * 4 + ["diode"]
+        assert geometry["diode-r90"] == symbol_geometry(ELEMENT_FACTORIES["diode"], 90.0)
+
+    @pytest.mark.parametrize("kind", ["resistor", "capacitor", "diode", "transistor"])
+    @pytest.mark.parametrize("rotation", [0, 45, 90, 180, 270])
+    def test_parts_match_full_renderer(self, kind, rotation):
+        """Test that a part covers the same area in both writers, rotated or not."""
+        generator = SchematicGenerator(compact_threshold=None)
+        generator.add_component(Component(kind, "X1", position=(2, 1), rotation=rotation))
+        root = ElementTree.fromstring(generator.render())
+        points = [
+            (float(x) / SCALE, -float(y) / SCALE)
+            for element in root.iter() if element.tag.endswith(('path', 'polygon', 'polyline'))
+            for x, y in re.findall(r"(-?[\d.]+)[ ,](-?[\d.]+)", element.get('d') or element.get('points'))
+        ]
+        xs, ys = zip(*points)
+
+        symbols, geometry = symbol_table(generator.netlist, ELEMENT_FACTORIES)
+        box = component_boxes(generator.netlist, symbols, geometry)[0]
+        assert box.tolist() == pytest.approx([min(xs), min(ys), max(xs), max(ys)], abs=0.05)
+
+    def test_threshold(self):
+        """Test that small netlists keep the full schemdraw renderer."""
+        assert not self.build(threshold=None).is_compact()
+        assert not self.build(threshold=100).is_compact()
+        assert b'<use' not in self.build(threshold=100).render()
+
+    def test_compact_output_is_smaller(self):
+        """Test that shared symbols produce fewer bytes."""
+        assert len(self.build(threshold=1).render()) < len(self.build(threshold=None).render())
@@ -0,0 +1,115 @@
+import pytest
+from ai_schematic_generator.ai_generator import AISchematicGenerator
+from ai_schematic_generator.similarity import SimilarityIndex, description_tokens, embed
+
+class TestDescriptionTokens:
+    def test_folds_rephrasings(self):
+        """Test that number words, plurals, filler words and split units are normalised."""
+        assert description_tokens("Create a voltage divider with two 10k resistors") == [
+            'voltage', 'divider', '2', '10k', 'resistor'
+        ]
+        assert description_tokens("2 10 k ohm resistors") == ['2', '10k', 'resistor']
+        assert description_tokens("100 nF capacitor") == ['100nf', 'capacitor']
+
+    def test_embedding_is_unit_length_and_stable(self):
+        """Test that embeddings are normalised and do not depend on the process."""
+        vector = embed(description_tokens("RC low-pass filter"))
+        assert abs(float(vector @ vector) - 1.0) < 1e-5
+        assert (vector == embed(description_tokens("RC low-pass filter"))).all()
+
+class TestSimilarityIndex:
+    def test_paraphrase_matches(self):
+        """Test that a rephrased description returns the stored output."""
+        index = SimilarityIndex()
+        index.add("Create a voltage divider with two 10k resistors", "divider")
+        index.add("NPN common emitter amplifier", "amplifier")
+        match = index.lookup("two 10k resistor divider")
+        assert match.content == "divider"
+        assert match.score >= index.threshold
+        assert index.lookup("common-emitter NPN amplifier").content == "amplifier"
+
+    def test_different_values_and_qualifiers_never_match(self):
+        """Test that values, counts and qualifiers must agree however similar the rest is."""
+        index = SimilarityIndex(threshold=0.5)
+        index.add("voltage divider with two 10k resistors", "divider")
+        index.add("RC low-pass filter with 1k resistor and 100nF capacitor", "filter")
+        assert index.lookup("voltage divider with two 1k resistors") is None
+        assert index.lookup("voltage divider with three 10k resistors") is None
+        assert index.lookup("RC high-pass filter with 1k resistor and 100nF capacitor") is None
+
+    def test_extra_or_missing_parts_never_match(self):
+        """Test that a description adding or dropping a part does not reuse the stored netlist."""
+        index = SimilarityIndex()
+        index.add("voltage divider with two 10k resistors", "divider")
+        index.add("RC filter with 1k resistor and 100nF capacitor", "filter")
+        assert index.lookup("voltage divider with two 10k resistors and a capacitor") is None
+        assert index.lookup("voltage divider with two 10k resistors and an LED") is None
+        assert index.lookup("RC filter with 1k resistor and 100nF") is None
+        assert index.lookup("RC filter, 1k resistor, 100nF cap").content == "filter"
+
+    def test_threshold_and_scope(self):
+        """Test that matches below the threshold or in another scope are ignored."""
+        index = SimilarityIndex(threshold=0.99)
+        index.add("voltage divider with two 10k resistors", "divider", scope="placed")
+        assert index.lookup("two 10k resistor divider", scope="placed") is None
+        assert index.lookup("voltage divider with two 10k resistors", scope="layout") is None
+        assert index.lookup("Voltage divider, two 10k resistors", scope="placed").content == "divider"
+
+    def test_oldest_entry_is_replaced_when_full(self):
+        """Test that the index keeps at most max_entries entries."""
+        index = SimilarityIndex(max_entries=2)
+        index.add("bridge rectifier with four diodes", "bridge")
+        index.add("LC tank with 10uH inductor", "tank")
+        index.add("zener regulator with 5.1v zener", "zener")
+        assert len(index) == 2
+        assert index.lookup("bridge rectifier with four diodes") is None
+        assert index.lookup("LC tank with 10uH inductor").content == "tank"
+
+    def test_disk_store_persists(self, tmp_path):
+        """Test that entries survive a restart, up to max_entries."""
+        path = str(tmp_path / "similar.sqlite3")
+        index = SimilarityIndex(path=path, max_entries=2)
+        index.add("bridge rectifier with four diodes", "bridge")
+        index.add("LC tank with 10uH inductor", "tank")
+        index.add("zener regulator with 5.1v zener", "zener")
+        index.close()
+
+        reloaded = SimilarityIndex(path=path, max_entries=2)
+        assert len(reloaded) == 2
+        assert reloaded.lookup("bridge rectifier with four diodes") is None
+        assert reloaded.lookup("zener regulator using a 5.1 V zener").content == "zener"
+
+    def test_invalid_threshold(self):
+        """Test that a threshold outside (0, 1] is rejected."""
+        with pytest.raises(ValueError):
+            SimilarityIndex(threshold=0)
+
+    @pytest.mark.asyncio
+    async def test_generator_reuses_similar_answer(self, mock_anthropic_client, tmp_path):
+        """Test that a rephrased description skips the API call."""
+        generator = AISchematicGenerator("dummy-api-key", similarity=SimilarityIndex())
+
+        await generator.generate_schematic_from_description(
+            "voltage divider with two 10k resistors", str(tmp_path / "a.svg"))
+        await generator.generate_schematic_from_description(
+            "two 10k resistor divider", str(tmp_path / "b.svg"))
+        await generator.generate_schematic_from_description(
+            "voltage divider with two 1k resistors", str(tmp_path / "c.svg"))
+
+        assert mock_anthropic_client.messages.create.await_count == 2
+        assert (tmp_path / "b.svg").read_bytes() == (tmp_path / "a.svg").read_bytes()
+        assert len(generator.similarity) == 2
+
+    @pytest.mark.asyncio
+    async def test_generator_keeps_scopes_apart(self, mock_anthropic_client, tmp_path):
+        """Test that an answer produced for one scope is not reused for another."""
+        generator = AISchematicGenerator("dummy-api-key", similarity=SimilarityIndex())
+
+        await generator.generate_schematic_from_description(
+            "voltage divider with two 10k resistors", str(tmp_path / "a.svg"), similarity_scope='acme')
+        await generator.generate_schematic_from_description(
+            "two 10k resistor divider", str(tmp_path / "b.svg"), similarity_scope='globex')
+        await generator.generate_schematic_from_description(
+            "two 10k resistor divider", str(tmp_path / "c.svg"), similarity_scope='acme')
+
+        assert mock_anthropic_client.messages.create.await_count == 2
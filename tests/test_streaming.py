@@ -0,0 +1,124 @@
+import pytest
+import json
+from unittest.mock import MagicMock
+from ai_schematic_generator.ai_generator import AISchematicGenerator
+from ai_schematic_generator.cache import RenderCache
+from ai_schematic_generator.streaming import IncrementalSchematicParser, StreamParseError
+
+DOCUMENT = json.dumps({
+    "components": [
+        {"type": "resistor", "id": "R1", "value": "10k", "position": [0, 0]},
+        {"type": "resistor", "id": "R2", "value": "a \"quoted\" {value}", "position": [2, 0]}
+    ],
+    "connections": [{"start": "R1", "end": "R2"}]
+}, indent=2)
+
+def chunked(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+class FakeStream:
+    """Async context manager mimicking ``messages.stream``."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.consumed = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        for chunk in self.chunks:
+            self.consumed += 1
+            yield chunk
+
+class TestIncrementalSchematicParser:
+    def test_components_complete_incrementally(self):
+        """Test that each component is returned once its object closes."""
+        parser = IncrementalSchematicParser()
+        seen = []
+        for chunk in chunked(DOCUMENT):
+            for component in parser.feed(chunk):
+                seen.append((component['id'], len(parser.text)))
+        assert [name for name, _ in seen] == ['R1', 'R2']
+        # R1 is available before R2 has even started streaming.
+        assert seen[0][1] < DOCUMENT.index('"R2"')
+        assert json.loads(parser.close()) == json.loads(DOCUMENT)
+
+    def test_code_fence_is_tolerated(self):
+        """Test that a fenced response still parses."""
+        parser = IncrementalSchematicParser()
+        parser.feed("```json\n" + DOCUMENT + "\n```")
+        assert json.loads(parser.close())['connections'][0]['end'] == 'R2'
+
+    def test_prose_fails_fast(self):
+        """Test that a prose preamble is rejected on its first character."""
+        with pytest.raises(StreamParseError):
+            IncrementalSchematicParser().feed("Here is your JSON")
+
+    def test_mismatched_bracket_fails_fast(self):
+        """Test that a structural error is detected immediately."""
+        parser = IncrementalSchematicParser()
+        with pytest.raises(StreamParseError):
+            parser.feed('{"components": [{"type": "resistor"]')
+
+    def test_truncated_stream(self):
+        """Test that an incomplete document is rejected on close."""
+        parser = IncrementalSchematicParser()
+        parser.feed(DOCUMENT[:40])
+        with pytest.raises(StreamParseError):
+            parser.close()
+
+class TestStreamingGeneration:
+    @pytest.mark.asyncio
+    async def test_stream_generation(self, mock_anthropic_client, tmp_path):
+        """Test generating a schematic from a streamed response."""
+        mock_anthropic_client.messages.stream = MagicMock(return_value=FakeStream(chunked(DOCUMENT)))
+        generator = AISchematicGenerator("dummy-api-key")
+        result = await generator.generate_schematic_from_description(
+            "divider", str(tmp_path / "out.svg"), stream=True
+        )
+        assert "Successfully" in result
+        assert (tmp_path / "out.svg").exists()
+        assert set(generator.schematic_generator.components) == {"R1", "R2"}
+        assert generator.schematic_generator.connections == [("R1", "R2")]
+
+    @pytest.mark.asyncio
+    async def test_malformed_stream_is_abandoned_and_retried(self, mock_anthropic_client, tmp_path):
+        """Test that a bad stream stops early and the next attempt succeeds."""
+        bad = FakeStream(["Sure! ", "Here is", " the JSON"] * 10)
+        good = FakeStream(chunked(DOCUMENT))
+        mock_anthropic_client.messages.stream = MagicMock(side_effect=[bad, good])
+        generator = AISchematicGenerator("dummy-api-key")
+        await generator.generate_schematic_from_description(
+            "divider", str(tmp_path / "out.svg"), stream=True
+        )
+        assert bad.consumed == 1
+        assert (tmp_path / "out.svg").exists()
+
+    @pytest.mark.asyncio
+    async def test_stream_renders_through_pool_and_cache(self, mock_anthropic_client, tmp_path):
+        """Test that the final render of a stream uses the render pool and the render cache."""
+        class FakeRenderer:
+            def __init__(self):
+                self.calls = []
+
+            async def render(self, content, output_file, layout=False):
+                self.calls.append(content)
+                with open(output_file, 'w') as f:
+                    f.write("<svg/>")
+                return output_file
+
+        mock_anthropic_client.messages.stream = MagicMock(
+            side_effect=lambda **kwargs: FakeStream(chunked(DOCUMENT)))
+        renderer = FakeRenderer()
+        generator = AISchematicGenerator(
+            "dummy-api-key", renderer=renderer, render_cache=RenderCache(str(tmp_path / "renders"))
+        )
+        await generator.generate_schematic_from_description("divider", str(tmp_path / "a.svg"), stream=True)
+        await generator.generate_schematic_from_description("divider", str(tmp_path / "b.svg"), stream=True)
+        assert renderer.calls == [DOCUMENT]
+        assert (tmp_path / "b.svg").read_text() == "<svg/>"
@@ -0,0 +1,103 @@
+import json
+import math
+import pickle
+import pytest
+from unittest.mock import MagicMock
+from ai_schematic_generator.ai_generator import AISchematicGenerator
+from ai_schematic_generator.schematic_generator import ELEMENT_FACTORIES, SchematicGenerator
+from ai_schematic_generator.validation import SchematicValidationError, validate_schematic
+from tests.test_streaming import FakeStream, chunked
+
+VALID = {
+    "components": [
+        {"type": "resistor", "id": "R1", "value": "10k", "position": [0, 0], "rotation": 90},
+        {"type": "capacitor", "id": "C1", "position": [3, 0.5]},
+    ],
+    "connections": [{"start": "R1", "end": "C1"}],
+}
+
+def codes(document):
+    return {(issue.path, issue.code) for issue in validate_schematic(document, ELEMENT_FACTORIES)}
+
+class TestValidation:
+    def test_valid_document(self):
+        """Test that a well-formed document has no issues."""
+        assert codes(VALID) == set()
+        assert codes({"components": []}) == set()
+
+    def test_reports_every_issue_in_one_pass(self):
+        """Test that all problems are collected, with paths."""
+        document = {
+            "components": [
+                {"type": "opamp", "id": "U1"},
+                {"type": "resistor", "id": "R1", "position": [0, "1"]},
+                {"type": "resistor", "id": "R1", "rotation": True},
+                {"type": "diode", "position": [math.nan, 0], "value": 5},
+                "C1",
+            ],
+            "connections": [{"start": "R1", "end": "R9"}, {"start": "U1"}, ["R1", "U1"]],
+        }
+        assert codes(document) == {
+            ("components[0].type", "unknown_type"),
+            ("components[1].position", "bad_position"),
+            ("components[2].id", "duplicate_id"),
+            ("components[2].rotation", "bad_rotation"),
+            ("components[3].id", "missing_id"),
+            ("components[3].position", "bad_position"),
+            ("components[3].value", "bad_value"),
+            ("components[4]", "not_object"),
+            ("connections[0].end", "unknown_endpoint"),
+            ("connections[1].end", "missing_endpoint"),
+            ("connections[2]", "not_object"),
+        }
+        assert codes([]) == {("$", "not_object")}
+        assert codes({"components": {}}) == {("components", "not_list")}
+
+    def test_nothing_is_built_from_an_invalid_document(self):
+        """Test that validation fails before any component is added."""
+        document = json.loads(json.dumps(VALID))
+        document["connections"].append({"start": "R1", "end": "R9"})
+        generator = SchematicGenerator()
+        with pytest.raises(SchematicValidationError) as error:
+            generator.from_json(json.dumps(document))
+        assert [issue.code for issue in error.value.issues] == ["unknown_endpoint"]
+        assert len(generator.components) == 0
+
+    def test_error_pickles(self):
+        """Test that errors survive the trip back from a render worker."""
+        error = SchematicValidationError(validate_schematic({"components": [1]}, ELEMENT_FACTORIES), "{}")
+        copy = pickle.loads(pickle.dumps(error))
+        assert copy.issues == error.issues and copy.document == "{}"
+        assert str(copy) == str(error)
+
+class TestTargetedRetry:
+    @pytest.mark.asyncio
+    async def test_retry_quotes_issues(self, mock_anthropic_client, tmp_path):
+        """Test that a retry sends the invalid reply back with its issues."""
+        bad = json.dumps({"components": [{"type": "opamp", "id": "U1"}], "connections": []})
+        replies = [MagicMock(content=bad, stop_reason="end_turn"),
+                   MagicMock(content=json.dumps(VALID), stop_reason="end_turn")]
+        mock_anthropic_client.messages.create.side_effect = replies
+        generator = AISchematicGenerator("dummy-api-key")
+        await generator.generate_schematic_from_description("an amplifier", str(tmp_path / "out.svg"))
+
+        assert (tmp_path / "out.svg").exists()
+        messages = mock_anthropic_client.messages.create.await_args.kwargs["messages"]
+        assert [m["role"] for m in messages] == ["user", "assistant", "user"]
+        assert messages[1]["content"] == bad
+        assert "components[0].type" in messages[2]["content"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_streamed_component_stops_the_stream(self, mock_anthropic_client, tmp_path):
+        """Test that a bad component aborts the stream as soon as it closes."""
+        bad = json.dumps({"components": [{"type": "opamp", "id": "U1"}] + VALID["components"],
+                          "connections": []})
+        first, second = FakeStream(chunked(bad)), FakeStream(chunked(json.dumps(VALID)))
+        mock_anthropic_client.messages.stream = MagicMock(side_effect=[first, second])
+        generator = AISchematicGenerator("dummy-api-key")
+        await generator.generate_schematic_from_description(
+            "an amplifier", str(tmp_path / "out.svg"), stream=True
+        )
+        assert first.consumed < len(chunked(bad))
+        messages = mock_anthropic_client.messages.stream.call_args.kwargs["messages"]
+        assert "unknown type 'opamp'" in messages[2]["content"]
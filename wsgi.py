@@ -1,28 +1,215 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, send_file, url_for
 from ai_schematic_generator.ai_generator import AISchematicGenerator
+from ai_schematic_generator.artifacts import ArtifactStore, LocalBackend, S3Backend, iter_chunks
+from ai_schematic_generator.exporters import EXPORT_FORMATS, MIMETYPES
+from ai_schematic_generator.jobs import DEFAULT_TENANT, JobQueue, QueueFullError, TenantQuotaError
+from ai_schematic_generator.metrics import METRICS
+from ai_schematic_generator.pool import GeneratorPool, load_tenants
+from ai_schematic_generator.similarity import SimilarityIndex
+import json
 import os
 
 app = Flask(__name__)
 api_key = os.getenv('ANTHROPIC_API_KEY')
-generator = AISchematicGenerator(api_key)
+# Access token -> tenant; without a tenants file every request is the default tenant.
+tenants = load_tenants(os.environ['SCHEMATIC_TENANTS']) if os.getenv('SCHEMATIC_TENANTS') else {}
+workers = int(os.getenv('SCHEMATIC_JOB_WORKERS', '4'))
+max_rss_mb = int(os.getenv('SCHEMATIC_POOL_MAX_RSS_MB', '0'))
+# One index for every pooled generator, scoped per tenant by the job queue; off unless a threshold is set.
+similarity_threshold = float(os.getenv('SCHEMATIC_SIMILARITY_THRESHOLD', '0'))
+similarity = SimilarityIndex(
+    similarity_threshold, os.getenv('SCHEMATIC_SIMILARITY_DB')
+) if similarity_threshold else None
+pool = GeneratorPool(
+    lambda key: AISchematicGenerator(key or api_key, similarity=similarity),
+    max_size=int(os.getenv('SCHEMATIC_POOL_SIZE', str(workers))),
+    max_uses=int(os.getenv('SCHEMATIC_POOL_MAX_USES', '100')),
+    max_rss_bytes=max_rss_mb * 1024 * 1024 if max_rss_mb else None
+)
+
+def artifact_backend():
+    """S3 when ``SCHEMATIC_ARTIFACT_BUCKET`` is set (boto3 reads its usual configuration), else a directory."""
+    bucket = os.getenv('SCHEMATIC_ARTIFACT_BUCKET')
+    if bucket:
+        import boto3
+        client = boto3.client('s3', endpoint_url=os.getenv('SCHEMATIC_ARTIFACT_ENDPOINT') or None)
+        return S3Backend(client, bucket, os.getenv('SCHEMATIC_ARTIFACT_PREFIX', ''))
+    return LocalBackend(os.getenv('SCHEMATIC_ARTIFACT_DIR', 'static/artifacts'))
+
+artifacts = ArtifactStore(artifact_backend())
+jobs = JobQueue(
+    pool,
+    output_dir='static/schematics',
+    workers=workers,
+    max_queue=int(os.getenv('SCHEMATIC_JOB_QUEUE', '100')),
+    artifacts=artifacts
+)
+GENERATE_TIMEOUT = float(os.getenv('SCHEMATIC_GENERATE_TIMEOUT', '120'))
+
+def current_tenant():
+    """The tenant of this request, or None if its token is missing or unknown."""
+    if not tenants:
+        return DEFAULT_TENANT
+    auth = request.headers.get('Authorization', '')
+    token = auth[len('Bearer '):] if auth.startswith('Bearer ') else request.headers.get('X-API-Key')
+    return tenants.get(token)
+
+def unauthorized():
+    return jsonify({'error': 'A valid tenant token is required'}), 401, {'WWW-Authenticate': 'Bearer'}
+
+def tenant_job(job_id):
+    """The job if it exists and belongs to this request's tenant."""
+    tenant = current_tenant()
+    job = jobs.get(job_id)
+    if tenant is None or job is None or job.tenant != tenant.name:
+        return None
+    return job
+
+def job_response(job):
+    data = job.to_dict()
+    data['status_url'] = url_for('job_status', job_id=job.id)
+    data['events_url'] = url_for('job_events', job_id=job.id)
+    data['svg_url'] = url_for('job_svg', job_id=job.id)
+    if job.artifact:
+        data['artifact_url'] = url_for('artifact', name=job.artifact)
+    return data
 
 @app.route('/')
 def home():
     return render_template('index.html')
 
 @app.route('/generate', methods=['POST'])
-async def generate():
-    description = request.json.get('description')
-    output_file = f"static/schematics/{description[:10]}.svg"
-    
+def generate():
+    data = request.json or {}
+    description = data.get('description')
+    if not description:
+        return jsonify({'success': False, 'error': 'description is required'}), 400
+    output_format = data.get('format', 'svg')
+    if output_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    tenant = current_tenant()
+    if tenant is None:
+        return unauthorized()
+
+    try:
+        job = jobs.submit(description, output_format, tenant)
+    except TenantQuotaError as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+
+    job = jobs.wait_done(job.id, timeout=GENERATE_TIMEOUT)
+    if not job.done:
+        return jsonify({'success': False, 'error': 'Generation timed out', 'job': job_response(job)}), 504
+    if job.status == 'failed':
+        return jsonify({'success': False, 'error': job.error}), 400
+    output = url_for('artifact', name=job.artifact) if job.artifact else job.output_file
+    return jsonify({'success': True, 'file': output, 'format': job.output_format})
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    data = request.json or {}
+    description = data.get('description')
+    if not description:
+        return jsonify({'error': 'description is required'}), 400
+    output_format = data.get('format', 'svg')
+    if output_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    tenant = current_tenant()
+    if tenant is None:
+        return unauthorized()
+
     try:
-        result = await generator.generate_schematic_from_description(
-            description,
-            output_file
-        )
-        return jsonify({'success': True, 'file': output_file})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
+        job = jobs.submit(description, output_format, tenant)
+    except TenantQuotaError as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    return jsonify(job_response(job)), 202, {'Location': url_for('job_status', job_id=job.id)}
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = tenant_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job_response(job))
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    if tenant_job(job_id) is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    def stream():
+        version = -1
+        while True:
+            job = jobs.wait(job_id, version, timeout=15)
+            if job is None:
+                return
+            if job.version == version:
+                yield ': keep-alive\n\n'
+                continue
+            version = job.version
+            yield f"data: {json.dumps(job.to_dict())}\n\n"
+            if job.done:
+                return
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/jobs/<job_id>/svg')
+def job_svg(job_id):
+    job = tenant_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if job.status == 'failed':
+        return jsonify({'error': job.error}), 409
+    if not job.done:
+        return jsonify(job_response(job)), 202
+    if job.artifact:
+        return serve_artifact(job.artifact)
+    return send_file(os.path.abspath(job.output_file), mimetype=MIMETYPES[job.output_format])
+
+def serve_artifact(name):
+    """Stream a stored artifact, pre-compressed if the client accepts it, honouring If-None-Match.
+
+    If-None-Match uses weak comparison (RFC 9110): ``W/`` tags, ``*`` and
+    lists all match.
+    """
+    stored = artifacts.get(name)
+    if stored is None:
+        return jsonify({'error': 'Unknown artifact'}), 404
+    encoding = stored.negotiate(request.headers.get('Accept-Encoding', ''))
+    headers = {
+        'ETag': stored.etag(encoding),
+        # Names are content addresses, so a response never goes stale; only
+        # the tenant that produced it may see it, so shared caches must not keep it.
+        'Cache-Control': 'private, max-age=31536000, immutable',
+        'Vary': 'Accept-Encoding',
+    }
+    if request.if_none_match.contains_weak(stored.etag(encoding).strip('"')):
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    headers['Content-Length'] = str(artifacts.size(stored, encoding))
+    return Response(iter_chunks(artifacts.open(stored, encoding)), mimetype=stored.mimetype, headers=headers)
+
+@app.route('/artifacts/<name>')
+def artifact(name):
+    """An artifact produced by one of this tenant's retained jobs.
+
+    Artifacts are shared between tenants that produce the same netlist, and
+    their names are netlist hashes anyone can compute, so the name alone
+    grants nothing.
+    """
+    tenant = current_tenant()
+    if tenant is None:
+        return unauthorized()
+    if not jobs.has_artifact(tenant.name, name):
+        return jsonify({'error': 'Unknown artifact'}), 404
+    return serve_artifact(name)
+
+@app.route('/metrics')
+def metrics():
+    return Response(METRICS.render_prometheus(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     app.run()